@@ -1,24 +1,65 @@
-from typing import Generator, List, Callable
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+from typing import Callable, Dict, Generator, Iterable, List, Sequence, Tuple
 import psycopg as pg
+from psycopg import sql
 from datetime import timedelta, datetime
 import numpy as np
 import numpy.typing as npt
-from dataclasses import dataclass
+import xarray as xr
+from dataclasses import dataclass, field
 
 from OceanDB.OceanDB import OceanDB
+from OceanDB.utils.binary_copy import decode_binary_copy_rows, iter_decode_binary_copy_rows
+from OceanDB.utils.geodesic import vincenty_distance
+from OceanDB.utils.query_cache import CachedWindow, QueryCache, QueryCacheKey, to_postgres_microseconds
+from OceanDB.utils.sql_registry import sql_registry
+from OceanDB.utils.time_conversion import POSTGRES_EPOCH
 from OceanDB.utils.projections import spherical_transverse_mercator_to_latitude_longitude, latitude_longitude_to_spherical_transverse_mercator, latitude_longitude_bounds_for_transverse_mercator_box
 
 
+def time_ordered_chunks(dates: List[datetime], chunk_size: int) -> List[npt.NDArray[np.integer]]:
+    """
+    Indices of dates, sorted by date and cut into chunks of chunk_size
+    """
+    order = np.argsort(np.array(dates, dtype="datetime64[us]"), kind="stable")
+    return [order[start:start + chunk_size] for start in range(0, len(order), chunk_size)]
+
+
+def unpack_values(values, scale_factor: float, add_offset: float, fill_value: int|None) -> npt.NDArray[np.floating]:
+    """
+    Scaled values of packed along_track integers.  The ingest stores the packed integers as is, so fill values (and
+    NULLs) become NaN.
+    """
+    values = np.array(values, dtype=np.float64)
+    if fill_value is not None:
+        values[values == fill_value] = np.nan
+    return scale_factor * values + add_offset
+
+
+def unpack_variables(columns: dict, packing: Dict[str, Tuple[float, float, int|None]]
+                     ) -> Dict[str, npt.NDArray[np.floating]]:
+    """
+    Scaled values of the packed along_track integers in columns, packing is {name: (scale_factor, add_offset,
+    fill_value)}, see unpack_values.
+    """
+    return {name: unpack_values(columns[name], *name_packing) for name, name_packing in packing.items()}
+
+
 @dataclass
 class SLA_Geographic:
     """
     Dataclass for output sea level anomaly (SLA) data in geographic coords (i.e. lat,lon).
+
+    variables: scaled values of the along_track variables requested besides sla_filtered, by name
     """
     latitude: npt.NDArray[np.floating]
     longitude: npt.NDArray[np.floating]
     sla_filtered: npt.NDArray[np.floating]
     distance: npt.NDArray[np.floating]
     delta_t: npt.NDArray[np.floating]
+    variables: Dict[str, npt.NDArray[np.floating]] = field(default_factory=dict, kw_only=True)
 
     def __repr__(self):
         return f"""
@@ -31,15 +72,40 @@ class SLA_Geographic:
     @classmethod
     def from_rows(cls,
                  rows: list,
-                 variable_scale_factor
+                 sla_filtered_packing: Tuple[float, float, int|None],
+                 packing: Dict[str, Tuple[float, float, int|None]]|None = None
                  ):
-
+        """
+        sla_filtered_packing: (scale_factor, add_offset, fill_value) of sla_filtered, see unpack_values
+        packing: {name: (scale_factor, add_offset, fill_value)} of the requested variables, see unpack_variables
+        """
         return cls(
             latitude = np.array([row['latitude'] for row in rows]),
             longitude = np.array([row['longitude'] for row in rows]),
-            sla_filtered = variable_scale_factor * np.array([row['sla_filtered'] for row in rows]),
+            sla_filtered = unpack_values([row['sla_filtered'] for row in rows], *sla_filtered_packing),
             distance = np.array([row['distance'] for row in rows]),
-            delta_t = np.array([row['time_difference_secs'] for row in rows], dtype=np.float64)
+            delta_t = np.array([row['time_difference_secs'] for row in rows], dtype=np.float64),
+            variables = unpack_variables({name: [row[name] for row in rows] for name in packing or {}}, packing or {})
+        )
+
+    @classmethod
+    def from_columns(cls,
+                     columns: dict,
+                     sla_filtered_packing: Tuple[float, float, int|None],
+                     packing: Dict[str, Tuple[float, float, int|None]]|None = None
+                     ):
+        """
+        Build from column arrays, e.g. decoded by utils.binary_copy.decode_binary_copy_rows.  The arrays are used as
+        is, only sla_filtered (sla_filtered_packing, see unpack_values) and the requested variables (packing, see
+        unpack_variables) are unpacked.
+        """
+        return cls(
+            latitude = columns['latitude'],
+            longitude = columns['longitude'],
+            sla_filtered = unpack_values(columns['sla_filtered'], *sla_filtered_packing),
+            distance = columns['distance'],
+            delta_t = columns['time_difference_secs'],
+            variables = unpack_variables(columns, packing or {})
         )
 
     def to_dict(self):
@@ -47,7 +113,8 @@ class SLA_Geographic:
             'longitude': self.longitude,
             'latitude': self.latitude,
             'sla_filtered': self.sla_filtered,
-            'delta_t': self.delta_t
+            'delta_t': self.delta_t,
+            **self.variables
         }
 
 @dataclass
@@ -61,6 +128,40 @@ class SLA_Projected(SLA_Geographic):
     delta_x: npt.NDArray[np.floating]
     delta_y: npt.NDArray[np.floating]
 
+    @classmethod
+    def from_rows(cls,
+                  rows: list,
+                  sla_filtered_packing: Tuple[float, float, int|None],
+                  packing: Dict[str, Tuple[float, float, int|None]]|None = None
+                  ):
+        """
+        Build from rows of a projected query, which computes x, y, delta_x & delta_y in the database
+        """
+        return cls(
+            **SLA_Geographic.from_rows(rows, sla_filtered_packing, packing).__dict__,
+            x = np.array([row['x'] for row in rows], dtype=np.float64),
+            y = np.array([row['y'] for row in rows], dtype=np.float64),
+            delta_x = np.array([row['delta_x'] for row in rows], dtype=np.float64),
+            delta_y = np.array([row['delta_y'] for row in rows], dtype=np.float64)
+        )
+
+    @classmethod
+    def from_columns(cls,
+                     columns: dict,
+                     sla_filtered_packing: Tuple[float, float, int|None],
+                     packing: Dict[str, Tuple[float, float, int|None]]|None = None
+                     ):
+        """
+        Build from the column arrays of a projected query decoded from COPY BINARY, see SLA_Geographic.from_columns
+        """
+        return cls(
+            **SLA_Geographic.from_columns(columns, sla_filtered_packing, packing).__dict__,
+            x = columns['x'],
+            y = columns['y'],
+            delta_x = columns['delta_x'],
+            delta_y = columns['delta_y']
+        )
+
     @classmethod
     def from_sla_geographic(
             cls,
@@ -128,7 +229,8 @@ class SLA_Projected(SLA_Geographic):
         y = y[~out_of_bounds]
 
         return cls(
-                **{name: value[~out_of_bounds] for name,value in sla_geographic.__dict__.items()},
+                **{name: value[~out_of_bounds] for name,value in sla_geographic.__dict__.items() if name != 'variables'},
+                variables = {name: value[~out_of_bounds] for name, value in sla_geographic.variables.items()},
                 x = x,
                 y = y,
                 delta_x = x - x0,
@@ -136,6 +238,101 @@ class SLA_Projected(SLA_Geographic):
                 )
 
 
+# CF attributes of the query outputs that are not along_track variables
+QUERY_OUTPUT_ATTRIBUTES = {
+    'query_index': {'long_name': 'Index of the query point'},
+    'latitude': {'long_name': 'Latitude', 'standard_name': 'latitude', 'units': 'degrees_north'},
+    'longitude': {'long_name': 'Longitude', 'standard_name': 'longitude', 'units': 'degrees_east'},
+    'distance': {'long_name': 'Distance to the query point', 'units': 'm'},
+    'delta_t': {'long_name': 'Time of the query point minus time of measurement', 'units': 's'},
+    'x': {'long_name': 'Transverse mercator x, central meridian through the query point', 'units': 'm'},
+    'y': {'long_name': 'Transverse mercator y, central meridian through the query point', 'units': 'm'},
+    'delta_x': {'long_name': 'x minus x of the query point', 'units': 'm'},
+    'delta_y': {'long_name': 'y minus y of the query point', 'units': 'm'},
+}
+# Metadata keys describing the stored integers rather than the scaled values of the query outputs
+ENCODING_KEYS = {'scale_factor', 'add_offset', '_FillValue', 'dtype', 'var_name'}
+
+
+@dataclass
+class SLA_Batch:
+    """
+    Results of many query points in flat columns, e.g. to hand to Parquet or Zarr writers.  The points of query point i
+    are rows offsets[i]:offsets[i+1] (CSR layout), each row also carries its query_index.
+
+    attributes: CF attributes of the columns
+    """
+    columns: Dict[str, npt.NDArray]
+    offsets: npt.NDArray[np.int64]
+    attributes: Dict[str, dict]
+
+    @classmethod
+    def from_results(cls, results: Iterable[SLA_Geographic|None], attributes: Dict[str, dict]|None = None):
+        """
+        Concatenate the per point results of a query method (None for points without data) in one copy
+        """
+        results = list(results)
+        sizes = np.array([0 if result is None else len(result.latitude) for result in results], dtype=np.int64)
+        offsets = np.zeros(len(results) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+
+        present = [result for result in results if result is not None]
+        names = list(present[0].__dict__) if present else list(SLA_Geographic.__dataclass_fields__)
+        names.remove('variables')
+        columns = {'query_index': np.repeat(np.arange(len(results), dtype=np.int32), sizes)}
+        for name in names:
+            columns[name] = np.concatenate([getattr(result, name) for result in present]) if present else np.zeros(0)
+        for name in present[0].variables if present else []:
+            columns[name] = np.concatenate([result.variables[name] for result in present])
+        return cls(columns=columns, offsets=offsets, attributes=attributes or {})
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> Dict[str, npt.NDArray]:
+        """
+        Columns of query point index, as views
+        """
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        return {name: values[start:stop] for name, values in self.columns.items()}
+
+    def to_arrow(self):
+        """
+        pyarrow.Table of the columns (zero copy), CF attributes as field metadata
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("SLA_Batch.to_arrow requires pyarrow, install it with pip install OceanDB[arrow]") from None
+
+        fields, arrays = [], []
+        for name, values in self.columns.items():
+            array = pa.array(values)
+            metadata = {key: str(value) for key, value in self.attributes.get(name, {}).items()}
+            fields.append(pa.field(name, array.type, nullable=False, metadata=metadata))
+            arrays.append(array)
+        return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+    def to_xarray(self) -> xr.Dataset:
+        """
+        CF contiguous ragged array: the columns along the obs dimension, row_size (points per query point) and
+        offsets along the query dimension
+        """
+        dataset = xr.Dataset(
+            {
+                name: xr.Variable('obs', values, attrs=self.attributes.get(name, {}))
+                for name, values in self.columns.items()
+            }
+        )
+        dataset['row_size'] = xr.Variable('query', np.diff(self.offsets), attrs={
+            'long_name': 'Number of observations of each query point', 'sample_dimension': 'obs'
+        })
+        dataset['offsets'] = xr.Variable('query_offset', self.offsets, attrs={
+            'long_name': 'Index of the first observation of each query point, then the number of observations'
+        })
+        return dataset
+
+
 class AlongTrack(OceanDB):
     along_track_table_name: str = 'along_track'
     along_track_metadata_table_name: str = 'along_track_metadata'
@@ -143,24 +340,76 @@ class AlongTrack(OceanDB):
     ocean_basins_connections_table_name: str = 'basin_connection'
     variable_scale_factor: dict = dict()
     variable_add_offset: dict = dict()
+    variable_fill_value: dict = dict()
     missions = ['al', 'alg', 'c2', 'c2n', 'e1g', 'e1', 'e2', 'en', 'enn', 'g2', 'h2a', 'h2b', 'j1g', 'j1', 'j1n', 'j2g',
                 'j2', 'j2n', 'j3', 'j3n', 's3a', 's3b', 's6a', 'tp', 'tpn']
 
 
     nearest_neighbor_query = 'queries/geographic_nearest_neighbor.sql'
     geo_spatiotemporal_query = 'queries/geographic_points_in_spatialtemporal_window.sql'
-    projected_spatio_temporal_query_mask = 'queries/geographic_points_in_spatialtemporal_projected_window_nomask.sql'
-    projected_spatio_temporal_query_no_mask = 'queries/geographic_points_in_spatialtemporal_window.sql'
+    projected_box_query = 'queries/geographic_points_in_spatialtemporal_projected_box.sql'
+    projected_box_mask_query = 'queries/geographic_points_in_spatialtemporal_projected_box_mask.sql'
+    projected_box_batch_query = 'queries/geographic_points_in_spatialtemporal_projected_box_batch.sql'
+    nearest_neighbor_batch_query = 'queries/geographic_nearest_neighbor_batch.sql'
+    geo_spatiotemporal_batch_query = 'queries/geographic_points_in_spatialtemporal_window_batch.sql'
+    create_query_points_query = 'queries/create_query_points.sql'
+    create_projected_query_points_query = 'queries/create_projected_query_points.sql'
+    geo_spatiotemporal_cache_query = 'queries/geographic_points_in_spatialtemporal_window_cache.sql'
 
+    # Query points uploaded per round trip by the batched queries
+    query_batch_size: int = 10_000
+    # Wire dtypes of the columns returned by the batched queries, decoded from COPY BINARY
+    batch_result_columns = [
+        ("query_index", "i4"),
+        ("latitude", "f8"),
+        ("longitude", "f8"),
+        ("sla_filtered", "i2"),
+        ("distance", "f8"),
+        ("time_difference_secs", "f8"),
+    ]
+    # Wire dtypes of the columns returned by the batched projected box query
+    projected_batch_result_columns = batch_result_columns + [
+        ("x", "f8"),
+        ("y", "f8"),
+        ("delta_x", "f8"),
+        ("delta_y", "f8"),
+    ]
+    # Wire dtypes of the columns returned by the projected box queries, the variables follow as smallint
+    projected_result_columns = [
+        ("latitude", "f8"),
+        ("longitude", "f8"),
+        ("sla_filtered", "i2"),
+        ("distance", "f8"),
+        ("time_difference_secs", "f8"),
+        ("x", "f8"),
+        ("y", "f8"),
+        ("delta_x", "f8"),
+        ("delta_y", "f8"),
+    ]
+    # Wire dtypes of the columns of a cached query window
+    cache_window_columns = [
+        ("latitude", "f8"),
+        ("longitude", "f8"),
+        ("sla_filtered", "i2"),
+        ("date_time", "i8"),
+    ]
 
-    def __init__(self):
+
+    def __init__(self, query_cache: QueryCache|None = None):
+        """
+        query_cache: answer geographic_points_in_r_dt (and projected_points_in_r_dt) from cached query windows, see
+        utils.query_cache
+        """
         super().__init__()
+        self.query_cache = query_cache
         aList = AlongTrack.along_track_variable_metadata()
         for metadata in aList:
             if 'scale_factor' in metadata:
                 self.variable_scale_factor[metadata['var_name']] = metadata['scale_factor']
             if 'add_offset' in metadata:
                 self.variable_add_offset[metadata['var_name']] = metadata['add_offset']
+            if '_FillValue' in metadata:
+                self.variable_fill_value[metadata['var_name']] = metadata['_FillValue']
 
     @staticmethod
     def along_track_variable_metadata():
@@ -171,6 +420,7 @@ class AlongTrack(OceanDB):
              'scale_factor': 0.001,
              'standard_name': 'sea_surface_height_above_sea_level',
              'units': 'm',
+             '_FillValue': 32767,
              'dtype': 'int16'},
             {'var_name': 'sla_filtered',
              'comment': 'The sea level anomaly is the sea surface height above mean sea surface height; the uncorrected sla can be computed as follows: [uncorrected sla]=[sla from product]+[dac]+[ocean_tide]+[internal_tide]-[lwe]; see the product user manual for details',
@@ -185,6 +435,7 @@ class AlongTrack(OceanDB):
              'comment': 'The sla in this file is already corrected for the dac; the uncorrected sla can be computed as follows: [uncorrected sla]=[sla from product]+[dac]; see the product user manual for details',
              'long_name': 'Dynamic Atmospheric Correction', 'scale_factor': 0.001, 'standard_name': None,
              'units': 'm',
+             '_FillValue': 32767,
              'dtype': 'int16'},
             {'var_name': 'time',
              'comment': '',
@@ -199,6 +450,7 @@ class AlongTrack(OceanDB):
              'scale_factor': None,
              'standard_name': None,
              'units': '1\n',
+             '_FillValue': 32767,
              'dtype': 'int16'},
             {'var_name': 'cycle',
              'comment': '',
@@ -206,6 +458,7 @@ class AlongTrack(OceanDB):
              'scale_factor': None,
              'standard_name': None,
              'units': '1',
+             '_FillValue': 32767,
              'dtype': 'int16'},
             {'var_name': 'ocean_tide',
               'comment': 'The sla in this file is already corrected for the ocean_tide; the uncorrected sla can be computed as follows: [uncorrected sla]=[sla from product]+[ocean_tide]; see the product user manual for details',
@@ -213,6 +466,7 @@ class AlongTrack(OceanDB):
               'scale_factor': 0.001,
               'standard_name': None,
               'units': 'm',
+             '_FillValue': 32767,
              'dtype': 'int16'},
             {'var_name': 'internal_tide',
              'comment': 'The sla in this file is already corrected for the internal_tide; the uncorrected sla can be computed as follows: [uncorrected sla]=[sla from product]+[internal_tide]; see the product user manual for details',
@@ -220,6 +474,7 @@ class AlongTrack(OceanDB):
              'scale_factor': 0.001,
              'standard_name': None,
              'units': 'm',
+             '_FillValue': 32767,
              'dtype': 'int16'},
             {'var_name': 'lwe',
              'comment': 'The sla in this file is already corrected for the lwe; the uncorrected sla can be computed as follows: [uncorrected sla]=[sla from product]-[lwe]; see the product user manual for details',
@@ -227,6 +482,7 @@ class AlongTrack(OceanDB):
              'scale_factor': 0.001,
              'standard_name': None,
              'units': 'm',
+             '_FillValue': 32767,
              'dtype': 'int16'},
             {'var_name': 'mdt',
              'comment': 'The mean dynamic topography is the sea surface height above geoid; it is used to compute the absolute dynamic tyopography adt=sla+mdt',
@@ -234,50 +490,200 @@ class AlongTrack(OceanDB):
              'scale_factor': 0.001,
              'standard_name': 'sea_surface_height_above_geoid',
              'units': 'm',
+             '_FillValue': 32767,
+             'dtype': 'int16'},
+            {'var_name': 'tpa_correction',
+             'comment': 'The sla in this file is already corrected for the tpa_correction; the uncorrected sla can be computed as follows: [uncorrected sla]=[sla from product]+[tpa_correction]; see the product user manual for details',
+             'long_name': 'TOPEX-A instrumental drift correction derived from comparison to tide gauges',
+             'scale_factor': 0.001,
+             'standard_name': None,
+             'units': 'm',
+             '_FillValue': 32767,
              'dtype': 'int16'}]
         return along_track_variable_metadata
 
+    def as_batch(self, results: Iterable[SLA_Geographic|None]) -> SLA_Batch:
+        """
+        Collect the per point results of a query method into one SLA_Batch, with the CF attributes of
+        along_track_variable_metadata, e.g.
+
+            along_track.as_batch(along_track.geographic_points_in_r_dt(latitudes, longitudes, dates)).to_arrow()
+        """
+        attributes = {name: dict(value) for name, value in QUERY_OUTPUT_ATTRIBUTES.items()}
+        for metadata in self.along_track_variable_metadata():
+            attributes[metadata['var_name']] = {
+                key: value for key, value in metadata.items() if value is not None and key not in ENCODING_KEYS
+            }
+        return SLA_Batch.from_results(results, attributes)
+
+    def _check_variables(self, variables: Sequence[str]|None) -> List[str]:
+        """
+        The along_track columns to fetch besides sla_filtered (always returned), in request order
+        """
+        if variables is None:
+            return []
+        queryable = [
+            metadata['var_name'] for metadata in self.along_track_variable_metadata() if metadata['var_name'] != 'time'
+        ]
+        unknown = [name for name in variables if name not in queryable]
+        if unknown:
+            raise ValueError(f"Unknown variables {unknown}, expected some of {queryable} (time is returned as delta_t)")
+        return [name for name in dict.fromkeys(variables) if name != 'sla_filtered']
+
+    def _variable_packing(self, variables: List[str]) -> Dict[str, Tuple[float, float, int|None]]:
+        """
+        {name: (scale_factor, add_offset, fill_value)} of variables, see unpack_variables
+        """
+        return {
+            name: (
+                self.variable_scale_factor.get(name) or 1.,
+                self.variable_add_offset.get(name) or 0.,
+                self.variable_fill_value.get(name)
+            )
+            for name in variables
+        }
+
+    def _sla_filtered_packing(self) -> Tuple[float, float, int|None]:
+        """
+        (scale_factor, add_offset, fill_value) of sla_filtered, see unpack_values
+        """
+        return self._variable_packing(['sla_filtered'])['sla_filtered']
+
+    def _query_sql(self, query_file: str, variables: List[str] = (), **placeholders: sql.Composable) -> sql.Composed:
+        """
+        query_file with variables added to its select lists, in place of {variables} (along_track columns) and
+        {p_variables} (the same columns of the subquery p).  placeholders fill the query's other {placeholders}.
+        """
+        return sql.SQL(self.load_sql_file(query_file).strip().rstrip(';')).format(
+            variables=sql.SQL("").join([sql.SQL(", {}").format(sql.Identifier(name)) for name in variables]),
+            p_variables=sql.SQL("").join([sql.SQL(", {}").format(sql.Identifier("p", name)) for name in variables]),
+            **placeholders
+        )
+
+    def _nearest_neighbor_query_sql(self, variables: List[str], start_date_time: datetime,
+                                    end_date_time: datetime) -> sql.Composed:
+        """
+        The per point nearest neighbour query, with the whole days around [start_date_time, end_date_time] as literal
+        time bounds.  The planner prunes the partitions outside them before choosing the KNN index scan, while the
+        exact bounds stay parameters, so every point of a day runs the same prepared statement.
+        """
+        first_day = start_date_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        last_day = end_date_time.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        return self._query_sql(
+            self.nearest_neighbor_query, variables,
+            min_date_time=sql.Literal(first_day), max_date_time=sql.Literal(last_day)
+        )
+
     def geographic_nearest_neighbors_dt(self,
                                      latitudes: npt.NDArray[np.floating],
                                      longitudes: npt.NDArray[np.floating],
                                      dates: List[datetime],
                                      time_window=timedelta(seconds=856710),
-                                     missions=None
+                                     missions=None,
+                                     k: int = 3,
+                                     max_distance: float|None = None,
+                                     k_per_mission: Dict[str, int]|None = None,
+                                     variables: List[str]|None = None,
+                                     batch_size: int|None = query_batch_size,
+                                     parallelism: int = 1
                                      ) -> Generator[SLA_Geographic|None, None, None]:
         """
-        Given an array of spatiotemporal points, returns the THREE closest data points to each
+        Given an array of spatiotemporal points, returns the k closest data points to each within time_window/2,
+        closest first.  Distances are on the WGS84 mean sphere, like the geography <-> operator that drives the KNN
+        index scan.
+
+        k: neighbours per point
+        max_distance: only neighbours within max_distance metres, None for no limit
+        k_per_mission: {mission: k}, the k closest points of each mission instead (missions & k are then ignored)
+        variables: along_track variables (see along_track_variable_metadata) fetched besides sla_filtered, returned
+        scaled in SLA_Geographic.variables
+        batch_size: query points sent per round trip, each batch runs as a single statement. None runs one statement
+        per point.
+        parallelism: connections the batches are spread over, see _batched_query
         """
+        self._check_parallelism(batch_size, parallelism)
+        variables = self._check_variables(variables)
 
-        query = self.load_sql_file(self.nearest_neighbor_query)
-
-        if missions is None:
-            missions = self.missions
+        params = self._nearest_neighbor_params(time_window, missions, k, max_distance, k_per_mission)
 
         basin_ids = self.basin_mask(latitudes, longitudes)
         connected_basin_ids = list( map(self.basin_connection_map.get, basin_ids) )
-        params = [
-            {
-                "latitude": latitude,
-                "longitude": longitude,
-                "central_date_time": date,
-                "connected_basin_ids": connected_basin_ids,
-                "time_delta": str(time_window / 2),
-                "missions": missions
-             }
-            for latitude, longitude, date, connected_basin_ids in zip(latitudes, longitudes, dates, connected_basin_ids)]
 
-        with pg.connect(self.config.postgres_dsn) as connection:
+        if batch_size:
+            yield from self._batched_query(
+                query_file=self.nearest_neighbor_batch_query,
+                latitudes=latitudes,
+                longitudes=longitudes,
+                dates=dates,
+                distances=[None] * len(latitudes),
+                connected_basin_ids=connected_basin_ids,
+                params=params,
+                batch_size=batch_size,
+                parallelism=parallelism,
+                variables=variables,
+            )
+            return
+
+        packing = self._variable_packing(variables)
+
+        sla_filtered_packing = self._sla_filtered_packing()
+        # One statement per day window, prepared on the connection (and kept by a pooled one)
+        queries: Dict[tuple, sql.Composed] = {}
+        with self.connection() as connection:
             with connection.cursor(row_factory=pg.rows.dict_row) as cursor:
-                cursor.executemany(query, params, returning=True)
-                while True:
-                    rows = cursor.fetchall()
+                for point_params in self._nearest_neighbor_point_params(
+                        latitudes, longitudes, dates, connected_basin_ids, params):
+                    window = (point_params["start_date_time"].date(), point_params["end_date_time"].date())
+                    if window not in queries:
+                        queries[window] = self._nearest_neighbor_query_sql(
+                            variables, point_params["start_date_time"], point_params["end_date_time"]
+                        )
+                    with sql_registry.timed(self.nearest_neighbor_query):
+                        cursor.execute(queries[window], point_params, prepare=True)
+                        rows = cursor.fetchall()
                     if not rows:
                         yield None
                     else:
-                        data = SLA_Geographic.from_rows(rows, self.variable_scale_factor["sla_filtered"])
-                        yield data
-                    if not cursor.nextset():
-                        break
+                        yield SLA_Geographic.from_rows(rows, sla_filtered_packing, packing)
+
+    def _nearest_neighbor_params(self, time_window, missions, k, max_distance, k_per_mission) -> dict:
+        """
+        Parameters shared by the points of a nearest neighbour query.  The missions are queried in groups, each
+        returning its k closest points, and the closest k (or sum of the groups' k) of all groups are kept.
+        """
+        if k_per_mission is not None:
+            k_per_mission = {mission: k for mission, k in k_per_mission.items() if k > 0}
+            unknown = set(k_per_mission) - set(self.missions)
+            if unknown:
+                raise ValueError(f"Unknown missions {sorted(unknown)}, expected some of {self.missions}")
+            mission_groups = list(k_per_mission)
+            mission_group_k = list(k_per_mission.values())
+        else:
+            if k < 1:
+                raise ValueError(f"k must be at least 1, received {k}")
+            mission_groups = [",".join(self.missions if missions is None else missions)]
+            mission_group_k = [k]
+
+        return {
+            "time_delta": time_window / 2,
+            "mission_groups": mission_groups,
+            "mission_group_k": mission_group_k,
+            "k": sum(mission_group_k),
+            "max_distance": None if max_distance is None else float(max_distance),
+        }
+
+    @staticmethod
+    def _nearest_neighbor_point_params(latitudes, longitudes, dates, connected_basin_ids, params: dict):
+        for latitude, longitude, date, basin_ids in zip(latitudes, longitudes, dates, connected_basin_ids):
+            yield {
+                **params,
+                "latitude": float(latitude),
+                "longitude": float(longitude),
+                "central_date_time": date,
+                "start_date_time": date - params["time_delta"],
+                "end_date_time": date + params["time_delta"],
+                "connected_basin_ids": basin_ids,
+            }
 
     def geographic_points_in_r_dt(self,
                                   latitudes: npt.NDArray[np.floating],
@@ -285,7 +691,10 @@ class AlongTrack(OceanDB):
                                   dates: List[datetime],
                                   distances: List[float]|float=500000.0,
                                   time_window=timedelta(seconds=856710),
-                                  missions=None
+                                  missions=None,
+                                  variables: List[str]|None = None,
+                                  batch_size: int|None = query_batch_size,
+                                  parallelism: int = 1
                                   ) -> Generator[SLA_Geographic|None, None, None]:
         """
         Runs the geographic_points_in_spatialtemporal_window query for every point in the latitudes and longitudes arrays and dates list.
@@ -296,10 +705,16 @@ class AlongTrack(OceanDB):
         :param longitudes: n-array
         :param dates: n-list
         :param distances
+        :param variables: along_track variables (see along_track_variable_metadata) fetched besides sla_filtered,
+            returned scaled in SLA_Geographic.variables.  The query cache only holds sla_filtered, queries with
+            variables bypass it.
+        :param batch_size: query points sent per round trip, each batch runs as a single statement. None runs one
+            statement per point.
+        :param parallelism: connections the batches are spread over, see _batched_query
 
         """
-        query = self.load_sql_file(self.geo_spatiotemporal_query)
-
+        self._check_parallelism(batch_size, parallelism)
+        variables = self._check_variables(variables)
         if missions is None:
             missions = self.missions
 
@@ -310,6 +725,31 @@ class AlongTrack(OceanDB):
         basin_ids = self.basin_mask(latitudes, longitudes)
         connected_basin_ids = list( map(self.basin_connection_map.get, basin_ids) )
 
+        if self.query_cache is not None and not variables:
+            yield from self._cached_points_in_r_dt(
+                latitudes, longitudes, dates, distances, connected_basin_ids, time_window, missions
+            )
+            return
+
+        if batch_size:
+            yield from self._batched_query(
+                query_file=self.geo_spatiotemporal_batch_query,
+                latitudes=latitudes,
+                longitudes=longitudes,
+                dates=dates,
+                distances=distances,
+                connected_basin_ids=connected_basin_ids,
+                params={"time_delta": time_window, "missions": missions},
+                batch_size=batch_size,
+                parallelism=parallelism,
+                variables=variables,
+            )
+            return
+
+        query = self._query_sql(self.geo_spatiotemporal_query, variables)
+        packing = self._variable_packing(variables)
+        sla_filtered_packing = self._sla_filtered_packing()
+
         params = [
             {
                 "longitude": longitude,
@@ -324,18 +764,342 @@ class AlongTrack(OceanDB):
         ]
 
 
-        with pg.connect(self.config.postgres_dsn) as connection:
+        with self.connection() as connection:
             with connection.cursor(row_factory=pg.rows.dict_row) as cursor:
-                cursor.executemany(query, params, returning=True)
-                while True:
-                    rows = cursor.fetchall()
+                for rows in self._prepared_point_queries(cursor, query, self.geo_spatiotemporal_query, params):
                     if not rows:
                         yield None
                     else:
-                        data = SLA_Geographic.from_rows(rows, self.variable_scale_factor["sla_filtered"])
-                        yield data
-                    if not cursor.nextset():
-                        break
+                        yield SLA_Geographic.from_rows(rows, sla_filtered_packing, packing)
+
+    @staticmethod
+    def _prepared_point_queries(cursor: pg.Cursor, query: sql.Composed, query_file: str,
+                                point_params: Iterable[dict]) -> Generator[list, None, None]:
+        """
+        The rows of query for each of point_params, one statement per point.  Executed with prepare=True, so the
+        server parses & plans query once per connection, and a pooled connection keeps the plan across calls.
+        """
+        for params in point_params:
+            with sql_registry.timed(query_file):
+                cursor.execute(query, params, prepare=True)
+                rows = cursor.fetchall()
+            yield rows
+
+    def stream_geographic_points_in_r_dt(self,
+                                         latitude: float,
+                                         longitude: float,
+                                         date: datetime,
+                                         distance: float = 500000.0,
+                                         time_window=timedelta(seconds=856710),
+                                         missions=None,
+                                         variables: List[str]|None = None,
+                                         itersize: int|None = None
+                                         ) -> Generator[SLA_Geographic, None, None]:
+        """
+        geographic_points_in_r_dt for one point, streamed: yields SLA_Geographic chunks of at most itersize points
+        read from a server side cursor, so windows of any size are processed in constant memory.
+
+        variables: along_track variables fetched besides sla_filtered, see geographic_points_in_r_dt
+        itersize: points per chunk & round trip, Config.postgres_cursor_itersize by default
+        """
+        variables = self._check_variables(variables)
+        if missions is None:
+            missions = self.missions
+        [basin_id] = self.basin_mask(np.array([latitude]), np.array([longitude]))
+
+        params = {
+            "longitude": float(longitude),
+            "latitude": float(latitude),
+            "distance": float(distance),
+            "central_date_time": date,
+            "time_delta": time_window,
+            "connected_basin_ids": self.basin_connection_map.get(basin_id),
+            "missions": missions
+        }
+        packing = self._variable_packing(variables)
+        sla_filtered_packing = self._sla_filtered_packing()
+        for rows in self._stream(self.geo_spatiotemporal_query, params, itersize, variables):
+            yield SLA_Geographic.from_rows(rows, sla_filtered_packing, packing)
+
+    def stream_projected_points_in_dx_dy_dt(self,
+                                            latitude: float,
+                                            longitude: float,
+                                            date: datetime,
+                                            Lx: float = 500000.,
+                                            Ly: float = 500000.,
+                                            time_window=timedelta(seconds=856710),
+                                            missions: List[str]|None = None,
+                                            should_basin_mask: bool = True,
+                                            variables: List[str]|None = None,
+                                            itersize: int|None = None
+                                            ) -> Generator[SLA_Projected, None, None]:
+        """
+        projected_points_in_dx_dy_dt for one point, streamed in SLA_Projected chunks of at most itersize points, see
+        stream_geographic_points_in_r_dt.  The rows are read with COPY BINARY and decoded into column arrays chunk by
+        chunk as they arrive, rather than row by row from a server side cursor.
+        """
+        variables = self._check_variables(variables)
+        query_file, [params], _, _ = self._projected_box_query(
+            np.array([latitude]), np.array([longitude]), [date], Lx, Ly, time_window, missions, should_basin_mask
+        )
+        packing = self._variable_packing(variables)
+        sla_filtered_packing = self._sla_filtered_packing()
+        columns = self.projected_result_columns + [(name, "i2") for name in variables]
+        with self.connection() as connection:
+            with connection.cursor() as cursor:
+                with sql_registry.timed(query_file):
+                    with cursor.copy(self._batch_copy_query(query_file, variables), params) as copy:
+                        for chunk in iter_decode_binary_copy_rows(
+                                copy, columns, itersize or self.config.postgres_cursor_itersize):
+                            yield SLA_Projected.from_columns(chunk, sla_filtered_packing, packing)
+
+    def _stream(self, query_file: str, params: dict, itersize: int|None, variables: List[str] = ()):
+        """
+        Rows of query_file in lists of at most itersize, timed as one execution once the stream ends
+        """
+        with sql_registry.timed(query_file):
+            yield from self.stream_query(self._query_sql(query_file, variables), params, itersize)
+
+    @staticmethod
+    def _check_parallelism(batch_size: int|None, parallelism: int):
+        if parallelism < 1:
+            raise ValueError(f"parallelism must be at least 1, received {parallelism}")
+        if parallelism > 1 and not batch_size:
+            raise ValueError("parallelism requires batched queries, set batch_size")
+
+    def _batched_query(self,
+                       query_file: str,
+                       latitudes: npt.NDArray[np.floating],
+                       longitudes: npt.NDArray[np.floating],
+                       dates: List[datetime],
+                       distances: List[float|None],
+                       connected_basin_ids: List[List[int]|None],
+                       params: dict,
+                       batch_size: int,
+                       parallelism: int = 1,
+                       variables: List[str] = (),
+                       projected: bool = False
+                       ) -> Generator[SLA_Geographic|None, None, None]:
+        """
+        Run a query for many points with one statement per batch.
+
+        The points of each batch are copied into the query_points temp table, then the query LATERAL joins them to
+        along_track and returns every row tagged with the query_index of its point.  Yields one SLA_Geographic (or None
+        if no rows match) per point, in input order.
+
+        The results are read with COPY ... TO STDOUT (FORMAT BINARY) and decoded column-wise into NumPy arrays, the
+        query is ordered by query_index so each point's result is a slice of those arrays.
+
+        With parallelism > 1 the points are sorted by time and cut into chunks (of at most batch_size points, and at
+        least parallelism chunks), so each chunk only touches a few monthly partitions.  The chunks run on parallelism
+        connections at once and the results are yielded in input order as soon as every earlier point is done.
+
+        variables: checked along_track variables added to the query's select lists, see _query_sql
+        projected: query_file is a projected box query, whose points are copied into projected_query_points with
+        their (x0, y0, min_longitude, min_latitude, max_longitude, max_latitude) box in place of a distance.  Yields
+        SLA_Projected.
+        """
+        points = list(zip(latitudes, longitudes, dates, distances, connected_basin_ids))
+
+        if parallelism > 1:
+            yield from self._parallel_batched_query(
+                query_file, points, params, batch_size, parallelism, variables, projected
+            )
+            return
+
+        with self.connection() as connection:
+            for batch_start in range(0, len(points), batch_size):
+                batch = points[batch_start:batch_start + batch_size]
+                yield from self._run_batch(connection, query_file, batch, params, variables, projected)
+
+    def _run_batch(self, connection: pg.Connection, query_file: str, batch: list, params: dict,
+                   variables: List[str] = (), projected: bool = False) -> List[SLA_Geographic|None]:
+        """
+        One batch of _batched_query, in its own transaction on connection
+        """
+        if projected:
+            create_query, copy_query, table_name = (
+                self.create_projected_query_points_query, self.copy_projected_query_points, "projected_query_points"
+            )
+            rows = self._projected_query_point_rows(batch)
+        else:
+            create_query, copy_query, table_name = (
+                self.create_query_points_query, self.copy_query_points, "query_points"
+            )
+            rows = self._query_point_rows(batch)
+
+        with connection.transaction():
+            with connection.cursor() as cursor:
+                cursor.execute(self.load_sql_file(create_query))
+                with cursor.copy(copy_query) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                # Row estimates for the join, the temp table is not analyzed by autovacuum
+                cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(table_name)))
+                with sql_registry.timed(query_file):
+                    with cursor.copy(self._batch_copy_query(query_file, variables),
+                                     {**params, **self._batch_dates(batch)}) as copy:
+                        data = b"".join(copy)
+
+        return self._split_batch_result(data, len(batch), variables, projected)
+
+    @staticmethod
+    def _batch_dates(batch: list) -> dict:
+        """
+        Earliest & latest date of a batch.  COPY binds them on the client, so they reach the planner as literals and
+        the monthly partitions outside the batch's time range are pruned at plan time.
+        """
+        dates = [date for _, _, date, _, _ in batch]
+        return {"min_central_date_time": min(dates), "max_central_date_time": max(dates)}
+
+    def _parallel_batched_query(self, query_file: str, points: list, params: dict, batch_size: int,
+                                parallelism: int, variables: List[str] = (), projected: bool = False
+                                ) -> Generator[SLA_Geographic|None, None, None]:
+        if not points:
+            return
+        chunk_size = min(batch_size, -(-len(points) // parallelism))
+        chunks = time_ordered_chunks([point[2] for point in points], chunk_size)
+
+        def run_chunk(indices: npt.NDArray[np.integer]) -> List[SLA_Geographic|None]:
+            with self.connection() as connection:
+                return self._run_batch(
+                    connection, query_file, [points[i] for i in indices], params, variables, projected
+                )
+
+        results: List[SLA_Geographic|None] = [None] * len(points)
+        done = np.zeros(len(points), dtype=bool)
+        next_index = 0
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            futures = {executor.submit(run_chunk, indices): indices for indices in chunks}
+            try:
+                for future in as_completed(futures):
+                    indices = futures[future]
+                    for index, result in zip(indices, future.result()):
+                        results[index] = result
+                    done[indices] = True
+                    while next_index < len(points) and done[next_index]:
+                        yield results[next_index]
+                        # Hand the result over, the caller owns it from here
+                        results[next_index] = None
+                        next_index += 1
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def _cached_points_in_r_dt(self, latitudes, longitudes, dates, distances, connected_basin_ids, time_window,
+                               missions) -> Generator[SLA_Geographic|None, None, None]:
+        """
+        geographic_points_in_r_dt answered from the query cache, fetching the window of each missing cell once
+        """
+        time_window_us = int(time_window / timedelta(microseconds=1))
+        sla_filtered_packing = self._sla_filtered_packing()
+        with ExitStack() as stack:
+            connection = None
+            for latitude, longitude, date, distance, basin_ids in zip(
+                    latitudes, longitudes, dates, distances, connected_basin_ids):
+                key = self.query_cache.key(latitude, longitude, date, time_window, distance, missions, basin_ids)
+                window = self.query_cache.get(key)
+                if window is None:
+                    if connection is None:
+                        connection = stack.enter_context(self.connection())
+                    window = self._fetch_cache_window(connection, key)
+                    self.query_cache.put(key, window)
+
+                columns = window.columns
+                time_difference = to_postgres_microseconds(date) - columns["date_time"]
+                in_window = np.abs(time_difference) <= time_window_us
+                distance_to_point = vincenty_distance(
+                    latitude, longitude, columns["latitude"][in_window], columns["longitude"][in_window]
+                )
+                in_range = distance_to_point <= distance
+                if not in_range.any():
+                    yield None
+                    continue
+                yield SLA_Geographic(
+                    latitude=columns["latitude"][in_window][in_range],
+                    longitude=columns["longitude"][in_window][in_range],
+                    sla_filtered=unpack_values(columns["sla_filtered"][in_window][in_range], *sla_filtered_packing),
+                    distance=distance_to_point[in_range],
+                    delta_t=time_difference[in_window][in_range] / 1e6,
+                )
+
+    def _fetch_cache_window(self, connection: pg.Connection, key: QueryCacheKey) -> CachedWindow:
+        latitude, longitude, distance, start, end = self.query_cache.cell_window(key)
+        # Stamped before the query, so an ingest committed while it runs invalidates the window
+        created = time.time()
+        params = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "distance": distance,
+            "start_date_time": POSTGRES_EPOCH.astype(datetime) + timedelta(microseconds=start),
+            "end_date_time": POSTGRES_EPOCH.astype(datetime) + timedelta(microseconds=end),
+            "connected_basin_ids": list(key.connected_basin_ids),
+            "missions": list(key.missions),
+        }
+        with connection.cursor() as cursor:
+            with sql_registry.timed(self.geo_spatiotemporal_cache_query):
+                with cursor.copy(self._batch_copy_query(self.geo_spatiotemporal_cache_query), params) as copy:
+                    data = b"".join(copy)
+        return CachedWindow(
+            columns=decode_binary_copy_rows(data, self.cache_window_columns), start=start, end=end, created=created
+        )
+
+    copy_query_points = ("COPY query_points (query_index, latitude, longitude, central_date_time, distance, "
+                         "connected_basin_ids) FROM STDIN")
+    copy_projected_query_points = ("COPY projected_query_points (query_index, latitude, longitude, central_date_time, "
+                                   "x0, y0, min_longitude, min_latitude, max_longitude, max_latitude, "
+                                   "connected_basin_ids) FROM STDIN")
+
+    def _batch_copy_query(self, query_file: str, variables: List[str] = ()) -> sql.Composed:
+        return sql.SQL("COPY ({}) TO STDOUT (FORMAT BINARY)").format(self._query_sql(query_file, variables))
+
+    @staticmethod
+    def _query_point_rows(batch: list):
+        """
+        query_points rows of (latitude, longitude, date, distance, connected_basin_ids) points
+        """
+        for query_index, (latitude, longitude, date, distance, basin_ids) in enumerate(batch):
+            yield (
+                query_index,
+                float(latitude),
+                float(longitude),
+                date,
+                None if distance is None else float(distance),
+                basin_ids
+            )
+
+    @staticmethod
+    def _projected_query_point_rows(batch: list):
+        """
+        projected_query_points rows of (latitude, longitude, date, box, connected_basin_ids) points, box is
+        (x0, y0, min_longitude, min_latitude, max_longitude, max_latitude)
+        """
+        for query_index, (latitude, longitude, date, box, basin_ids) in enumerate(batch):
+            yield (query_index, float(latitude), float(longitude), date, *map(float, box), basin_ids)
+
+    def _split_batch_result(self, data: bytes, n_points: int, variables: List[str] = (),
+                            projected: bool = False) -> List[SLA_Geographic|None]:
+        """
+        Decode the COPY BINARY result of a batched query, ordered by query_index, into one result per point.  The
+        variables follow the batch_result_columns (projected_batch_result_columns of a projected query, whose results
+        are SLA_Projected), every variable is stored as smallint.
+        """
+        result_columns, result_class = (
+            (self.projected_batch_result_columns, SLA_Projected) if projected
+            else (self.batch_result_columns, SLA_Geographic)
+        )
+        columns = decode_binary_copy_rows(data, result_columns + [(name, "i2") for name in variables])
+        packing = self._variable_packing(variables)
+        sla_filtered_packing = self._sla_filtered_packing()
+        bounds = np.searchsorted(columns["query_index"], np.arange(n_points + 1))
+        return [
+            None if start == stop else result_class.from_columns(
+                {name: values[start:stop] for name, values in columns.items()},
+                sla_filtered_packing,
+                packing
+            )
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
 
     def projected_points_in_r_dt(self,
                                  latitudes: npt.NDArray[np.floating],
@@ -343,10 +1107,15 @@ class AlongTrack(OceanDB):
                                  dates: List[datetime],
                                  distances: List[float]|float=500000.0,
                                  time_window=timedelta(seconds=856710),
-                                 missions=None
+                                 missions=None,
+                                 variables: List[str]|None = None,
+                                 batch_size: int|None = query_batch_size,
+                                 parallelism: int = 1
                                  ) -> Generator[SLA_Projected | None, None, None]:
         """
         Get projected points around a reference point in a geographic radius and time interval
+
+        variables: along_track variables fetched besides sla_filtered, see geographic_points_in_r_dt
         """
 
         sla_geographic_data_points = self.geographic_points_in_r_dt(
@@ -355,7 +1124,10 @@ class AlongTrack(OceanDB):
             dates = dates,
             distances=distances,
             time_window=time_window,
-            missions=missions
+            missions=missions,
+            variables=variables,
+            batch_size=batch_size,
+            parallelism=parallelism
         )
         for lat,lon,geo_points in zip(latitudes,longitudes,sla_geographic_data_points):
             if geo_points is None:
@@ -372,64 +1144,127 @@ class AlongTrack(OceanDB):
             Ly: float = 500000.,
             time_window=timedelta(seconds=856710),
             missions: List[str]|None=None,
-            should_basin_mask: bool = True
+            should_basin_mask: bool = True,
+            variables: List[str]|None = None,
+            batch_size: int|None = query_batch_size,
+            parallelism: int = 1
             ) -> Generator[SLA_Projected | None, None, None]:
         """
-        Get projected points around a reference point in a box in projected coordinates, and time interval
+        Get projected points around a reference point in a box in projected coordinates, and time interval.  The box
+        x in (x0-Lx, x0+Lx), y in (y0-Ly, y0+Ly) is filtered in the database, which also computes x, y, delta_x &
+        delta_y (see sql/functions/create_spherical_transverse_mercator_functions.sql).
 
         should_basin_mask: ->
         NO MASK -> if should_basin_mask = True, only return points in the basin or connected basin.
+        The mask filters on the basin_id column of along_track, the connected basins of each reference point are
+        looked up on the client (basin_mask & basin_connection_map).
 
         Panama Example
         should_basin_mask = False ->  returns points on BOTH sides of the Panama,
         should_basin_mask = True -> Returns only data in connected basin
 
+        variables: along_track variables fetched besides sla_filtered, see geographic_points_in_r_dt
+        batch_size: query points sent per round trip, each batch runs as a single statement read with COPY BINARY.
+        None runs one (prepared) statement per point.
+        parallelism: connections the batches are spread over, see _batched_query
         """
+        self._check_parallelism(batch_size, parallelism)
+        variables = self._check_variables(variables)
+        if missions is None:
+            missions = self.missions
+        query_file, params, x0s, y0s = self._projected_box_query(
+            latitudes, longitudes, dates, Lx, Ly, time_window, missions, should_basin_mask
+        )
+
+        if batch_size:
+            yield from self._batched_query(
+                query_file=self.projected_box_batch_query,
+                latitudes=latitudes,
+                longitudes=longitudes,
+                dates=dates,
+                distances=[
+                    (point["x0"], point["y0"], point["xmin"], point["ymin"], point["xmax"], point["ymax"])
+                    for point in params
+                ],
+                connected_basin_ids=[point["connected_basin_ids"] for point in params],
+                params={
+                    "time_delta": time_window,
+                    "missions": missions,
+                    "Lx": float(Lx),
+                    "Ly": float(Ly),
+                },
+                batch_size=batch_size,
+                parallelism=parallelism,
+                variables=variables,
+                projected=True,
+            )
+            return
+
+        packing = self._variable_packing(variables)
+        sla_filtered_packing = self._sla_filtered_packing()
 
+        with self.connection() as connection:
+            with connection.cursor(row_factory=pg.rows.dict_row) as cursor:
+                query = self._query_sql(query_file, variables)
+                for rows in self._prepared_point_queries(cursor, query, query_file, params):
+                    if not rows:
+                        yield None
+                    else:
+                        yield SLA_Projected.from_rows(rows, sla_filtered_packing, packing)
+
+    def _projected_box_query(self, latitudes, longitudes, dates, Lx, Ly, time_window, missions, should_basin_mask,
+                             connected_basin_ids=None):
+        """
+        Query file, per point parameters & projected centers (x0s, y0s) of projected_points_in_dx_dy_dt
+
+        connected_basin_ids: of each point when should_basin_mask, looked up from basin_connection_map if None
+        """
         if missions is None:
             missions = self.missions
 
         if should_basin_mask:
-            query = self.load_sql_file(self.projected_spatio_temporal_query_mask)
+            query_file = self.projected_box_mask_query
+            if connected_basin_ids is None:
+                basin_ids = self.basin_mask(latitudes, longitudes)
+                connected_basin_ids = list( map(self.basin_connection_map.get, basin_ids) )
         else:
-            query = self.load_sql_file(self.projected_spatio_temporal_query_mask)
+            query_file = self.projected_box_query
+            connected_basin_ids = [None] * len(latitudes)
 
-        [x0s, y0s, minLats, minLons, maxLats, maxLons] = latitude_longitude_bounds_for_transverse_mercator_box(latitudes, longitudes, 2*Lx, 2*Ly)
+        [x0s, y0s, minLats, minLons, maxLats, maxLons] = latitude_longitude_bounds_for_transverse_mercator_box(
+            np.asarray(latitudes, dtype=np.float64), np.asarray(longitudes, dtype=np.float64), 2*Lx, 2*Ly
+        )
 
+        # The envelope only narrows the index scan, the box itself is filtered on x & y
         params = [
             {
-                "longitude": longitude,
-                "latitude": latitude,
-                "xmin": xmin,
-                "ymin": ymin,
-                "xmax": xmax,
-                "ymax": ymax,
+                "longitude": float(longitude),
+                "latitude": float(latitude),
+                "xmin": float(min_longitude),
+                "ymin": float(min_latitude),
+                "xmax": float(max_longitude),
+                "ymax": float(max_latitude),
+                "x0": float(x0),
+                "y0": float(y0),
+                "Lx": float(Lx),
+                "Ly": float(Ly),
                 "central_date_time": date,
                 "time_delta": time_window,
-                "missions": [missions]
+                "missions": missions,
+                "connected_basin_ids": basin_ids
             }
-            for latitude, longitude, date, xmin, ymin, xmax, ymax in zip(
+            for latitude, longitude, date, x0, y0, min_latitude, min_longitude, max_latitude, max_longitude, basin_ids
+            in zip(
                 latitudes,
                 longitudes,
                 dates,
+                x0s,
+                y0s,
                 minLats,
                 minLons,
                 maxLats,
-                maxLons
+                maxLons,
+                connected_basin_ids
             )
         ]
-
-        with pg.connect(self.config.postgres_dsn) as connection:
-            with connection.cursor() as cursor:
-                cursor.executemany(query, params, returning=True)
-                for x0,y0 in zip(x0s, y0s):
-                    rows = cursor.fetchall()
-                    if not rows:
-                        yield None
-                    else:
-                        geo_data = SLA_Geographic.from_rows(rows, self.variable_scale_factor["sla_filtered"])
-                        yield SLA_Projected.from_sla_geographic_filter_dx_dy(
-                                geo_data, Lx, Ly, x0=x0, y0=y0
-                    )
-                    if not cursor.nextset():
-                        break
+        return query_file, params, x0s, y0s
@@ -0,0 +1,492 @@
+"""
+Tile mode for dense query grids
+
+Mapping a region issues a query per grid node, each an ST_DWithin over geography in Postgres, although all the nodes
+together touch a limited set of along track points.  AlongTrackTile fetches every point of a spatiotemporal tile
+(the nodes' lat/lon box widened by margin metres, their dates widened by time_margin) with one COPY BINARY query and
+answers the AlongTrack queries of the nodes locally:
+
+    - the points are sorted by time and cut into time buckets, each bucket is indexed by a KD-tree of the points' 3D
+      unit vectors (scipy.spatial.cKDTree, or a brute force search without scipy)
+    - the tree returns candidates within a chord that bounds the query radius, the candidates are then filtered with
+      the exact predicates of the SQL queries (WGS84 geodesic distance, time window, basins & missions)
+
+Nodes the tile cannot answer exactly (outside the tile, radius above margin, window above time_margin, missions not
+fetched, or a nearest neighbour farther than margin) fall back to the AlongTrack SQL queries, so results are the same
+as without the tile.
+"""
+import math
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Generator, List, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from OceanDB.AlongTrack import AlongTrack, SLA_Geographic, SLA_Projected, unpack_values
+from OceanDB.utils.binary_copy import decode_binary_copy_rows
+from OceanDB.utils.geodesic import WGS84_A, WGS84_B, vincenty_distance
+from OceanDB.utils.projections import latitude_longitude_to_spherical_transverse_mercator
+from OceanDB.utils.query_cache import to_postgres_microseconds
+from OceanDB.utils.sql_registry import sql_registry
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+# Smallest radius of curvature of the WGS84 ellipsoid (meridional, at the equator): a geodesic of length d spans at
+# most d / WGS84_MIN_RADIUS radians
+WGS84_MIN_RADIUS = WGS84_B ** 2 / WGS84_A
+# Largest radius of curvature (at the poles): points whose normals are an angle apart are at most that times
+# WGS84_MAX_RADIUS away
+WGS84_MAX_RADIUS = WGS84_A ** 2 / WGS84_B
+# PostGIS computes geography KNN (<->) distances on the sphere of the WGS84 mean radius
+WGS84_MEAN_RADIUS = (2 * WGS84_A + WGS84_B) / 3
+# Sphere radius of utils.projections' transverse mercator
+PROJECTION_RADIUS = 0.9996 * WGS84_A
+# Parallels of the tile envelope are segmentized every SEGMENT_DEGREES, so its geodesic edges stay within
+# SEGMENT_SLACK metres of the parallels
+SEGMENT_DEGREES = 0.1
+SEGMENT_SLACK = 100.
+
+
+def unit_vectors(latitude, longitude) -> npt.NDArray[np.floating]:
+    phi = np.radians(np.asarray(latitude, dtype=np.float64))
+    lam = np.radians(np.asarray(longitude, dtype=np.float64))
+    return np.stack([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)], axis=-1)
+
+
+def chord(angle: float) -> float:
+    """
+    Chord between unit vectors angle radians apart
+    """
+    return 2 * math.sin(min(angle, math.pi) / 2)
+
+
+class BruteForceTree:
+    """
+    The subset of the cKDTree interface used by TimeBucketedIndex, for installs without scipy
+    """
+
+    def __init__(self, points: npt.NDArray[np.floating]):
+        self.points = points
+        self.n = len(points)
+
+    def _distances(self, point):
+        return np.linalg.norm(self.points - point, axis=1)
+
+    def query_ball_point(self, point, r: float) -> List[int]:
+        return list(np.flatnonzero(self._distances(point) <= r))
+
+    def query(self, point, k: int):
+        distances = self._distances(point)
+        order = np.argsort(distances, kind="stable")[:k]
+        return distances[order], order
+
+
+class TimeBucketedIndex:
+    """
+    Unit vector trees of the points, one per time bucket
+
+    date_time: Postgres microseconds, sorted
+    """
+
+    def __init__(self, latitude, longitude, date_time: npt.NDArray[np.int64], bucket: int):
+        self.date_time = date_time
+        self.bucket = bucket
+        self.xyz = unit_vectors(latitude, longitude)
+        buckets = date_time // bucket
+        self.first_bucket = int(buckets[0]) if len(buckets) else 0
+        edges = np.arange(self.first_bucket, (int(buckets[-1]) + 2) if len(buckets) else 1)
+        self.bounds = np.searchsorted(buckets, edges)
+        self._trees = {}
+
+    def _tree(self, bucket: int):
+        tree = self._trees.get(bucket)
+        if tree is None:
+            start, stop = self.bounds[bucket], self.bounds[bucket + 1]
+            points = self.xyz[start:stop]
+            tree = cKDTree(points) if cKDTree is not None else BruteForceTree(points)
+            self._trees[bucket] = tree
+        return tree
+
+    def _buckets(self, start: int, end: int) -> range:
+        first = max(start // self.bucket - self.first_bucket, 0)
+        last = min(end // self.bucket - self.first_bucket, len(self.bounds) - 2)
+        return range(first, last + 1)
+
+    def within(self, xyz, chord_distance: float, start: int, end: int) -> npt.NDArray[np.integer]:
+        """
+        Indices of the points within chord_distance of xyz in the buckets overlapping [start, end]
+        """
+        indices = [
+            self.bounds[bucket] + np.asarray(self._tree(bucket).query_ball_point(xyz, chord_distance), dtype=np.int64)
+            for bucket in self._buckets(start, end)
+            if self.bounds[bucket + 1] > self.bounds[bucket]
+        ]
+        return np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64)
+
+    def nearest(self, xyz, k: int, start: int, end: int, valid: Callable) -> npt.NDArray[np.integer]:
+        """
+        Indices of the k nearest points of xyz in the buckets overlapping [start, end] that pass valid (a vectorized
+        predicate of the point indices), unsorted
+        """
+        candidates = []
+        for bucket in self._buckets(start, end):
+            size = self.bounds[bucket + 1] - self.bounds[bucket]
+            if size == 0:
+                continue
+            tree = self._tree(bucket)
+            query_k = min(max(4 * k, 16), size)
+            while True:
+                _, indices = tree.query(xyz, k=query_k)
+                indices = self.bounds[bucket] + np.atleast_1d(indices).astype(np.int64)
+                kept = indices[valid(indices)]
+                # The tree returns neighbours by increasing distance, so the first k valid ones are the bucket's nearest
+                if len(kept) >= k or query_k == size:
+                    candidates.append(kept[:k])
+                    break
+                query_k = min(4 * query_k, size)
+        return np.concatenate(candidates) if candidates else np.zeros(0, dtype=np.int64)
+
+
+class AlongTrackTile:
+    """
+    Along track points of a tile, answering the AlongTrack queries of the nodes inside it locally
+
+    along_track: runs the tile query, and the queries of nodes the tile cannot answer
+    min_latitude, max_latitude, min_longitude, max_longitude: box of the query nodes, longitudes in [-180, 180]
+    start_date, end_date: dates of the query nodes
+    margin: metres fetched around the box, the largest query radius (or box half diagonal) answered locally
+    time_margin: time fetched around the dates, the largest query time window answered locally
+    time_bucket: duration of the time buckets of the index
+    """
+
+    tile_query = 'queries/along_track_tile.sql'
+    tile_columns = [
+        ("latitude", "f8"),
+        ("longitude", "f8"),
+        ("sla_filtered", "i2"),
+        ("date_time", "i8"),
+        ("basin_id", "i2"),
+        ("mission_index", "i2"),
+    ]
+
+    def __init__(self,
+                 along_track: AlongTrack,
+                 min_latitude: float,
+                 max_latitude: float,
+                 min_longitude: float,
+                 max_longitude: float,
+                 start_date: datetime,
+                 end_date: datetime,
+                 missions: Optional[List[str]] = None,
+                 margin: float = 500_000.,
+                 time_margin: timedelta = timedelta(seconds=856710),
+                 time_bucket: timedelta = timedelta(days=1)):
+        if min_latitude > max_latitude or min_longitude > max_longitude:
+            raise ValueError("The tile minimum latitude & longitude must not exceed the maxima")
+        self.along_track = along_track
+        self.min_latitude = min_latitude
+        self.max_latitude = max_latitude
+        self.min_longitude = min_longitude
+        self.max_longitude = max_longitude
+        self.start = to_postgres_microseconds(start_date)
+        self.end = to_postgres_microseconds(end_date)
+        self.missions = list(missions if missions is not None else along_track.missions)
+        self.margin = margin
+        self.time_margin = int(time_margin / timedelta(microseconds=1))
+        self.sla_filtered_packing = along_track._sla_filtered_packing()
+
+        columns = self._fetch(start_date - time_margin, end_date + time_margin)
+        order = np.argsort(columns["date_time"], kind="stable")
+        self.columns = {name: values[order] for name, values in columns.items()}
+        self.index = TimeBucketedIndex(
+            self.columns["latitude"], self.columns["longitude"], self.columns["date_time"],
+            int(time_bucket / timedelta(microseconds=1))
+        )
+
+    def _fetch(self, start_date: datetime, end_date: datetime) -> dict:
+        params = {
+            "min_latitude": self.min_latitude,
+            "max_latitude": self.max_latitude,
+            "min_longitude": self.min_longitude,
+            "max_longitude": self.max_longitude,
+            "segment_degrees": SEGMENT_DEGREES,
+            "distance": self.margin + SEGMENT_SLACK,
+            "start_date_time": start_date,
+            "end_date_time": end_date,
+            "missions": self.missions,
+        }
+        copy_query = self.along_track._batch_copy_query(self.tile_query)
+        with self.along_track.connection() as connection:
+            with connection.cursor() as cursor:
+                with sql_registry.timed(self.tile_query):
+                    with cursor.copy(copy_query, params) as copy:
+                        data = b"".join(copy)
+
+        return decode_binary_copy_rows(data, self.tile_columns)
+
+    def __len__(self):
+        return len(self.columns["date_time"])
+
+    ######################################################
+    #
+    # Coverage
+    #
+    ######################################################
+    def covers(self, latitude: float, longitude: float, date: datetime, distance: float, time_window: timedelta,
+               missions: List[str]) -> bool:
+        """
+        Whether every point within distance & time_window of the node was fetched
+        """
+        longitude = (float(longitude) + 180.) % 360. - 180.
+        date_time = to_postgres_microseconds(date)
+        return (
+            self.min_latitude <= latitude <= self.max_latitude
+            and self.min_longitude <= longitude <= self.max_longitude
+            and self.start <= date_time <= self.end
+            and distance <= self.margin
+            and time_window / timedelta(microseconds=1) <= self.time_margin
+            and set(missions) <= set(self.missions)
+        )
+
+    def _mission_mask(self, indices, missions: List[str]) -> npt.NDArray[np.bool_]:
+        mission_indices = [self.missions.index(mission) + 1 for mission in missions]
+        return np.isin(self.columns["mission_index"][indices], mission_indices)
+
+    def _candidates(self, latitude, longitude, date_time: int, distance: float, time_window: int, missions,
+                    basin_ids) -> npt.NDArray[np.integer]:
+        """
+        Points in the time window, basins & missions within a chord bounding distance.  basin_ids None keeps every
+        basin.
+        """
+        indices = self.index.within(
+            unit_vectors(latitude, longitude), chord(distance / WGS84_MIN_RADIUS),
+            date_time - time_window, date_time + time_window
+        )
+        # Time order, as the indices follow the rows sorted by date_time
+        indices = np.sort(indices)
+        keep = (np.abs(date_time - self.columns["date_time"][indices]) <= time_window) \
+            & self._mission_mask(indices, missions)
+        if basin_ids is not None:
+            keep &= np.isin(self.columns["basin_id"][indices], basin_ids)
+        return indices[keep]
+
+    def _geographic(self, indices, distance, date_time: int) -> SLA_Geographic:
+        return SLA_Geographic(
+            latitude=self.columns["latitude"][indices],
+            longitude=self.columns["longitude"][indices],
+            sla_filtered=unpack_values(self.columns["sla_filtered"][indices], *self.sla_filtered_packing),
+            distance=distance,
+            delta_t=(date_time - self.columns["date_time"][indices]) / 1e6,
+        )
+
+    def _with_fallback(self, results: list, uncovered: List[int], query: Callable) -> Generator:
+        """
+        Fill the uncovered results with query(indices), the AlongTrack SQL query of those nodes
+        """
+        if uncovered:
+            for index, result in zip(uncovered, query(uncovered)):
+                results[index] = result
+        yield from results
+
+    def _connected_basin_ids(self, latitudes, longitudes) -> list:
+        """
+        Connected basins of each node, empty for nodes outside any basin: the SQL queries return nothing for them
+        """
+        basin_ids = self.along_track.basin_mask(latitudes, longitudes)
+        return [self.along_track.basin_connection_map.get(basin_id) or [] for basin_id in basin_ids]
+
+    ######################################################
+    #
+    # Queries
+    #
+    ######################################################
+    def geographic_points_in_r_dt(self,
+                                  latitudes: npt.NDArray[np.floating],
+                                  longitudes: npt.NDArray[np.floating],
+                                  dates: List[datetime],
+                                  distances: List[float]|float = 500000.0,
+                                  time_window=timedelta(seconds=856710),
+                                  missions=None
+                                  ) -> Generator[SLA_Geographic|None, None, None]:
+        """
+        AlongTrack.geographic_points_in_r_dt answered from the tile
+        """
+        if missions is None:
+            missions = self.along_track.missions
+        if not isinstance(distances, list):
+            distances = [distances] * len(latitudes)
+        connected_basin_ids = self._connected_basin_ids(latitudes, longitudes)
+        time_window_us = int(time_window / timedelta(microseconds=1))
+
+        results, uncovered = [], []
+        for index, (latitude, longitude, date, distance, basin_ids) in enumerate(
+                zip(latitudes, longitudes, dates, distances, connected_basin_ids)):
+            if not self.covers(latitude, longitude, date, distance, time_window, missions):
+                uncovered.append(index)
+                results.append(None)
+                continue
+            date_time = to_postgres_microseconds(date)
+            indices = self._candidates(latitude, longitude, date_time, distance, time_window_us, missions, basin_ids)
+            distance_to_node = vincenty_distance(
+                latitude, longitude, self.columns["latitude"][indices], self.columns["longitude"][indices]
+            )
+            in_range = distance_to_node <= distance
+            results.append(
+                self._geographic(indices[in_range], distance_to_node[in_range], date_time) if in_range.any() else None
+            )
+
+        yield from self._with_fallback(results, uncovered, lambda nodes: self.along_track.geographic_points_in_r_dt(
+            latitudes=np.asarray(latitudes)[nodes],
+            longitudes=np.asarray(longitudes)[nodes],
+            dates=[dates[node] for node in nodes],
+            distances=[distances[node] for node in nodes],
+            time_window=time_window,
+            missions=missions,
+        ))
+
+    def geographic_nearest_neighbors_dt(self,
+                                        latitudes: npt.NDArray[np.floating],
+                                        longitudes: npt.NDArray[np.floating],
+                                        dates: List[datetime],
+                                        time_window=timedelta(seconds=856710),
+                                        missions=None,
+                                        k: int = 3,
+                                        max_distance: float|None = None,
+                                        k_per_mission: Dict[str, int]|None = None
+                                        ) -> Generator[SLA_Geographic|None, None, None]:
+        """
+        AlongTrack.geographic_nearest_neighbors_dt answered from the tile.  Distances are on the WGS84 mean sphere,
+        like the geography <-> operator.
+        """
+        params = self.along_track._nearest_neighbor_params(time_window, missions, k, max_distance, k_per_mission)
+        groups = [(group.split(","), group_k) for group, group_k in zip(params["mission_groups"],
+                                                                         params["mission_group_k"])]
+        all_missions = [mission for group, _ in groups for mission in group]
+        connected_basin_ids = self._connected_basin_ids(latitudes, longitudes)
+        half_window = int(time_window / 2 / timedelta(microseconds=1))
+        max_chord = math.inf if max_distance is None else chord(max_distance / WGS84_MEAN_RADIUS)
+        # Bound of the geodesic distance of a point at sphere distance d, which must be fetched by the tile
+        spheroid_bound = WGS84_MAX_RADIUS / WGS84_MEAN_RADIUS
+
+        results, uncovered = [], []
+        for index, (latitude, longitude, date, basin_ids) in enumerate(
+                zip(latitudes, longitudes, dates, connected_basin_ids)):
+            if not self.covers(latitude, longitude, date, 0., time_window / 2, all_missions):
+                uncovered.append(index)
+                results.append(None)
+                continue
+            date_time = to_postgres_microseconds(date)
+            xyz = unit_vectors(latitude, longitude)
+
+            found, covered = [], True
+            for group, group_k in groups:
+                def valid(indices, group=group):
+                    return (np.abs(date_time - self.columns["date_time"][indices]) <= half_window) \
+                        & self._mission_mask(indices, group) \
+                        & np.isin(self.columns["basin_id"][indices], basin_ids) \
+                        & (np.linalg.norm(self.index.xyz[indices] - xyz, axis=1) <= max_chord)
+
+                indices = self.index.nearest(xyz, group_k, date_time - half_window, date_time + half_window, valid)
+                sphere_distance = 2 * WGS84_MEAN_RADIUS * np.arcsin(
+                    np.clip(np.linalg.norm(self.index.xyz[indices] - xyz, axis=1) / 2, 0, 1)
+                )
+                # nearest returns up to group_k points per time bucket
+                order = np.argsort(sphere_distance, kind="stable")[:group_k]
+                indices, sphere_distance = indices[order], sphere_distance[order]
+                # A closer point may lie outside the tile unless the group's k-th point, or max_distance when fewer
+                # than k were found, is within the margin
+                reach = sphere_distance.max() if len(indices) == group_k else (max_distance or math.inf)
+                if reach * spheroid_bound > self.margin:
+                    covered = False
+                    break
+                found.append((indices, sphere_distance))
+
+            if not covered:
+                uncovered.append(index)
+                results.append(None)
+                continue
+            indices = np.concatenate([indices for indices, _ in found])
+            sphere_distance = np.concatenate([distance for _, distance in found])
+            order = np.argsort(sphere_distance, kind="stable")[:params["k"]]
+            results.append(
+                self._geographic(indices[order], sphere_distance[order], date_time) if len(order) else None
+            )
+
+        yield from self._with_fallback(results, uncovered, lambda nodes: self.along_track.geographic_nearest_neighbors_dt(
+            latitudes=np.asarray(latitudes)[nodes],
+            longitudes=np.asarray(longitudes)[nodes],
+            dates=[dates[node] for node in nodes],
+            time_window=time_window,
+            missions=missions,
+            k=k,
+            max_distance=max_distance,
+            k_per_mission=k_per_mission,
+        ))
+
+    def projected_points_in_dx_dy_dt(self,
+                                     latitudes: npt.NDArray[np.floating],
+                                     longitudes: npt.NDArray[np.floating],
+                                     dates: List[datetime],
+                                     Lx: float = 500000.,
+                                     Ly: float = 500000.,
+                                     time_window=timedelta(seconds=856710),
+                                     missions: List[str]|None = None,
+                                     should_basin_mask: bool = True
+                                     ) -> Generator[SLA_Projected|None, None, None]:
+        """
+        AlongTrack.projected_points_in_dx_dy_dt answered from the tile: points within (x0 +/- Lx, y0 +/- Ly) of the
+        node in its transverse mercator projection.
+        """
+        if missions is None:
+            missions = self.along_track.missions
+        connected_basin_ids = self._connected_basin_ids(latitudes, longitudes) if should_basin_mask \
+            else [None] * len(latitudes)
+        time_window_us = int(time_window / timedelta(microseconds=1))
+        # The projection never shrinks lengths, so a point of the box is at most its half diagonal away on the
+        # projection sphere
+        half_diagonal = math.hypot(Lx, Ly)
+        reach = half_diagonal / PROJECTION_RADIUS * WGS84_MIN_RADIUS
+        reach_on_spheroid = half_diagonal / PROJECTION_RADIUS * WGS84_MAX_RADIUS
+
+        results, uncovered = [], []
+        for index, (latitude, longitude, date, basin_ids) in enumerate(
+                zip(latitudes, longitudes, dates, connected_basin_ids)):
+            if not self.covers(latitude, longitude, date, reach_on_spheroid, time_window, missions):
+                uncovered.append(index)
+                results.append(None)
+                continue
+            date_time = to_postgres_microseconds(date)
+            indices = self._candidates(latitude, longitude, date_time, reach, time_window_us, missions, basin_ids)
+            x0, y0 = latitude_longitude_to_spherical_transverse_mercator(latitude, longitude, lon0=longitude)
+            x, y = latitude_longitude_to_spherical_transverse_mercator(
+                self.columns["latitude"][indices], self.columns["longitude"][indices], lon0=longitude
+            )
+            in_box = (x >= x0 - Lx) & (x <= x0 + Lx) & (y >= y0 - Ly) & (y <= y0 + Ly)
+            if not in_box.any():
+                results.append(None)
+                continue
+            indices = indices[in_box]
+            distance = vincenty_distance(
+                latitude, longitude, self.columns["latitude"][indices], self.columns["longitude"][indices]
+            )
+            results.append(SLA_Projected(
+                **self._geographic(indices, distance, date_time).__dict__,
+                x=x[in_box],
+                y=y[in_box],
+                delta_x=x[in_box] - x0,
+                delta_y=y[in_box] - y0,
+            ))
+
+        yield from self._with_fallback(results, uncovered, lambda nodes: self.along_track.projected_points_in_dx_dy_dt(
+            latitudes=np.asarray(latitudes)[nodes],
+            longitudes=np.asarray(longitudes)[nodes],
+            dates=[dates[node] for node in nodes],
+            Lx=Lx,
+            Ly=Ly,
+            time_window=time_window,
+            missions=missions,
+            should_basin_mask=should_basin_mask,
+        ))
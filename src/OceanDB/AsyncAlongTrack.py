@@ -0,0 +1,308 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import timedelta, datetime
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List
+
+import numpy as np
+import numpy.typing as npt
+import psycopg as pg
+
+from OceanDB.AlongTrack import AlongTrack, SLA_Geographic, SLA_Projected
+from OceanDB.utils.binary_copy import decode_binary_copy_rows
+from OceanDB.utils.sql_registry import sql_registry
+
+try:
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:
+    AsyncConnectionPool = None
+
+
+class AsyncAlongTrack(AlongTrack):
+    """
+    asyncio version of the AlongTrack queries, the query methods are async generators yielding one result per point in
+    input order, like their AlongTrack counterparts.
+
+    At most max_concurrency queries (batches of points) run at once per instance, across all calls, each on its own
+    connection.  Connections come from a psycopg_pool.AsyncConnectionPool of the same size if psycopg-pool is installed,
+    otherwise a connection is opened per query.
+
+        async with AsyncAlongTrack(max_concurrency=32) as along_track:
+            async for data in along_track.geographic_points_in_r_dt(latitudes, longitudes, dates):
+                ...
+    """
+
+    def __init__(self, max_concurrency: int|None = None):
+        super().__init__()
+        self.max_concurrency = max_concurrency or self.config.postgres_pool_max_size
+        self._semaphore: asyncio.Semaphore|None = None
+        self._pool = None
+        self._basin_connections: dict|None = None
+        self._basin_connections_lock: asyncio.Lock|None = None
+
+    async def open(self):
+        """
+        Create the semaphore & pool in the running event loop, called by async with
+        """
+        if self._semaphore is not None:
+            return
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._basin_connections_lock = asyncio.Lock()
+        if AsyncConnectionPool is not None:
+            self._pool = AsyncConnectionPool(
+                self.config.postgres_dsn,
+                min_size=min(self.config.postgres_pool_min_size, self.max_concurrency),
+                max_size=self.max_concurrency,
+                max_idle=self.config.postgres_pool_max_idle,
+                max_lifetime=self.config.postgres_pool_max_lifetime,
+                timeout=self.config.postgres_pool_timeout,
+                check=AsyncConnectionPool.check_connection,
+                open=False,
+            )
+            await self._pool.open()
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+        self._pool = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @asynccontextmanager
+    async def async_connection(self) -> AsyncIterator[pg.AsyncConnection]:
+        """
+        Connection for one query, waits while max_concurrency queries are running.  Committed on exit.
+        """
+        await self.open()
+        async with self._semaphore:
+            if self._pool is not None:
+                async with self._pool.connection() as connection:
+                    yield connection
+            else:
+                async with await pg.AsyncConnection.connect(self.config.postgres_dsn) as connection:
+                    yield connection
+
+    async def async_basin_connection_map(self) -> dict:
+        """
+        basin_connection_map, loaded once per instance without blocking the event loop
+        """
+        await self.open()
+        async with self._basin_connections_lock:
+            if self._basin_connections is None:
+                basin_connections = {}
+                async with self.async_connection() as connection:
+                    async with connection.cursor() as cursor:
+                        await cursor.execute(
+                            """SELECT basin_id, array_agg(connected_id)
+                            FROM basin_connections
+                            GROUP BY basin_id
+                            ORDER BY basin_id"""
+                        )
+                        for basin_id, connected_ids in await cursor.fetchall():
+                            basin_connections[basin_id] = [basin_id] + connected_ids
+                self._basin_connections = basin_connections
+        return self._basin_connections
+
+    async def _connected_basin_ids(self, latitudes, longitudes) -> list:
+        basin_connections = await self.async_basin_connection_map()
+        return list(map(basin_connections.get, self.basin_mask(latitudes, longitudes)))
+
+    async def _in_order(self, jobs: List[Callable[[], Awaitable[list]]]) -> AsyncGenerator:
+        """
+        Run the jobs concurrently, at most max_concurrency ahead of the consumer, and yield the items of their
+        results in job order
+        """
+        pending = deque()
+        jobs = iter(jobs)
+        try:
+            for job in jobs:
+                pending.append(asyncio.ensure_future(job()))
+                if len(pending) >= self.max_concurrency:
+                    break
+            while pending:
+                results = await pending.popleft()
+                next_job = next(jobs, None)
+                if next_job is not None:
+                    pending.append(asyncio.ensure_future(next_job()))
+                for result in results:
+                    yield result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _batch(self, query_file: str, batch: list, params: dict,
+                     variables: List[str] = ()) -> List[SLA_Geographic|None]:
+        """
+        One batch of the temp table + LATERAL join query, see AlongTrack._batched_query
+        """
+        async with self.async_connection() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(self.load_sql_file(self.create_query_points_query))
+                async with cursor.copy(self.copy_query_points) as copy:
+                    for row in self._query_point_rows(batch):
+                        await copy.write_row(row)
+                await cursor.execute("ANALYZE query_points")
+                with sql_registry.timed(query_file):
+                    async with cursor.copy(self._batch_copy_query(query_file, variables),
+                                           {**params, **self._batch_dates(batch)}) as copy:
+                        data = b"".join([block async for block in copy])
+        return self._split_batch_result(data, len(batch), variables)
+
+    async def _batched_query_async(self, query_file, latitudes, longitudes, dates, distances, params, batch_size,
+                                   variables=()):
+        connected_basin_ids = await self._connected_basin_ids(latitudes, longitudes)
+        points = list(zip(latitudes, longitudes, dates, distances, connected_basin_ids))
+        jobs = [
+            lambda batch=points[start:start + batch_size]: self._batch(query_file, batch, params, variables)
+            for start in range(0, len(points), batch_size)
+        ]
+        async for result in self._in_order(jobs):
+            yield result
+
+    async def geographic_nearest_neighbors_dt(self,
+                                              latitudes: npt.NDArray[np.floating],
+                                              longitudes: npt.NDArray[np.floating],
+                                              dates: List[datetime],
+                                              time_window=timedelta(seconds=856710),
+                                              missions=None,
+                                              k: int = 3,
+                                              max_distance: float|None = None,
+                                              k_per_mission: Dict[str, int]|None = None,
+                                              variables: List[str]|None = None,
+                                              batch_size: int = AlongTrack.query_batch_size
+                                              ) -> AsyncGenerator[SLA_Geographic|None, None]:
+        """
+        Given an array of spatiotemporal points, yields the k closest data points to each, see
+        AlongTrack.geographic_nearest_neighbors_dt
+
+        batch_size: query points per statement, batches run concurrently
+        """
+        variables = self._check_variables(variables)
+        params = self._nearest_neighbor_params(time_window, missions, k, max_distance, k_per_mission)
+
+        async for result in self._batched_query_async(
+                query_file=self.nearest_neighbor_batch_query,
+                latitudes=latitudes,
+                longitudes=longitudes,
+                dates=dates,
+                distances=[None] * len(latitudes),
+                params=params,
+                batch_size=batch_size,
+                variables=variables,
+        ):
+            yield result
+
+    async def geographic_points_in_r_dt(self,
+                                        latitudes: npt.NDArray[np.floating],
+                                        longitudes: npt.NDArray[np.floating],
+                                        dates: List[datetime],
+                                        distances: List[float]|float=500000.0,
+                                        time_window=timedelta(seconds=856710),
+                                        missions=None,
+                                        variables: List[str]|None = None,
+                                        batch_size: int = AlongTrack.query_batch_size
+                                        ) -> AsyncGenerator[SLA_Geographic|None, None]:
+        """
+        Yields all along_track points within distance and the time window of each point
+
+        variables: along_track variables fetched besides sla_filtered, see AlongTrack.geographic_points_in_r_dt
+        batch_size: query points per statement, batches run concurrently
+        """
+        variables = self._check_variables(variables)
+        if missions is None:
+            missions = self.missions
+
+        if not isinstance(distances, list):
+            distances = [distances]*len(latitudes)
+
+        async for result in self._batched_query_async(
+                query_file=self.geo_spatiotemporal_batch_query,
+                latitudes=latitudes,
+                longitudes=longitudes,
+                dates=dates,
+                distances=distances,
+                params={"time_delta": time_window, "missions": missions},
+                batch_size=batch_size,
+                variables=variables,
+        ):
+            yield result
+
+    async def projected_points_in_r_dt(self,
+                                       latitudes: npt.NDArray[np.floating],
+                                       longitudes: npt.NDArray[np.floating],
+                                       dates: List[datetime],
+                                       distances: List[float]|float=500000.0,
+                                       time_window=timedelta(seconds=856710),
+                                       missions=None,
+                                       variables: List[str]|None = None,
+                                       batch_size: int = AlongTrack.query_batch_size
+                                       ) -> AsyncGenerator[SLA_Projected|None, None]:
+        """
+        Yields projected points around each reference point in a geographic radius and time interval
+        """
+        index = 0
+        async for geo_points in self.geographic_points_in_r_dt(
+                latitudes=latitudes,
+                longitudes=longitudes,
+                dates=dates,
+                distances=distances,
+                time_window=time_window,
+                missions=missions,
+                variables=variables,
+                batch_size=batch_size
+        ):
+            if geo_points is None:
+                yield None
+            else:
+                yield SLA_Projected.from_sla_geographic(
+                    geo_points, latitude=latitudes[index], longitude=longitudes[index]
+                )
+            index += 1
+
+    async def _projected_box(self, query_file: str, params: dict, variables: List[str]) -> List[SLA_Projected|None]:
+        """
+        One point of projected_points_in_dx_dy_dt, read with COPY BINARY & decoded into column arrays
+        """
+        async with self.async_connection() as connection:
+            async with connection.cursor() as cursor:
+                with sql_registry.timed(query_file):
+                    async with cursor.copy(self._batch_copy_query(query_file, variables), params) as copy:
+                        data = b"".join([block async for block in copy])
+        columns = decode_binary_copy_rows(data, self.projected_result_columns + [(name, "i2") for name in variables])
+        if not len(columns["latitude"]):
+            return [None]
+        return [SLA_Projected.from_columns(columns, self._sla_filtered_packing(), self._variable_packing(variables))]
+
+    async def projected_points_in_dx_dy_dt(
+            self,
+            latitudes: npt.NDArray[np.floating],
+            longitudes: npt.NDArray[np.floating],
+            dates: List[datetime],
+            Lx: float = 500000.,
+            Ly: float = 500000.,
+            time_window=timedelta(seconds=856710),
+            missions: List[str]|None=None,
+            should_basin_mask: bool = True,
+            variables: List[str]|None = None
+            ) -> AsyncGenerator[SLA_Projected|None, None]:
+        """
+        Yields projected points around each reference point in a box in projected coordinates and time interval, the
+        points are queried concurrently.  See AlongTrack.projected_points_in_dx_dy_dt
+        """
+        variables = self._check_variables(variables)
+        connected_basin_ids = await self._connected_basin_ids(latitudes, longitudes) if should_basin_mask else None
+        query_file, params, _, _ = self._projected_box_query(
+            latitudes, longitudes, dates, Lx, Ly, time_window, missions, should_basin_mask, connected_basin_ids
+        )
+        jobs = [
+            lambda point_params=point_params: self._projected_box(query_file, point_params, variables)
+            for point_params in params
+        ]
+        async for result in self._in_order(jobs):
+            yield result
@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from functools import cached_property
 import netCDF4 as nc
 from psycopg import sql
@@ -5,17 +6,21 @@ import os
 import yaml
 from importlib import resources
 import time
+import uuid
 import pandas as pd
 from typing import IO
 import psycopg as pg
 from psycopg.rows import dict_row
-from typing import Any, List, Dict, Optional
+from typing import Any, List, Dict, Iterator, Optional
 import numpy as np
 from OceanDB.config import Config
 
 from sqlalchemy import create_engine
 
 from OceanDB.utils.logging import get_logger
+from OceanDB.utils.basin_mask import basin_mask, load_basin_mask
+from OceanDB.utils import connection_pool
+from OceanDB.utils.sql_registry import sql_registry
 
 class OceanDB:
     """
@@ -41,6 +46,15 @@ class OceanDB:
 
 
 
+    @contextmanager
+    def connection(self) -> Iterator[pg.Connection]:
+        """
+        Connection for a unit of work, committed on exit (rolled back on error).  Lent by the process wide pool if
+        POSTGRES_POOL_ENABLED, otherwise a new connection.  Do not keep the connection after the block.
+        """
+        with connection_pool.connection(self.config) as conn:
+            yield conn
+
     def load_module_file(self, module: str, filename: str, encoding="utf-8", mode="rb") -> IO:
         """
         Open a resource file bundled within a Python package.
@@ -57,14 +71,28 @@ class OceanDB:
 
     def load_sql_file(self, filename: str):
         """
-        Load the contents of a SQL file
+        Load the contents of a SQL file, from the in memory registry of the packaged templates
+        """
+        return sql_registry.get(filename)
+
+    def stream_query(self, query, params=None, itersize: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Execute a SELECT on a named (server side) cursor and yield its rows as lists of at most itersize dictionaries,
+        so results of any size are processed in constant memory.  The cursor lives in the transaction of the
+        connection, which stays open until the generator is exhausted or closed.
+
+        itersize: rows fetched per round trip, Config.postgres_cursor_itersize by default
         """
-        with self.load_module_file(module="OceanDB.sql",
-                                   filename=filename,
-                                   mode="r",
-                                   encoding="utf-8") as f:
-            query = f.read()
-            return query
+        itersize = itersize or self.config.postgres_cursor_itersize
+        with self.connection() as conn:
+            with conn.cursor(name=f"oceandb_stream_{uuid.uuid4().hex}", row_factory=dict_row) as cur:
+                cur.itersize = itersize
+                cur.execute(query, params)
+                while True:
+                    rows = cur.fetchmany(itersize)
+                    if not rows:
+                        return
+                    yield rows
 
     def select_query(self, table: str, query: str) -> Optional[List[Dict[str, Any]]]:
         """
@@ -83,8 +111,8 @@ class OceanDB:
             List of dictionaries (rows), or None if no results.
         """
         try:
-            with pg.connect(self.connection_string, row_factory=dict_row) as conn:
-                with conn.cursor() as cur:
+            with self.connection() as conn:
+                with conn.cursor(row_factory=dict_row) as cur:
                     cur.execute(query)
 
                     # Detect if the query returns rows (e.g. SELECT)
@@ -104,7 +132,7 @@ class OceanDB:
 
     def execute_query(self, table, query):
         try:
-            with pg.connect(self.connection_string) as conn:
+            with self.connection() as conn:
                  with conn.cursor() as cur:
                      cur.execute(query)
                      conn.commit()
@@ -148,7 +176,7 @@ class OceanDB:
             table_name=sql.Identifier(name)
         )
 
-        with pg.connect(self.connection_string) as conn:
+        with self.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(query_truncate_table)
                 conn.commit()
@@ -196,50 +224,35 @@ class OceanDB:
                                                      v is not None and k in encoding_keys}
         return xrdata, encodings
 
-    @cached_property
-    def basin_mask_data(self):
+    @property
+    def basin_mask_data(self) -> np.ndarray:
         """
-        Load the basin mask NetCDF file packaged with the module.
-        Returns the 'basinmask' variable as a NumPy array.
+        Read-only memory map of the packaged basin mask, shared by every instance & process
         """
-        # Open resource file via importlib.resources
-        with self.load_module_file("OceanDB.data", "basin_masks/new_basin_mask.nc", mode="rb") as f:
-            ds = nc.Dataset("inmemory.nc", memory=f.read())  # load from memory buffer
-            ds.set_auto_mask(False)
-            basin_mask = ds.variables["basinmask"][:]
-            ds.close()
-            return basin_mask
-
+        return load_basin_mask()
 
     def basin_mask(self, latitude, longitude):
         """
         Get basin_id from lat & lng
         """
-        onesixth = 1 / 6
-        i = np.floor((latitude + 90) / onesixth).astype(int)
-        j = np.floor((longitude % 360) / onesixth).astype(int)
-        mask_data = self.basin_mask_data
-        basin_mask = mask_data[i, j]
-        return basin_mask
+        return basin_mask(latitude, longitude)
 
     @cached_property
     def basin_connection_map(self) -> dict:
-        with pg.connect(self.connection_string) as connection:
-            with connection.cursor() as cursor:
-                cursor.execute("""SELECT DISTINCT basin_id FROM basin_connections ORDER BY basin_id""")
-                unique_ids = cursor.fetchall()
-
-        uid = [data_i[0] for data_i in unique_ids]
-        basin_id_dict = [{"basin_id": basin_id} for basin_id in uid]
-
         query = """SELECT array_agg(connected_id) as connected_basin_id
         		FROM basin_connections
         		WHERE basin_id = %(basin_id)s
         		GROUP BY basin_id"""
 
         basin_id_connection_dict = {}
-        with pg.connect(self.connection_string) as connection:
+        with self.connection() as connection:
             with connection.cursor() as cursor:
+                cursor.execute("""SELECT DISTINCT basin_id FROM basin_connections ORDER BY basin_id""")
+                unique_ids = cursor.fetchall()
+
+                uid = [data_i[0] for data_i in unique_ids]
+                basin_id_dict = [{"basin_id": basin_id} for basin_id in uid]
+
                 cursor.executemany(query, basin_id_dict, returning=True)
                 i = 0
                 while True:
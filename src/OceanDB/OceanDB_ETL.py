@@ -1,5 +1,7 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from dataclasses import asdict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import netCDF4 as nc
 import pandas as pd
 import psycopg
@@ -10,15 +12,64 @@ import time
 import os
 import numpy as np
 from OceanDB.OceanDB import OceanDB
-from functools import cached_property
-from typing import List, Tuple, Any, Iterable, Optional
+from OceanDB.OceanDB_Partitions import AlongTrackPartitionManager
+from typing import List, Tuple, Any, Iterable, Optional, Dict
 from datetime import datetime, timedelta
 from pathlib import Path
 from OceanDB.utils.postgres_upsert import upsert_ignore
+from OceanDB.utils.binary_copy import encode_binary_copy_rows, iter_binary_copy_batches
+from OceanDB.utils.metrics import IngestMetrics, format_timings, stage_timer
+from OceanDB.utils.query_cache import invalidate_query_caches
+from OceanDB.utils.time_conversion import netcdf_time_to_postgres_microseconds, postgres_microseconds_to_datetime64
+
+
+def parse_along_track_file_name(file_name: str) -> Tuple[str, datetime]:
+    """
+    Parse the mission & measurement date out of a DUACS along track file name, e.g.
+    dt_global_al_phy_l3_1hz_20130314_20240205.nc -> ("al", datetime(2013, 3, 14))
+    """
+    parts = Path(file_name).stem.split('_')
+    try:
+        return parts[2], datetime.strptime(parts[-2], "%Y%m%d")
+    except (IndexError, ValueError):
+        raise ValueError(f"{file_name} does not match the DUACS along track file name pattern")
+
+@dataclass
+class FileFingerprint:
+    """Size, modification time & content hash of an ingested file, as stored in the ingest manifest."""
+    file_size: int
+    file_mtime_ns: int
+    content_hash: Optional[str] = None
+
+    @classmethod
+    def from_path(cls, file: Path) -> "FileFingerprint":
+        stat = file.stat()
+        return cls(file_size=stat.st_size, file_mtime_ns=stat.st_mtime_ns)
+
+
+@dataclass
+class IngestManifestDiff:
+    """Files of a directory tree split by their state in the ingest manifest.
+
+    legacy: (file_name, fingerprint) of unchanged files ingested before the manifest existed, recorded in the manifest
+    by OceanDBETl.prepare_ingest_manifest once the ingest goes ahead.
+    """
+    new: List[Path] = field(default_factory=list)
+    changed: List[Path] = field(default_factory=list)
+    unchanged: List[Path] = field(default_factory=list)
+    legacy: List[Tuple[str, FileFingerprint]] = field(default_factory=list)
+
+    @property
+    def to_ingest(self) -> List[Path]:
+        return self.new + self.changed
+
 
 @dataclass
 class AlongTrackData:
-    """Structured container for extracted along-track variables."""
+    """Structured container for extracted along-track variables.
+
+    time is int64 microseconds since 2000-01-01, the binary representation of a Postgres timestamp.
+    """
     file_name: np.ndarray
     mission: np.ndarray
     time: np.ndarray
@@ -35,6 +86,14 @@ class AlongTrackData:
     mdt: np.ndarray
     tpa_correction: np.ndarray
     basin_id: np.ndarray
+    fingerprint: Optional[FileFingerprint] = None
+    # Seconds spent in each ingest stage, see utils.metrics.INGEST_STAGES
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def time_range(self) -> Tuple[datetime, datetime]:
+        """First & last measurement time"""
+        first, last = postgres_microseconds_to_datetime64([self.time.min(), self.time.max()])
+        return first.astype(datetime), last.astype(datetime)
 
 
 @dataclass
@@ -81,9 +140,6 @@ class AlongTrackMetaData:
         def get(attr: str):
             return getattr(ds, attr, None)
 
-        conventions = getattr(ds, 'Conventions', None)
-
-        print(f"CONVENTIONS {conventions}")
         return cls(
             file_name=file_name,
             conventions=get("Conventions"),
@@ -119,15 +175,40 @@ class OceanDBETl(OceanDB):
     ocean_basins_connections_table_name: str = 'basin_connection'
     along_track_table_name: str = 'along_track'
     along_track_metadata_table_name: str = 'along_track_metadata'
+    along_track_ingest_manifest_table_name: str = 'along_track_ingest_manifest'
 
 
     variable_scale_factor: dict = dict()
     variable_add_offset: dict = dict()
+
+    # Number of rows sent per write in the COPY BINARY ingest path
+    copy_batch_size: int = 50_000
+    # Postgres wire types of the along_track columns written with COPY BINARY
+    along_track_copy_dtypes: dict = {
+        "track": "i2",
+        "cycle": "i2",
+        "latitude": "f8",
+        "longitude": "f8",
+        "sla_unfiltered": "i2",
+        "sla_filtered": "i2",
+        "date_time": "i8",
+        "dac": "i2",
+        "ocean_tide": "i2",
+        "internal_tide": "i2",
+        "lwe": "i2",
+        "mdt": "i2",
+        "tpa_correction": "i2",
+        "basin_id": "i2",
+    }
+
     missions = ['al', 'alg', 'c2', 'c2n', 'e1g', 'e1', 'e2', 'en', 'enn', 'g2', 'h2a', 'h2b', 'j1g', 'j1', 'j1n', 'j2g',
                 'j2', 'j2n', 'j3', 'j3n', 's3a', 's3b', 's6a', 'tp', 'tpn']
 
     def __init__(self):
         super().__init__()
+        self.partition_manager = AlongTrackPartitionManager()
+        # Whether this instance made sure the ingest manifest table exists
+        self._ingest_manifest_ready = False
 
     @staticmethod
     def along_track_variable_metadata():
@@ -211,52 +292,88 @@ class OceanDBETl(OceanDB):
     def extract_dataset_metadata(self, ds: nc.Dataset, file: Path) -> AlongTrackMetaData:
         return AlongTrackMetaData.from_netcdf(ds, file_name=file.name)
 
-    def extract_data_from_netcdf(self, ds: nc.Dataset, file: Path) -> AlongTrackData:
+    # Variables read as raw packed integers, the scale factors are applied in the queries
+    packed_variables = [
+        'sla_unfiltered', 'sla_filtered', 'ocean_tide', 'internal_tide', 'lwe', 'mdt', 'dac', 'tpa_correction'
+    ]
+
+    def read_along_track_variables(self, ds: nc.Dataset) -> Dict[str, np.ndarray]:
         """
-        Parse & transform NetCDF file
+        Read the along track variables of an open NetCDF file, the packed variables are not scaled
         """
-        mission = file.name.split('_')[2]
-        try:
-            ds.variables['sla_unfiltered'].set_auto_maskandscale(False)
-            ds.variables['sla_filtered'].set_auto_maskandscale(False)
-            ds.variables['ocean_tide'].set_auto_maskandscale(False)
-            ds.variables['internal_tide'].set_auto_maskandscale(False)
-            ds.variables['lwe'].set_auto_maskandscale(False)
-            ds.variables['mdt'].set_auto_maskandscale(False)
-            ds.variables['dac'].set_auto_maskandscale(False)
-            ds.variables['tpa_correction'].set_auto_maskandscale(False)
-
-            time_data = ds.variables['time']  # Extract dates from the dataset and convert them to standard datetime
-            time_data = nc.num2date(time_data[:], time_data.units, only_use_cftime_datetimes=False,
-                                    only_use_python_datetimes=False)
-            time_data = nc.date2num(time_data[:],
-                                    "microseconds since 2000-01-01 00:00:00")  # Convert the standard date back to the 8-byte integer PSQL uses
-
-            basin_id = self.basin_mask(ds.variables['latitude'][:], ds.variables['longitude'][:])
-
-            data = AlongTrackData(
-                time=time_data,
-                latitude=ds.variables["latitude"][:],
-                longitude=ds.variables["longitude"][:],
-                cycle=ds.variables["cycle"][:],
-                track=ds.variables["track"][:],
-                sla_unfiltered=ds.variables["sla_unfiltered"][:],
-                sla_filtered=ds.variables["sla_filtered"][:],
-                dac=ds.variables["dac"][:],
-                ocean_tide=ds.variables["ocean_tide"][:],
-                internal_tide=ds.variables["internal_tide"][:],
-                lwe=ds.variables["lwe"][:],
-                mdt=ds.variables["mdt"][:],
-                tpa_correction=ds.variables["tpa_correction"][:],
-                basin_id=basin_id,
-                mission=mission,
-                file_name=file.name
+        for var_name in self.packed_variables:
+            ds.variables[var_name].set_auto_maskandscale(False)
+        variables = {
+            var_name: ds.variables[var_name][:]
+            for var_name in ['latitude', 'longitude', 'cycle', 'track'] + self.packed_variables
+        }
+        time_variable = ds.variables['time']
+        variables['time'] = time_variable[:]
+        variables['time_units'] = time_variable.units
+        variables['time_calendar'] = getattr(time_variable, 'calendar', 'standard')
+        return variables
+
+    def transform_along_track_variables(
+            self,
+            variables: Dict[str, np.ndarray],
+            file: Path,
+            timings: Optional[Dict[str, float]] = None,
+    ) -> AlongTrackData:
+        """
+        Convert the time to Postgres microseconds & look up the basin of every point.
+        The time & basin_mask stages are added to timings, which becomes the AlongTrackData timings.
+        """
+        timings = {} if timings is None else timings
+        # Convert "days since 1950" straight to the 8-byte integer PSQL uses, without Python datetimes
+        with stage_timer(timings, "time"):
+            time_data = netcdf_time_to_postgres_microseconds(
+                variables['time'],
+                units=variables['time_units'],
+                calendar=variables['time_calendar']
             )
+
+        with stage_timer(timings, "basin_mask"):
+            basin_id = self.basin_mask(variables['latitude'], variables['longitude'])
+
+        return AlongTrackData(
+            time=time_data,
+            latitude=variables["latitude"],
+            longitude=variables["longitude"],
+            cycle=variables["cycle"],
+            track=variables["track"],
+            sla_unfiltered=variables["sla_unfiltered"],
+            sla_filtered=variables["sla_filtered"],
+            dac=variables["dac"],
+            ocean_tide=variables["ocean_tide"],
+            internal_tide=variables["internal_tide"],
+            lwe=variables["lwe"],
+            mdt=variables["mdt"],
+            tpa_correction=variables["tpa_correction"],
+            basin_id=basin_id,
+            mission=file.name.split('_')[2],
+            file_name=file.name,
+            timings=timings,
+        )
+
+    def extract_data_from_netcdf(
+            self,
+            ds: nc.Dataset,
+            file: Path,
+            timings: Optional[Dict[str, float]] = None,
+    ) -> Optional[AlongTrackData]:
+        """
+        Parse & transform NetCDF file, timing the read, time & basin_mask stages into timings
+        """
+        timings = {} if timings is None else timings
+        try:
+            with stage_timer(timings, "read"):
+                variables = self.read_along_track_variables(ds)
+            data = self.transform_along_track_variables(variables, file, timings)
             ds.close()
             return data
 
         except Exception as ex:
-            print(ex)
+            self.logger.error(f"Could not extract along track data from {file.name}: {ex!r}")
 
     def insert_basins_data(self):
         with self.load_module_file(module="OceanDB.data", filename="basins/ocean_basins.csv", mode="r") as f:
@@ -304,36 +421,14 @@ class OceanDBETl(OceanDB):
         print(f"Inserted {len(df)} rows in to the basins table")
 
 
-    @cached_property
-    def basin_mask_data(self):
-        """
-        Load the basin mask NetCDF file packaged with the module.
-        Returns the 'basinmask' variable as a NumPy array.
-        """
-        # Open resource file via importlib.resources
-        with self.load_module_file("OceanDB.data", "basin_masks/new_basin_mask.nc", mode="rb") as f:
-            ds = nc.Dataset("inmemory.nc", memory=f.read())  # load from memory buffer
-            ds.set_auto_mask(False)
-            basin_mask = ds.variables["basinmask"][:]
-            ds.close()
-            return basin_mask
-
-    def basin_mask(self, latitude, longitude):
-        onesixth = 1 / 6
-        i = np.floor((latitude + 90) / onesixth).astype(int)
-        j = np.floor((longitude % 360) / onesixth).astype(int)
-        mask_data = self.basin_mask_data
-        basin_mask = mask_data[i, j]
-        return basin_mask
-
-
-    def import_along_track_data_to_postgresql(self, along_track_data: AlongTrackData):
+    def import_along_track_data_to_postgresql(self, along_track_data: AlongTrackData, connection: Optional[pg.Connection] = None):
         """
         Cast the AlongTrackData to a Pandas DataFrame
+
+        If a connection is passed the caller owns the transaction.
         """
 
-        EPOCH = datetime(2000, 1, 1)
-        date_times = [EPOCH + timedelta(microseconds=int(t)) for t in along_track_data.time]
+        date_times = postgres_microseconds_to_datetime64(along_track_data.time).tolist()
 
         # 1. Define the INSERT query
         insert_query = sql.SQL("""
@@ -366,12 +461,94 @@ class OceanDBETl(OceanDB):
             ))
 
         # 3. Execute the batch insert
-        with pg.connect(self.config.postgres_dsn) as connection:
+        start = time.perf_counter()
+        if connection is None:
+            with pg.connect(self.config.postgres_dsn) as connection:
+                with connection.cursor() as cursor:
+                    print(f"Starting batch insert of {len(data_to_insert)} rows...")
+                    cursor.executemany(insert_query, data_to_insert)
+                connection.commit()
+                print("Successfully inserted all rows.")
+        else:
             with connection.cursor() as cursor:
-                print(f"Starting batch insert of {len(data_to_insert)} rows...")
                 cursor.executemany(insert_query, data_to_insert)
-            connection.commit()
-            print("Successfully inserted all rows.")
+        duration = time.perf_counter() - start
+        self.logger.info(f"INSERT {len(data_to_insert)} rows in {duration:.2f}s ({len(data_to_insert) / duration:,.0f} rows/s)")
+        return len(data_to_insert)
+
+    def encode_along_track_rows(self, along_track_data: AlongTrackData) -> Tuple[List[str], np.ndarray]:
+        """
+        Encode AlongTrackData as COPY BINARY rows, returns the column names & the structured row array
+        """
+        columns = [
+            ("file_name", along_track_data.file_name),
+            ("mission", along_track_data.mission),
+            ("track", along_track_data.track),
+            ("cycle", along_track_data.cycle),
+            ("latitude", along_track_data.latitude),
+            ("longitude", along_track_data.longitude),
+            ("sla_unfiltered", along_track_data.sla_unfiltered),
+            ("sla_filtered", along_track_data.sla_filtered),
+            ("date_time", along_track_data.time),
+            ("dac", along_track_data.dac),
+            ("ocean_tide", along_track_data.ocean_tide),
+            ("internal_tide", along_track_data.internal_tide),
+            ("lwe", along_track_data.lwe),
+            ("mdt", along_track_data.mdt),
+            ("tpa_correction", along_track_data.tpa_correction),
+            ("basin_id", along_track_data.basin_id),
+        ]
+        rows = encode_binary_copy_rows(columns, self.along_track_copy_dtypes)
+        return [name for name, _ in columns], rows
+
+    @staticmethod
+    def copy_encoded_rows(connection: pg.Connection, table_name: str, columns: List[str], rows: np.ndarray,
+                          batch_size: int):
+        """
+        COPY rows encoded by encode_along_track_rows into table_name, in the caller's transaction
+        """
+        copy_query = sql.SQL("COPY {table} ({fields}) FROM STDIN (FORMAT BINARY)").format(
+            table=sql.Identifier(table_name),
+            fields=sql.SQL(", ").join(sql.Identifier(name) for name in columns),
+        )
+        with connection.cursor() as cursor:
+            with cursor.copy(copy_query) as copy:
+                for batch in iter_binary_copy_batches(rows, batch_size):
+                    copy.write(batch)
+
+    def copy_along_track_data_to_postgresql(
+            self,
+            along_track_data: AlongTrackData,
+            connection: Optional[pg.Connection] = None,
+            batch_size: Optional[int] = None,
+            table_name: Optional[str] = None,
+    ) -> int:
+        """
+        Stream the AlongTrackData arrays into Postgres with COPY ... FROM STDIN (FORMAT BINARY)
+
+        The rows are encoded column-wise from the NumPy buffers (see utils.binary_copy), so no Python object is
+        created per row.  If a connection is passed the caller owns the transaction, otherwise a connection is opened
+        and committed here.
+
+        Returns the number of rows copied.
+        """
+        batch_size = batch_size or self.copy_batch_size
+        table_name = table_name or self.along_track_table_name
+
+        start = time.perf_counter()
+        with stage_timer(along_track_data.timings, "encode"):
+            columns, rows = self.encode_along_track_rows(along_track_data)
+
+        with stage_timer(along_track_data.timings, "load"):
+            if connection is None:
+                with pg.connect(self.config.postgres_dsn) as connection:
+                    self.copy_encoded_rows(connection, table_name, columns, rows, batch_size)
+            else:
+                self.copy_encoded_rows(connection, table_name, columns, rows, batch_size)
+
+        duration = time.perf_counter() - start
+        self.logger.info(f"COPY {len(rows)} rows into {table_name} in {duration:.2f}s ({len(rows) / duration:,.0f} rows/s)")
+        return len(rows)
 
 
     # def import_along_track_data_to_postgresql(self, along_track_data: AlongTrackData):
@@ -410,8 +587,10 @@ class OceanDBETl(OceanDB):
     #                     ])
 
 
-    def import_metadata_to_psql(self, metadata: AlongTrackMetaData) -> None:
-        """Insert metadata into along_track_metadata table, ignoring duplicates."""
+    def import_metadata_to_psql(self, metadata: AlongTrackMetaData, connection: Optional[pg.Connection] = None) -> None:
+        """Insert metadata into along_track_metadata table, ignoring duplicates.
+
+        If a connection is passed the caller owns the transaction."""
         fields = [
             "file_name", "conventions", "metadata_conventions", "cdm_data_type",
             "comment", "contact", "creator_email", "creator_name", "creator_url",
@@ -432,50 +611,359 @@ class OceanDBETl(OceanDB):
             placeholders=sql.SQL(', ').join(sql.Placeholder() * len(fields)),
         )
 
-        with pg.connect(self.connection_string) as conn:
-            with conn.cursor() as cur:
+        if connection is None:
+            with pg.connect(self.connection_string) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query, tuple(metadata.__dict__.values()))
+                conn.commit()
+        else:
+            with connection.cursor() as cur:
                 cur.execute(query, tuple(metadata.__dict__.values()))
-            conn.commit()
         print(f"Inserted Metadata for {metadata.file_name}")
 
     def query_metadata(self):
-        query = "SELECT * FROM along_track_metadata;"
+        query = "SELECT file_name FROM along_track_metadata;"
         with pg.connect(self.connection_string) as connection:
-            with connection.cursor(row_factory=pg.rows.dict_row) as cursor:
+            with connection.cursor() as cursor:
                 cursor.execute(query)
                 rows = cursor.fetchall()
-        return set([metadata['file_name'] for metadata in rows])
+        return set([row[0] for row in rows])
 
+    def ingest_manifest_table_exists(self, connection: pg.Connection) -> bool:
+        """
+        Databases created before the ingest manifest have no manifest table
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (f"public.{self.along_track_ingest_manifest_table_name}",))
+            return cursor.fetchone()[0]
 
-    def process_along_track_file(self, file: Path):
+    def ensure_ingest_manifest_table(self):
         """
-        Processes an along track netcdf file & inserts into Postgres
+        Create the ingest manifest table if missing, once per instance and in its own transaction
         """
-        start = time.perf_counter()
+        if self._ingest_manifest_ready:
+            return
+        query = sql.SQL(self.load_sql_file("tables/create_along_track_ingest_manifest_table.sql")).format(
+            table_name=sql.Identifier(self.along_track_ingest_manifest_table_name)
+        )
+        with pg.connect(self.connection_string) as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(query)
+        self._ingest_manifest_ready = True
 
-        dataset: nc.Dataset = self.load_netcdf(file)
-        along_track_data: AlongTrackData = self.extract_data_from_netcdf(ds=dataset, file=file)
-        along_track_metadata: AlongTrackMetaData = self.extract_dataset_metadata(
-             ds=dataset,
-             file=file
+    def query_manifest(self) -> Dict[str, Tuple[int, int, str]]:
+        """
+        file_name -> (file_size, file_mtime_ns, status) for every file in the ingest manifest, empty if the database has
+        no manifest table yet
+        """
+        query = sql.SQL("SELECT file_name, file_size, file_mtime_ns, status FROM {table}").format(
+            table=sql.Identifier(self.along_track_ingest_manifest_table_name)
+        )
+        with pg.connect(self.connection_string) as connection:
+            if not self.ingest_manifest_table_exists(connection):
+                return {}
+            with connection.cursor() as cursor:
+                cursor.execute(query)
+                return {file_name: (size, mtime_ns, status) for file_name, size, mtime_ns, status in cursor}
+
+    def query_unmanifested_metadata(self) -> set:
+        """
+        Names of files ingested before the manifest existed, i.e. in along_track_metadata but not in the manifest
+        """
+        query = sql.SQL("""
+            SELECT metadata.file_name
+            FROM {metadata} metadata
+            LEFT JOIN {manifest} manifest ON manifest.file_name = metadata.file_name
+            WHERE manifest.file_name IS NULL
+        """).format(
+            metadata=sql.Identifier(self.along_track_metadata_table_name),
+            manifest=sql.Identifier(self.along_track_ingest_manifest_table_name),
         )
-        self.import_along_track_data_to_postgresql(
-             along_track_data=along_track_data
+        with pg.connect(self.connection_string) as connection:
+            if not self.ingest_manifest_table_exists(connection):
+                query = sql.SQL("SELECT file_name FROM {metadata}").format(
+                    metadata=sql.Identifier(self.along_track_metadata_table_name)
+                )
+            with connection.cursor() as cursor:
+                cursor.execute(query)
+                return {row[0] for row in cursor}
+
+    def diff_ingest_manifest(
+            self,
+            files: Iterable[Path],
+            fingerprints: Optional[Dict[Path, FileFingerprint]] = None,
+            stat_workers: int = 32,
+    ) -> IngestManifestDiff:
+        """
+        Compare the files on disk with the ingest manifest.
+
+        A file is new if it is not in the manifest (or its last ingest failed), changed if its size or mtime differ from
+        the manifest.  Only the size & mtime are compared here, the content hash is checked when a changed file is
+        written so a touched but identical file is not reloaded.  Files ingested before the manifest existed are
+        recorded as unchanged, and listed in diff.legacy.  Nothing is written, see prepare_ingest_manifest.
+
+        fingerprints: size & mtime of the files if already known (e.g. from a file catalog), otherwise the files are
+        stat'ed in parallel with stat_workers threads.
+        """
+        files = list(files)
+        manifest = self.query_manifest()
+        legacy_file_names = self.query_unmanifested_metadata()
+        if fingerprints is None:
+            with ThreadPoolExecutor(max_workers=stat_workers) as executor:
+                fingerprints = dict(zip(files, executor.map(FileFingerprint.from_path, files)))
+
+        diff = IngestManifestDiff()
+        for file in files:
+            fingerprint = fingerprints[file]
+            entry = manifest.get(file.name)
+            if entry is None:
+                if file.name in legacy_file_names:
+                    diff.unchanged.append(file)
+                    diff.legacy.append((file.name, fingerprint))
+                else:
+                    diff.new.append(file)
+            elif entry[2] != "complete":
+                diff.new.append(file)
+            elif entry[:2] != (fingerprint.file_size, fingerprint.file_mtime_ns):
+                diff.changed.append(file)
+            else:
+                diff.unchanged.append(file)
+
+        self.logger.info(f"Ingest manifest: {len(diff.new)} new, {len(diff.changed)} changed, {len(diff.unchanged)} unchanged files")
+        return diff
+
+    def prepare_ingest_manifest(self, diff: IngestManifestDiff):
+        """
+        Create the manifest table if missing and record the legacy files of diff, call once the ingest goes ahead
+        """
+        self.ensure_ingest_manifest_table()
+        if diff.legacy:
+            self.record_legacy_manifest_entries(diff.legacy)
+
+    def record_legacy_manifest_entries(self, entries: List[Tuple[str, FileFingerprint]]):
+        """
+        Add manifest entries, without content hash, for files ingested before the manifest existed
+        """
+        copy_query = sql.SQL("COPY {table} (file_name, file_size, file_mtime_ns, status) FROM STDIN").format(
+            table=sql.Identifier(self.along_track_ingest_manifest_table_name)
         )
-        self.import_metadata_to_psql(
-            metadata=along_track_metadata
+        with pg.connect(self.connection_string) as connection:
+            with connection.cursor() as cursor:
+                with cursor.copy(copy_query) as copy:
+                    for file_name, fingerprint in entries:
+                        copy.write_row((file_name, fingerprint.file_size, fingerprint.file_mtime_ns, "complete"))
+        self.logger.info(f"Recorded {len(entries)} previously ingested files in the ingest manifest")
+
+    def manifest_entry(self, connection: pg.Connection, file_name: str) -> Optional[Tuple[Optional[str], str]]:
+        """
+        (content_hash, status) of a file in the ingest manifest, None if the file is not in the manifest
+        """
+        query = sql.SQL("SELECT content_hash, status FROM {table} WHERE file_name = %s").format(
+            table=sql.Identifier(self.along_track_ingest_manifest_table_name)
         )
-        duration = time.perf_counter() - start
-        size_mb = file.stat().st_size / (1024 * 1024)
-        print(f"✅ {file.name} | {size_mb:.2f} MB | {duration:.2f} seconds")
+        with connection.cursor() as cursor:
+            cursor.execute(query, (file_name,))
+            return cursor.fetchone()
+
+    def record_manifest_entry(
+            self,
+            connection: pg.Connection,
+            file_name: str,
+            fingerprint: FileFingerprint,
+            row_count: int,
+            ingest_seconds: float,
+    ):
+        """
+        Record a completed ingest in the manifest, in the caller's transaction
+        """
+        query = sql.SQL("""
+            INSERT INTO {table} (file_name, file_size, file_mtime_ns, content_hash, row_count, ingest_seconds, status)
+            VALUES (%s, %s, %s, %s, %s, %s, 'complete')
+            ON CONFLICT (file_name) DO UPDATE SET
+                file_size = EXCLUDED.file_size,
+                file_mtime_ns = EXCLUDED.file_mtime_ns,
+                content_hash = EXCLUDED.content_hash,
+                row_count = EXCLUDED.row_count,
+                ingest_seconds = EXCLUDED.ingest_seconds,
+                status = EXCLUDED.status,
+                updated_at = now()
+        """).format(table=sql.Identifier(self.along_track_ingest_manifest_table_name))
+        with connection.cursor() as cursor:
+            cursor.execute(query, (
+                file_name, fingerprint.file_size, fingerprint.file_mtime_ns, fingerprint.content_hash, row_count,
+                ingest_seconds,
+            ))
 
+    def touch_manifest_entry(self, connection: pg.Connection, file_name: str, fingerprint: FileFingerprint):
+        """
+        Record the new size & mtime of a file whose content is unchanged, keeping its row count & ingest time
+        """
+        query = sql.SQL("""
+            UPDATE {table} SET file_size = %s, file_mtime_ns = %s, updated_at = now()
+            WHERE file_name = %s
+        """).format(table=sql.Identifier(self.along_track_ingest_manifest_table_name))
+        with connection.cursor() as cursor:
+            cursor.execute(query, (fingerprint.file_size, fingerprint.file_mtime_ns, file_name))
 
-    #     return along_track_data, along_track_metadata
-    #
-    # def ingest_along_track_file(self, along_track_data: AlongTrackData, along_track_metadata: AlongTrackMetaData):
-    #     self.import_along_track_data_to_postgresql(
-    #          along_track_data=along_track_data
-    #     )
-    #     self.import_metadata_to_psql(
-    #         metadata=along_track_metadata
-    #     )
+    def record_failed_manifest_entry(self, connection: pg.Connection, file_name: str, fingerprint: FileFingerprint):
+        """
+        Mark a file as failed so the next run retries it.  The hash & row count of a previous successful ingest are kept
+        since its rows are still in along_track.
+        """
+        query = sql.SQL("""
+            INSERT INTO {table} (file_name, file_size, file_mtime_ns, status)
+            VALUES (%s, %s, %s, 'failed')
+            ON CONFLICT (file_name) DO UPDATE SET status = EXCLUDED.status, updated_at = now()
+        """).format(table=sql.Identifier(self.along_track_ingest_manifest_table_name))
+        with connection.cursor() as cursor:
+            cursor.execute(query, (file_name, fingerprint.file_size, fingerprint.file_mtime_ns))
+
+    def delete_along_track_file(self, connection: pg.Connection, file_name: str):
+        """
+        Remove the rows & metadata of a previously ingested file, in the caller's transaction
+        """
+        with connection.cursor() as cursor:
+            for table in [self.along_track_table_name, self.along_track_metadata_table_name]:
+                cursor.execute(
+                    sql.SQL("DELETE FROM {table} WHERE file_name = %s").format(table=sql.Identifier(table)),
+                    (file_name,)
+                )
+
+
+    def extract_along_track_file(self, file: Path) -> Tuple[Optional[AlongTrackData], AlongTrackMetaData]:
+        """
+        Decode an along track netcdf file into AlongTrackData & AlongTrackMetaData, without touching Postgres
+        """
+        timings = {}
+        # Read the file once, to hash it and to decode it from memory
+        with stage_timer(timings, "open"):
+            fingerprint = FileFingerprint.from_path(file)
+            content = file.read_bytes()
+            fingerprint.content_hash = hashlib.blake2b(content, digest_size=16).hexdigest()
+            dataset = nc.Dataset(file.name, memory=content)
+
+        # metadata first, extract_data_from_netcdf closes the dataset
+        with stage_timer(timings, "read"):
+            along_track_metadata: AlongTrackMetaData = self.extract_dataset_metadata(
+                 ds=dataset,
+                 file=file
+            )
+        along_track_data: AlongTrackData = self.extract_data_from_netcdf(ds=dataset, file=file, timings=timings)
+        if along_track_data is not None:
+            along_track_data.fingerprint = fingerprint
+        return along_track_data, along_track_metadata
+
+    def invalidate_query_caches(self, first: datetime, last: datetime):
+        """
+        Invalidate cached AlongTrack query windows overlapping [first, last], call once the rows are committed
+        """
+        invalidate_query_caches(first, last, self.config.query_cache_directory)
+
+    def ingest_along_track_file(
+            self,
+            along_track_data: AlongTrackData,
+            along_track_metadata: AlongTrackMetaData,
+            connection: Optional[pg.Connection] = None,
+            loader: str = "copy",
+            batch_size: Optional[int] = None,
+    ) -> int:
+        """
+        Write decoded along track data & metadata to Postgres
+
+        loader: "copy" streams the rows with COPY BINARY, "insert" uses the original executemany INSERT path
+        batch_size: number of rows per COPY write, defaults to copy_batch_size
+        connection: if passed, the caller owns the transaction, and calls invalidate_query_caches after committing
+
+        If the data carries a file fingerprint the ingest manifest is updated in the same transaction: a file whose
+        content hash matches its last complete ingest is skipped, a changed file replaces its previous rows.
+        The along_track partitions covering the data's time range are created first if missing, a file with no
+        measurements only records its metadata & manifest entry.
+
+        Returns the number of rows written.
+        """
+        if connection is None:
+            with pg.connect(self.config.postgres_dsn) as connection:
+                rows = self.ingest_along_track_file(
+                    along_track_data, along_track_metadata, connection=connection, loader=loader, batch_size=batch_size
+                )
+            if rows:
+                self.invalidate_query_caches(*along_track_data.time_range())
+            return rows
+
+        start = time.perf_counter()
+        timings = along_track_data.timings
+        # A file without measurements has no time range, and no rows that need a partition
+        if len(along_track_data.time):
+            with stage_timer(timings, "load"):
+                self.partition_manager.ensure_partitions(*along_track_data.time_range())
+        fingerprint = along_track_data.fingerprint
+        if fingerprint is not None:
+            with stage_timer(timings, "metadata"):
+                self.ensure_ingest_manifest_table()
+                entry = self.manifest_entry(connection, along_track_data.file_name)
+                if entry is not None:
+                    content_hash, status = entry
+                    if status == "complete" and content_hash == fingerprint.content_hash:
+                        self.touch_manifest_entry(connection, along_track_data.file_name, fingerprint)
+                        self.logger.info(f"{along_track_data.file_name} content is unchanged, skipping")
+                        return 0
+            if entry is not None:
+                with stage_timer(timings, "load"):
+                    self.delete_along_track_file(connection, along_track_data.file_name)
+
+        if loader == "copy":
+            rows = self.copy_along_track_data_to_postgresql(
+                along_track_data=along_track_data,
+                connection=connection,
+                batch_size=batch_size
+            )
+        elif loader == "insert":
+            with stage_timer(timings, "load"):
+                rows = self.import_along_track_data_to_postgresql(
+                     along_track_data=along_track_data,
+                     connection=connection
+                )
+        else:
+            raise ValueError(f"Unknown loader {loader}, expected 'copy' or 'insert'")
+        with stage_timer(timings, "metadata"):
+            self.import_metadata_to_psql(
+                metadata=along_track_metadata,
+                connection=connection
+            )
+            if fingerprint is not None:
+                self.record_manifest_entry(
+                    connection, along_track_data.file_name, fingerprint, rows, time.perf_counter() - start
+                )
+        return rows
+
+    def process_along_track_file(
+            self,
+            file: Path,
+            loader: str = "copy",
+            batch_size: Optional[int] = None,
+            metrics: Optional[IngestMetrics] = None,
+    ) -> int:
+        """
+        Processes an along track netcdf file & inserts into Postgres
+
+        loader: "copy" streams the rows with COPY BINARY, "insert" uses the original executemany INSERT path
+        batch_size: number of rows per COPY write, defaults to copy_batch_size
+        metrics: records the file's per stage timings
+        """
+        along_track_data, along_track_metadata = self.extract_along_track_file(file)
+        if along_track_data is None:
+            self.logger.warning(f"Skipping {file.name}, could not extract data")
+            if metrics is not None:
+                metrics.record_failure(file.name, "could not extract data")
+            return 0
+        rows = self.ingest_along_track_file(
+            along_track_data=along_track_data,
+            along_track_metadata=along_track_metadata,
+            loader=loader,
+            batch_size=batch_size
+        )
+        size = along_track_data.fingerprint.file_size
+        if metrics is not None:
+            metrics.record_file(file.name, along_track_data.timings, rows, size)
+        self.logger.info(f"{file.name} | {size / 2 ** 20:.2f} MB | {rows} rows | {format_timings(along_track_data.timings)}")
+        return rows
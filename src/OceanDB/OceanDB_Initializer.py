@@ -7,13 +7,17 @@ import yaml
 from importlib import resources
 import time
 import pandas as pd
-from typing import IO
-from datetime import datetime
+from typing import IO, Dict, List, Optional, Set
+from datetime import datetime, timedelta
+import queue
+import threading
 from dateutil.relativedelta import relativedelta
 
 from sqlalchemy import text
 
 from OceanDB.OceanDB import OceanDB
+from OceanDB.OceanDB_Partitions import AlongTrackPartitionManager
+from OceanDB.utils.sql_registry import sql_registry
 
 table_definitions = [
     {
@@ -31,6 +35,11 @@ table_definitions = [
         "filepath": "tables/create_along_track_table.sql",
         "params": {"table_name": "along_track"},
     },
+    {
+        "name": "along_track_ingest_manifest",
+        "filepath": "tables/create_along_track_ingest_manifest_table.sql",
+        "params": {"table_name": "along_track_ingest_manifest"},
+    },
     {
         "name": "basin_connection",
         "filepath": "tables/create_basin_connection_table.sql",
@@ -55,52 +64,52 @@ sql_index_files = [
     {
         "name": "along_track_index_basin",
         "filepath": "indices/create_along_track_index_basin.sql",
-        "params": {"index_name": "along_track_index_basin"},
+        "params": {"index_name": "along_track_basin_idx", "table_name": "along_track"},
     },
     {
         "name": "along_track_index_date",
         "filepath": "indices/create_along_track_index_date.sql",
-        "params": {"index_name": "along_track_index_date"},
+        "params": {"index_name": "along_track_date_idx", "table_name": "along_track"},
     },
     {
         "name": "along_track_index_filename",
         "filepath": "indices/create_along_track_index_filename.sql",
-        "params": {"index_name": "along_track_index_filename"},
+        "params": {"index_name": "along_track_file_name_idx", "table_name": "along_track"},
     },
     {
         "name": "along_track_index_mission",
         "filepath": "indices/create_along_track_index_mission.sql",
-        "params": {"index_name": "along_track_index_mission"},
+        "params": {"index_name": "along_track_mission_idx", "table_name": "along_track"},
     },
     {
         "name": "along_track_index_point",
         "filepath": "indices/create_along_track_index_point.sql",
-        "params": {"index_name": "along_track_index_point"},
+        "params": {"index_name": "along_track_point_idx", "table_name": "along_track"},
     },
     {
         "name": "along_track_index_point_date",
         "filepath": "indices/create_along_track_index_point_date.sql",
-        "params": {"index_name": "along_track_index_point_date"},
+        "params": {"index_name": "along_track_point_date_idx", "table_name": "along_track"},
     },
     {
         "name": "along_track_index_point_date_mission",
         "filepath": "indices/create_along_track_index_point_date_mission.sql",
-        "params": {"index_name": "along_track_index_point_date_mission"},
+        "params": {"index_name": "along_track_point_date_mission_idx", "table_name": "along_track"},
     },
     {
         "name": "along_track_index_point_date_mission_basin",
         "filepath": "indices/create_along_track_index_point_date_mission_basin.sql",
-        "params": {"index_name": "along_track_index_point_date_mission_basin"},
+        "params": {"index_name": "along_track_point_date_mission_basin_idx", "table_name": "along_track"},
     },
     {
         "name": "along_track_index_point_geom",
         "filepath": "indices/create_along_track_index_point_geom.sql",
-        "params": {"index_name": "along_track_index_point_geom"},
+        "params": {"index_name": "along_track_point_geom_idx", "table_name": "along_track"},
     },
     {
         "name": "along_track_index_time",
         "filepath": "indices/create_along_track_index_time.sql",
-        "params": {"index_name": "along_track_index_time"},
+        "params": {"index_name": "along_track_time_idx", "table_name": "along_track"},
     },
     {
         "name": "basin_connection_index_basin_id",
@@ -151,6 +160,15 @@ sql_index_files = [
 
 
 
+# SQL functions used by the queries, CREATE OR REPLACE so re-running init updates them
+sql_function_files = [
+    {
+        "name": "spherical_transverse_mercator",
+        "filepath": "functions/create_spherical_transverse_mercator_functions.sql",
+        "params": {},
+    },
+]
+
 EXPECTED_TABLE_INDEXES = {
     "along_track": {
         "along_track_basin_idx",
@@ -182,9 +200,21 @@ EXPECTED_TABLE_INDEXES = {
 
 
 class OceanDBInit(OceanDB):
+    along_track_table_name: str = "along_track"
+
     def __init__(self):
         super().__init__()
 
+    @property
+    def along_track_index_files(self) -> List[dict]:
+        """
+        The secondary indexes of along_track, i.e. everything except the primary key & unique constraint
+        """
+        return [
+            index for index in sql_index_files
+            if index["params"].get("table_name") == self.along_track_table_name
+        ]
+
     def create_database(self):
         # Create the Database
         with pg.connect(self.config.postgres_dsn_admin) as conn:
@@ -226,42 +256,163 @@ class OceanDBInit(OceanDB):
             self.execute_query(index, query)
             self.logger.info(f"Executing {table_name}")
 
+    def create_functions(self):
+        for function in sql_function_files:
+            function_name = function['name']
+            query = self.parametrize_sql_statements(function)
+            self.execute_query(function, query)
+            self.logger.info(f"Executing {function_name}")
+
     def create_partitions(self, min_date, max_date):
         """
-        Create a partition for each month between min_date & max_date
+        Create the partitions missing between min_date & max_date, sized per Config.along_track_partition_eras.
+        Partitions are also created on demand during ingest, this pre-creates a range.
         Args:
         min_date (str | datetime): start date, e.g. "2020-01-01"
-        max_date (str | datetime): end date, e.g. "2020-06-01"
+        max_date (str | datetime): end date (exclusive), e.g. "2020-06-01"
         """
         if isinstance(min_date, str):
             min_date = datetime.strptime(min_date, "%Y-%m-%d")
         if isinstance(max_date, str):
             max_date = datetime.strptime(max_date, "%Y-%m-%d")
 
-        query_filepath = "tables/create_along_track_table_partition.sql"
+        AlongTrackPartitionManager().ensure_partitions(min_date, max_date - timedelta(microseconds=1))
 
-        table_name = "along_track"
-        current = min_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-        sql_statement = self.load_sql(query_filepath)
+    def along_track_partitions(self) -> List[str]:
+        """
+        Names of the partitions currently attached to along_track
+        """
+        query = """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            ORDER BY child.relname
+        """
+        with pg.connect(self.config.postgres_dsn) as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, (f"public.{self.along_track_table_name}",))
+                return [row[0] for row in cur.fetchall()]
+
+    def along_track_index_statement(self, index: dict, table_name: str, index_name: str, only: bool = False) -> sql.Composed:
+        """
+        Render an along_track index template for any table with the along_track layout (a partition, a staging table)
+
+        only: create the index on the partitioned parent only (ON ONLY), it stays invalid until an index is attached
+        for every partition
+        """
+        table = sql.Identifier(table_name)
+        if only:
+            table = sql.SQL("ONLY {}").format(table)
+        return sql.SQL(self.load_sql(index["filepath"])).format(
+            index_name=sql.Identifier(index_name),
+            table_name=table,
+        )
+
+    @staticmethod
+    def partition_index_name(partition_name: str, index_name: str) -> str:
+        """
+        along_track_basin_idx -> along_track_2013_03_basin_idx
+        """
+        return f"{partition_name}_{index_name.removeprefix('along_track_')}"
 
-        while current < max_date:
-            next_month = (current + relativedelta(months=1)).replace(day=1)
-            partition_name = f"{table_name}_{current.year}_{current.month:02d}"
+    def drop_along_track_indices(self):
+        """
+        Drop the secondary along_track indexes ahead of a bulk load.
 
-            safe_params = {
-                "partition_name": sql.Identifier(partition_name),
-                "table_name": sql.Identifier(table_name),
-                "min_partition_date": sql.Literal(current.strftime("%Y-%m-%d")),
-                "max_partition_date": sql.Literal(next_month.strftime("%Y-%m-%d")),
-            }
-            # Safely construct SQL
-            query = sql.SQL(sql_statement).format(**safe_params)
-            self.execute_query(query=query, table=partition_name)
+        Postgres does not allow dropping the index of a single attached partition, so the partitioned index is dropped
+        on the parent, which drops it on every partition.  The primary key and the unique (date_time, latitude,
+        longitude) constraint are kept so duplicate rows are still rejected during the load.
+        """
+        with pg.connect(self.config.postgres_dsn) as conn:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                for index in self.along_track_index_files:
+                    index_name = index["params"]["index_name"]
+                    cur.execute(sql.SQL("DROP INDEX IF EXISTS {}").format(sql.Identifier(index_name)))
+                    self.logger.info(f"Dropped {index_name}")
 
-            print(f"Created partition {partition_name}")
-            current = next_month
+    def rebuild_along_track_indices(self, workers: int = 4, maintenance_work_mem: str = "1GB"):
+        """
+        Rebuild the secondary along_track indexes partition by partition on concurrent connections.
+
+        Each partitioned index is first created ON ONLY the parent (invalid, no build), then every partition's index is
+        built by one of `workers` connections with a raised maintenance_work_mem and attached to the parent.  The
+        parent index becomes valid once every partition is attached.
+        """
+        partitions = self.along_track_partitions()
+
+        with pg.connect(self.config.postgres_dsn) as conn:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                for index in self.along_track_index_files:
+                    cur.execute(self.along_track_index_statement(
+                        index, self.along_track_table_name, index["params"]["index_name"], only=True
+                    ))
+
+        tasks = queue.Queue()
+        for partition_name in partitions:
+            for index in self.along_track_index_files:
+                tasks.put((partition_name, index))
+        errors = []
+
+        def build():
+            with pg.connect(self.config.postgres_dsn) as conn:
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute("SELECT set_config('maintenance_work_mem', %s, false)", (maintenance_work_mem,))
+                    while True:
+                        try:
+                            partition_name, index = tasks.get_nowait()
+                        except queue.Empty:
+                            return
+                        parent_index_name = index["params"]["index_name"]
+                        index_name = self.partition_index_name(partition_name, parent_index_name)
+                        start = time.perf_counter()
+                        try:
+                            cur.execute(self.along_track_index_statement(index, partition_name, index_name))
+                            cur.execute(sql.SQL("ALTER INDEX {} ATTACH PARTITION {}").format(
+                                sql.Identifier(parent_index_name), sql.Identifier(index_name)
+                            ))
+                        except Exception as ex:
+                            errors.append(f"{index_name}: {ex}")
+                            continue
+                        self.logger.info(f"Built {index_name} in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=build) for _ in range(max(1, workers))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.logger.info(f"Rebuilt along_track indices on {len(partitions)} partitions in {time.perf_counter() - start:.2f}s")
+
+        if errors:
+            raise RuntimeError("Failed to build along_track indices:\n" + "\n".join(errors))
+        self.validate_along_track_indices()
+
+    def validate_along_track_indices(self):
+        """
+        Check that every index in EXPECTED_TABLE_INDEXES["along_track"] exists and is valid
+        """
+        query = """
+            SELECT index_class.relname, pg_index.indisvalid
+            FROM pg_index
+            JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+            WHERE pg_index.indrelid = %s::regclass
+        """
+        with pg.connect(self.config.postgres_dsn) as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, (f"public.{self.along_track_table_name}",))
+                indexes: Dict[str, bool] = dict(cur.fetchall())
 
+        expected: Set[str] = EXPECTED_TABLE_INDEXES[self.along_track_table_name]
+        missing = expected - set(indexes)
+        invalid = {name for name in expected & set(indexes) if not indexes[name]}
+        if missing or invalid:
+            raise RuntimeError(f"along_track indices missing: {sorted(missing)}, invalid: {sorted(invalid)}")
+        self.logger.info(f"All {len(expected)} along_track indices are valid")
 
     def parametrize_sql_statements(self, table):
         """
@@ -294,11 +445,7 @@ class OceanDBInit(OceanDB):
         return query
 
     def load_sql(self, filename: str) -> str:
-        # with resources.files(self.sql_pkg).joinpath(filename).open("r", encoding="utf-8") as f:
-        #     tokenized_query = f.read()
-        with self.load_module_file( "OceanDB.sql", filename, mode="r", encoding="utf-8") as f:
-            tokenized_query = f.read()
-            return tokenized_query
+        return sql_registry.get(filename)
 
     def validate_schema(self):
         """
@@ -0,0 +1,313 @@
+"""
+On-demand along_track partition management
+
+Partitions are created as data arrives: before a file is loaded, the partitions covering its time range are created if
+missing.  The partition size depends on the era of the data (see parse_partition_eras), e.g. yearly partitions for the
+sparse single mission 1990s and monthly or weekly ones when many missions fly at once, which keeps the number of
+partitions, and so planning time, proportional to the data.  Existing partitions can be merged or split later.
+"""
+import re
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import psycopg as pg
+from psycopg import sql
+from dateutil.relativedelta import relativedelta
+
+from OceanDB.OceanDB import OceanDB
+
+GRANULARITIES = ["week", "month", "year"]
+
+# Serializes partition DDL across ingest processes, pg_advisory_xact_lock key
+PARTITION_LOCK_KEY = 0x0CEAD801
+
+_BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+@dataclass(frozen=True)
+class PartitionRange:
+    """An along_track partition covering [start, end)"""
+    name: str
+    start: datetime
+    end: datetime
+
+    def contains(self, date: datetime) -> bool:
+        return self.start <= date < self.end
+
+
+def parse_partition_eras(eras: str) -> List[Tuple[datetime, str]]:
+    """
+    Parse "1990-01-01=year,2002-01-01=month,2016-01-01=week" into [(start, granularity)] sorted by start.
+    The first era also applies to earlier dates.
+    """
+    parsed = []
+    for era in eras.split(","):
+        start, _, granularity = era.strip().partition("=")
+        granularity = granularity.strip()
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown partition granularity '{granularity}', expected one of {GRANULARITIES}")
+        parsed.append((datetime.fromisoformat(start.strip()), granularity))
+    if not parsed:
+        raise ValueError("At least one partition era is required")
+    return sorted(parsed)
+
+
+def granularity_range(date: datetime, granularity: str) -> Tuple[datetime, datetime]:
+    """
+    The week (starting Monday), month or year containing date
+    """
+    day = datetime(date.year, date.month, date.day)
+    if granularity == "week":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    if granularity == "month":
+        start = day.replace(day=1)
+        return start, start + relativedelta(months=1)
+    if granularity == "year":
+        start = day.replace(month=1, day=1)
+        return start, start + relativedelta(years=1)
+    raise ValueError(f"Unknown partition granularity '{granularity}', expected one of {GRANULARITIES}")
+
+
+def partition_name(start: datetime, end: datetime, table_name: str = "along_track") -> str:
+    """
+    along_track_2013 for a year, along_track_2013_03 for a month, along_track_2013_w11 for an ISO week and
+    along_track_20130301_20130415 for any other range
+    """
+    if start == datetime(start.year, 1, 1) and end == start + relativedelta(years=1):
+        return f"{table_name}_{start.year}"
+    if start == datetime(start.year, start.month, 1) and end == start + relativedelta(months=1):
+        return f"{table_name}_{start.year}_{start.month:02d}"
+    if start == datetime(start.year, start.month, start.day) and start.weekday() == 0 and end == start + timedelta(days=7):
+        iso_year, iso_week, _ = start.isocalendar()
+        return f"{table_name}_{iso_year}_w{iso_week:02d}"
+    return f"{table_name}_{start:%Y%m%d}_{end:%Y%m%d}"
+
+
+def parse_partition_bound(bound: str) -> Tuple[datetime, datetime]:
+    """
+    Parse pg_get_expr(relpartbound), e.g. FOR VALUES FROM ('2013-03-01 00:00:00') TO ('2013-04-01 00:00:00')
+    """
+    match = _BOUND_PATTERN.search(bound)
+    if match is None:
+        raise ValueError(f"Unsupported partition bound {bound}")
+    return datetime.fromisoformat(match.group(1)), datetime.fromisoformat(match.group(2))
+
+
+def plan_partitions(
+        min_date: datetime,
+        max_date: datetime,
+        eras: Sequence[Tuple[datetime, str]],
+        existing: Iterable[PartitionRange],
+        table_name: str = "along_track",
+) -> List[PartitionRange]:
+    """
+    Partitions to create so that every date in [min_date, max_date] is covered.
+
+    Each new partition spans the week/month/year of its era, clipped to the era and to the gaps between existing
+    partitions so it never overlaps them.
+    """
+    ranges = sorted(existing, key=lambda partition: partition.start)
+    era_starts = [start for start, _ in eras]
+    planned = []
+    date = min_date
+    while date <= max_date:
+        cover = next((partition for partition in ranges if partition.contains(date)), None)
+        if cover is not None:
+            date = cover.end
+            continue
+
+        era_index = max(0, sum(1 for start in era_starts if start <= date) - 1)
+        start, end = granularity_range(date, eras[era_index][1])
+        if era_index > 0:
+            start = max(start, era_starts[era_index])
+        if era_index + 1 < len(era_starts):
+            end = min(end, era_starts[era_index + 1])
+        for partition in ranges:
+            if partition.end <= date:
+                start = max(start, partition.end)
+            elif partition.start > date:
+                end = min(end, partition.start)
+
+        new_partition = PartitionRange(partition_name(start, end, table_name), start, end)
+        planned.append(new_partition)
+        ranges = sorted(ranges + [new_partition], key=lambda partition: partition.start)
+        date = end
+    return planned
+
+
+class AlongTrackPartitionManager(OceanDB):
+    """
+    Create, merge, split & drop along_track partitions.
+
+    eras: partition granularity per era, e.g. "1990-01-01=year,2002-01-01=month", defaults to
+    Config.along_track_partition_eras
+    """
+
+    along_track_table_name: str = 'along_track'
+
+    # Every stored column of along_track, along_track_point is generated
+    along_track_columns = [
+        "id", "file_name", "mission", "track", "cycle", "latitude", "longitude", "sla_unfiltered", "sla_filtered",
+        "date_time", "dac", "ocean_tide", "internal_tide", "lwe", "mdt", "tpa_correction", "basin_id",
+    ]
+
+    def __init__(self, eras: Optional[str] = None):
+        super().__init__()
+        self.eras = parse_partition_eras(eras or self.config.along_track_partition_eras)
+        # Partitions known to exist, so files falling in them do not query the catalog
+        self._known_partitions: List[PartitionRange] = []
+
+    def existing_partitions(self, cursor: pg.Cursor) -> List[PartitionRange]:
+        cursor.execute("""
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+        """, (f"public.{self.along_track_table_name}",))
+        partitions = []
+        for name, bound in cursor.fetchall():
+            if bound == "DEFAULT":
+                continue
+            start, end = parse_partition_bound(bound)
+            partitions.append(PartitionRange(name, start, end))
+        return sorted(partitions, key=lambda partition: partition.start)
+
+    def list_partitions(self) -> List[PartitionRange]:
+        with pg.connect(self.config.postgres_dsn) as connection:
+            with connection.cursor() as cursor:
+                return self.existing_partitions(cursor)
+
+    def _covered(self, min_date: datetime, max_date: datetime) -> bool:
+        date = min_date
+        while date <= max_date:
+            cover = next((partition for partition in self._known_partitions if partition.contains(date)), None)
+            if cover is None:
+                return False
+            date = cover.end
+        return True
+
+    def _create_partition(self, cursor: pg.Cursor, partition: PartitionRange):
+        cursor.execute(sql.SQL(self.load_sql_file("tables/create_along_track_table_partition.sql")).format(
+            partition_name=sql.Identifier(partition.name),
+            table_name=sql.Identifier(self.along_track_table_name),
+            min_partition_date=sql.Literal(partition.start),
+            max_partition_date=sql.Literal(partition.end),
+        ))
+
+    def ensure_partitions(self, min_date: datetime, max_date: datetime,
+                          connection: Optional[pg.Connection] = None) -> List[PartitionRange]:
+        """
+        Create the partitions missing to hold rows from min_date through max_date, returns the created partitions.
+
+        Runs in its own short transaction holding an advisory lock, so concurrent writers neither race to create the
+        same partition nor hold the parent's ACCESS EXCLUSIVE lock while they copy.
+
+        connection: create the partitions in the caller's transaction instead, for a caller that has already written
+        to along_track in it (its lock on the parent would block a separate connection's CREATE TABLE forever).  The
+        partitions are not cached then, the caller's transaction may still roll back.
+        """
+        if self._covered(min_date, max_date):
+            return []
+
+        with pg.connect(self.config.postgres_dsn) if connection is None else nullcontext(connection) as connection_:
+            with connection_.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", (PARTITION_LOCK_KEY,))
+                existing = self.existing_partitions(cursor)
+                planned = plan_partitions(min_date, max_date, self.eras, existing, self.along_track_table_name)
+                for partition in planned:
+                    self._create_partition(cursor, partition)
+                    self.logger.info(f"Created partition {partition.name} [{partition.start}, {partition.end})")
+        if connection is None:
+            self._known_partitions = sorted(existing + planned, key=lambda partition: partition.start)
+        return planned
+
+    def _reload_partitions(self, cursor: pg.Cursor, sources: List[PartitionRange], targets: List[PartitionRange]):
+        """
+        Replace the source partitions by the target partitions covering the same rows, in the caller's transaction.
+        The rows are routed to the targets by inserting them through the parent table.
+        """
+        table = sql.Identifier(self.along_track_table_name)
+        columns = sql.SQL(", ").join(map(sql.Identifier, self.along_track_columns))
+        detached = []
+        for source in sources:
+            detached_name = f"{source.name}_detached"
+            cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(table, sql.Identifier(source.name)))
+            cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+                sql.Identifier(source.name), sql.Identifier(detached_name)
+            ))
+            detached.append(detached_name)
+
+        for target in targets:
+            self._create_partition(cursor, target)
+
+        for detached_name in detached:
+            cursor.execute(sql.SQL(
+                "INSERT INTO {table} ({columns}) OVERRIDING SYSTEM VALUE SELECT {columns} FROM {detached}"
+            ).format(table=table, columns=columns, detached=sql.Identifier(detached_name)))
+            cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(detached_name)))
+        for target in targets:
+            cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(target.name)))
+        self._known_partitions = []
+
+    def merge_partitions(self, start: datetime, end: datetime) -> PartitionRange:
+        """
+        Merge every partition within [start, end) into a single partition covering [start, end)
+        """
+        with pg.connect(self.config.postgres_dsn) as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", (PARTITION_LOCK_KEY,))
+                overlapping = [
+                    partition for partition in self.existing_partitions(cursor)
+                    if partition.start < end and partition.end > start
+                ]
+                straddling = [p.name for p in overlapping if p.start < start or p.end > end]
+                if straddling:
+                    raise ValueError(f"Partitions {straddling} extend beyond [{start}, {end}), split them first")
+                target = PartitionRange(partition_name(start, end, self.along_track_table_name), start, end)
+                self._reload_partitions(cursor, overlapping, [target])
+        self.logger.info(f"Merged {[p.name for p in overlapping]} into {target.name}")
+        return target
+
+    def split_partition(self, name: str, granularity: str) -> List[PartitionRange]:
+        """
+        Split a partition into week, month or year partitions (clipped to the partition's range)
+        """
+        with pg.connect(self.config.postgres_dsn) as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", (PARTITION_LOCK_KEY,))
+                source = next((p for p in self.existing_partitions(cursor) if p.name == name), None)
+                if source is None:
+                    raise ValueError(f"{name} is not a partition of {self.along_track_table_name}")
+                targets = plan_partitions(
+                    source.start, source.end - timedelta(microseconds=1), [(source.start, granularity)], [],
+                    self.along_track_table_name,
+                )
+                if [(t.start, t.end) for t in targets] == [(source.start, source.end)]:
+                    raise ValueError(f"{name} already spans a single {granularity}")
+                self._reload_partitions(cursor, [source], targets)
+        self.logger.info(f"Split {name} into {[t.name for t in targets]}")
+        return targets
+
+    def drop_empty_partitions(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[str]:
+        """
+        Drop partitions without rows (optionally only within [start, end)), they cost planning time on every query
+        """
+        dropped = []
+        with pg.connect(self.config.postgres_dsn) as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", (PARTITION_LOCK_KEY,))
+                for partition in self.existing_partitions(cursor):
+                    if (start and partition.end <= start) or (end and partition.start >= end):
+                        continue
+                    cursor.execute(sql.SQL("SELECT NOT EXISTS (SELECT 1 FROM {})").format(
+                        sql.Identifier(partition.name)
+                    ))
+                    if cursor.fetchone()[0]:
+                        cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(partition.name)))
+                        dropped.append(partition.name)
+        self._known_partitions = []
+        self.logger.info(f"Dropped {len(dropped)} empty partitions")
+        return dropped
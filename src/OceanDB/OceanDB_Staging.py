@@ -0,0 +1,231 @@
+from collections import defaultdict
+from datetime import datetime
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import time
+
+import psycopg as pg
+from psycopg import sql
+from dateutil.relativedelta import relativedelta
+
+from OceanDB.OceanDB_ETL import OceanDBETl, parse_along_track_file_name
+from OceanDB.OceanDB_Initializer import OceanDBInit
+from OceanDB.utils.basin_mask import load_basin_mask
+
+
+class AlongTrackStagingLoader(OceanDBETl):
+    """
+    Load-then-attach ingest of whole months of along track data.
+
+    A month of files is copied into a standalone UNLOGGED table shaped like along_track, which is deduplicated,
+    indexed, set LOGGED and then swapped in as the along_track_YYYY_MM partition in a single transaction.  Rows of the
+    existing partition that do not come from the files loaded are carried over, so reloading one mission does not drop
+    the others and a file that fails to decode keeps its previous rows.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.oceandb_init = OceanDBInit()
+
+    @staticmethod
+    def group_files_by_month(files: Iterable[Path]) -> Dict[Tuple[int, int], List[Path]]:
+        """
+        Group along track files by the (year, month) of their measurement date
+        """
+        months = defaultdict(list)
+        for file in files:
+            _, date = parse_along_track_file_name(file.name)
+            months[(date.year, date.month)].append(file)
+        return dict(sorted(months.items()))
+
+    def partition_name(self, year: int, month: int) -> str:
+        return f"{self.along_track_table_name}_{year}_{month:02d}"
+
+    def partition_exists(self, cursor: pg.Cursor, partition_name: str) -> bool:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (f"public.{partition_name}",))
+        return cursor.fetchone()[0]
+
+    def check_month_partition(self, cursor: pg.Cursor, partition_name: str, min_date: datetime,
+                              max_date: datetime) -> bool:
+        """
+        Whether the month's partition exists.  Raises a ValueError if the month is covered by a partition of another
+        granularity (e.g. a yearly partition), which a month swap would destroy.
+        """
+        overlapping = [
+            partition for partition in self.partition_manager.existing_partitions(cursor)
+            if partition.start < max_date and partition.end > min_date
+        ]
+        if any((partition.name, partition.start, partition.end) != (partition_name, min_date, max_date)
+               for partition in overlapping):
+            raise ValueError(
+                f"[{min_date}, {max_date}) overlaps {[partition.name for partition in overlapping]}, split them into "
+                f"months (oceandb partitions split <name> --granularity month) before loading with --attach"
+            )
+        return bool(overlapping)
+
+    def load_month(
+            self,
+            year: int,
+            month: int,
+            files: List[Path],
+            decode_workers: int = 6,
+            batch_size: Optional[int] = None,
+            maintenance_work_mem: str = "1GB",
+    ) -> int:
+        """
+        Load all the files of a month through an UNLOGGED staging table and attach it as the month's partition.
+
+        Returns the number of rows in the new partition.
+        """
+        start = time.perf_counter()
+        partition_name = self.partition_name(year, month)
+        staging_name = f"{partition_name}_staging"
+        min_date = datetime(year, month, 1)
+        max_date = min_date + relativedelta(months=1)
+        metadata = []
+        manifest_entries = []
+        self.ensure_ingest_manifest_table()
+
+        with pg.connect(self.config.postgres_dsn) as connection:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT set_config('maintenance_work_mem', %s, false)", (maintenance_work_mem,))
+                cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(staging_name)))
+                cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (f"public.{self.along_track_table_name}",))
+                sequence_name = cursor.fetchone()[0]
+                cursor.execute(sql.SQL(self.oceandb_init.load_sql("tables/create_along_track_staging_table.sql")).format(
+                    staging_name=sql.Identifier(staging_name),
+                    table_name=sql.Identifier(self.along_track_table_name),
+                    sequence_name=sql.Literal(sequence_name),
+                ))
+
+                partition_exists = self.check_month_partition(cursor, partition_name, min_date, max_date)
+
+                loaded_file_names = []
+                load_basin_mask()
+                with Pool(decode_workers) as pool:
+                    for along_track_data, along_track_metadata in pool.imap_unordered(self.extract_along_track_file, files):
+                        if along_track_data is None:
+                            self.logger.warning(f"Skipping {along_track_metadata.file_name}, could not extract data, "
+                                                f"its rows in {partition_name} are kept")
+                            continue
+                        copy_start = time.perf_counter()
+                        rows = self.copy_along_track_data_to_postgresql(
+                            along_track_data,
+                            connection=connection,
+                            batch_size=batch_size,
+                            table_name=staging_name,
+                        )
+                        loaded_file_names.append(along_track_data.file_name)
+                        metadata.append(along_track_metadata)
+                        manifest_entries.append((
+                            along_track_data.file_name, along_track_data.fingerprint, rows,
+                            time.perf_counter() - copy_start,
+                        ))
+
+                if partition_exists:
+                    # Keep the rows of every file that was not reloaded, including files that failed to decode
+                    columns = sql.SQL(", ").join(map(sql.Identifier, self.partition_manager.along_track_columns))
+                    cursor.execute(sql.SQL("""
+                        INSERT INTO {staging} ({columns})
+                        SELECT {columns} FROM {partition}
+                        WHERE file_name <> ALL(%s)
+                    """).format(
+                        staging=sql.Identifier(staging_name),
+                        partition=sql.Identifier(partition_name),
+                        columns=columns,
+                    ), (loaded_file_names,))
+
+                self.finalize_staging_table(cursor, staging_name, min_date, max_date)
+                cursor.execute(sql.SQL("SELECT count(*) FROM {}").format(sql.Identifier(staging_name)))
+                row_count = cursor.fetchone()[0]
+
+            connection.autocommit = False
+            with connection.transaction():
+                with connection.cursor() as cursor:
+                    self.swap_partition(cursor, staging_name, partition_name, min_date, max_date, partition_exists)
+                for along_track_metadata in metadata:
+                    self.import_metadata_to_psql(along_track_metadata, connection=connection)
+                for file_name, fingerprint, rows, seconds in manifest_entries:
+                    self.record_manifest_entry(connection, file_name, fingerprint, rows, seconds)
+            self.invalidate_query_caches(min_date, max_date)
+
+        self.logger.info(f"Attached {partition_name}: {len(metadata)} files, {row_count} rows in {time.perf_counter() - start:.2f}s")
+        return row_count
+
+    def finalize_staging_table(self, cursor: pg.Cursor, staging_name: str, min_date: datetime, max_date: datetime):
+        """
+        Deduplicate, constrain and index the staging table, then make it LOGGED so it can become a partition.
+        Building every index here means ATTACH PARTITION only has to match them.
+        """
+        staging = sql.Identifier(staging_name)
+        cursor.execute(sql.SQL("""
+            DELETE FROM {staging}
+            WHERE ctid IN (
+                SELECT ctid FROM (
+                    SELECT ctid, row_number() OVER (PARTITION BY date_time, latitude, longitude ORDER BY id) AS n
+                    FROM {staging}
+                ) duplicates
+                WHERE n > 1
+            )
+        """).format(staging=staging))
+        self.logger.info(f"Removed {cursor.rowcount} duplicate rows from {staging_name}")
+
+        # The CHECK constraint lets ATTACH PARTITION skip scanning the table for out of range rows
+        cursor.execute(sql.SQL("""
+            ALTER TABLE {staging}
+                ADD CONSTRAINT {bounds} CHECK (date_time IS NOT NULL AND date_time >= {min_date} AND date_time < {max_date}),
+                ADD CONSTRAINT {pkey} PRIMARY KEY (date_time, id),
+                ADD CONSTRAINT {unique} UNIQUE (date_time, latitude, longitude)
+        """).format(
+            staging=staging,
+            bounds=sql.Identifier(f"{staging_name}_bounds"),
+            pkey=sql.Identifier(f"{staging_name}_pkey"),
+            unique=sql.Identifier(f"{staging_name}_unique_spatiotemporal"),
+            min_date=sql.Literal(min_date),
+            max_date=sql.Literal(max_date),
+        ))
+        for index in self.oceandb_init.along_track_index_files:
+            index_name = self.oceandb_init.partition_index_name(staging_name, index["params"]["index_name"])
+            cursor.execute(self.oceandb_init.along_track_index_statement(index, staging_name, index_name))
+
+        cursor.execute(sql.SQL("ALTER TABLE {} SET LOGGED").format(staging))
+        cursor.execute(sql.SQL("ANALYZE {}").format(staging))
+
+    def swap_partition(self, cursor: pg.Cursor, staging_name: str, partition_name: str, min_date: datetime,
+                       max_date: datetime, partition_exists: bool):
+        """
+        Replace the month's partition with the staging table. Must run inside a transaction so the swap is atomic.
+        """
+        table = sql.Identifier(self.along_track_table_name)
+        partition = sql.Identifier(partition_name)
+        if partition_exists:
+            cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(table, partition))
+            cursor.execute(sql.SQL("DROP TABLE {}").format(partition))
+
+        cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(sql.Identifier(staging_name), partition))
+        for index in self.oceandb_init.along_track_index_files:
+            cursor.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                sql.Identifier(self.oceandb_init.partition_index_name(staging_name, index["params"]["index_name"])),
+                sql.Identifier(self.oceandb_init.partition_index_name(partition_name, index["params"]["index_name"])),
+            ))
+        for suffix in ["pkey", "unique_spatiotemporal"]:
+            cursor.execute(sql.SQL("ALTER TABLE {} RENAME CONSTRAINT {} TO {}").format(
+                partition, sql.Identifier(f"{staging_name}_{suffix}"), sql.Identifier(f"{partition_name}_{suffix}")
+            ))
+        cursor.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM ({}) TO ({})").format(
+            table, partition, sql.Literal(min_date), sql.Literal(max_date)
+        ))
+        cursor.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(
+            partition, sql.Identifier(f"{staging_name}_bounds")
+        ))
+
+    def load(self, files: Iterable[Path], **kwargs) -> int:
+        """
+        Load files month by month, see load_month for the keyword arguments
+        """
+        total_rows = 0
+        for (year, month), month_files in self.group_files_by_month(files).items():
+            total_rows += self.load_month(year, month, month_files, **kwargs)
+        return total_rows
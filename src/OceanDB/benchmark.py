@@ -0,0 +1,129 @@
+"""
+Along track ingest benchmark
+
+Runs every file through the ingest stages one at a time and times them separately:
+
+    decode     read the file & its variables (I/O, HDF5 decompression)
+    transform  time conversion, basin lookup & COPY BINARY row encoding
+    load       COPY into along_track + metadata insert
+
+The load stage runs in a transaction that is rolled back by default, so the benchmark can be pointed at a database
+that already holds data (e.g. the local PostGIS container) without leaving rows behind.  Combine with
+utils.synthetic to compare ingest changes on identical inputs.
+"""
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import netCDF4 as nc
+import psycopg as pg
+
+from OceanDB.OceanDB_ETL import OceanDBETl
+from OceanDB.utils.basin_mask import load_basin_mask
+from OceanDB.utils.logging import get_logger
+
+logger = get_logger()
+
+STAGES = ["decode", "transform", "load"]
+
+
+@dataclass
+class IngestBenchmarkResult:
+    files: int = 0
+    rows: int = 0
+    bytes: int = 0
+    seconds: Dict[str, float] = field(default_factory=lambda: {stage: 0. for stage in STAGES})
+
+    def files_per_second(self, stage: str) -> float:
+        return self.files / self.seconds[stage] if self.seconds[stage] else float("nan")
+
+    def rows_per_second(self, stage: str) -> float:
+        return self.rows / self.seconds[stage] if self.seconds[stage] else float("nan")
+
+    def to_dict(self) -> dict:
+        result = asdict(self)
+        result["files_per_second"] = {stage: self.files_per_second(stage) for stage in STAGES}
+        result["rows_per_second"] = {stage: self.rows_per_second(stage) for stage in STAGES}
+        return result
+
+    def report(self) -> str:
+        lines = [f"{self.files} files, {self.rows:,} rows, {self.bytes / 1e6:,.1f} MB"]
+        for stage in STAGES:
+            if self.seconds[stage]:
+                lines.append(
+                    f"{stage:>9}: {self.seconds[stage]:8.2f}s {self.files_per_second(stage):10,.1f} files/s "
+                    f"{self.rows_per_second(stage):14,.0f} rows/s"
+                )
+        return "\n".join(lines)
+
+
+class IngestBenchmark(OceanDBETl):
+    """
+    Time the decode, transform & load stages of the along track ingest.
+
+    load: run the load stage, requires a database
+    rollback: roll the load back instead of committing it
+    batch_size: rows per COPY write
+    """
+
+    def __init__(self, load: bool = True, rollback: bool = True, batch_size: Optional[int] = None):
+        super().__init__()
+        self.load = load
+        self.rollback = rollback
+        self.batch_size = batch_size or self.copy_batch_size
+
+    def run(self, files: Iterable[Path]) -> IngestBenchmarkResult:
+        result = IngestBenchmarkResult()
+        load_basin_mask()
+        connection = pg.connect(self.config.postgres_dsn) if self.load else None
+        try:
+            for file in files:
+                self._run_file(file, result, connection)
+            if connection is not None:
+                if self.rollback:
+                    connection.rollback()
+                else:
+                    connection.commit()
+        finally:
+            if connection is not None:
+                connection.close()
+
+        logger.info(f"Ingest benchmark\n{result.report()}")
+        return result
+
+    def _run_file(self, file: Path, result: IngestBenchmarkResult, connection: Optional[pg.Connection]):
+        start = time.perf_counter()
+        content = file.read_bytes()
+        with nc.Dataset(file.name, memory=content) as ds:
+            variables = self.read_along_track_variables(ds)
+            metadata = self.extract_dataset_metadata(ds, file)
+        decoded = time.perf_counter()
+
+        along_track_data = self.transform_along_track_variables(variables, file)
+        columns, rows = self.encode_along_track_rows(along_track_data)
+        transformed = time.perf_counter()
+
+        if connection is not None:
+            # In the benchmark's transaction: after the first COPY it holds a lock on along_track that a partition
+            # created on another connection would wait for.  The partitions are rolled back or committed with the rows.
+            if len(along_track_data.time):
+                self.partition_manager.ensure_partitions(*along_track_data.time_range(), connection=connection)
+            self.copy_encoded_rows(connection, self.along_track_table_name, columns, rows, self.batch_size)
+            self.import_metadata_to_psql(metadata, connection=connection)
+            result.seconds["load"] += time.perf_counter() - transformed
+
+        result.files += 1
+        result.rows += len(rows)
+        result.bytes += len(content)
+        result.seconds["decode"] += decoded - start
+        result.seconds["transform"] += transformed - decoded
+
+    @staticmethod
+    def append_result(result: IngestBenchmarkResult, output: Path, **labels):
+        """
+        Append a result as a JSON line, with labels (e.g. git revision, loader) to tell the runs apart
+        """
+        with open(output, "a") as f:
+            f.write(json.dumps({**labels, **result.to_dict()}) + "\n")
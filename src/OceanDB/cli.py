@@ -1,10 +1,14 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import click
 from pathlib import Path
-from multiprocessing import Pool, cpu_count
 
-from OceanDB.OceanDB_ETL import OceanDBETl, AlongTrackData, AlongTrackMetaData
+from OceanDB.OceanDB_ETL import OceanDBETl, AlongTrackData, AlongTrackMetaData, FileFingerprint
 from OceanDB.OceanDB_Initializer import OceanDBInit
+from OceanDB.OceanDB_Staging import AlongTrackStagingLoader
+from OceanDB.OceanDB_Partitions import AlongTrackPartitionManager, GRANULARITIES
+from OceanDB.ingest_pipeline import AlongTrackIngestPipeline
+from OceanDB.file_catalog import AlongTrackFileCatalog
+from OceanDB.utils.metrics import IngestMetrics
 from OceanDB.config import Config
 from OceanDB.utils.logging import get_logger
 
@@ -29,8 +33,9 @@ def init():
     ocean_db_init = OceanDBInit()
     ocean_db_init.create_database()
     ocean_db_init.create_tables()
+    ocean_db_init.create_functions()
     ocean_db_init.create_indices()
-    ocean_db_init.create_partitions("1990-01-01", "2025-11-01")
+    # along_track partitions are created on demand as data is ingested, see the partitions command
     # ocean_db_init.validate_schema()
     oceandb_etl = OceanDBETl()
     oceandb_etl.insert_basins_data()
@@ -140,11 +145,16 @@ def iter_year_months(
 def get_netcdf4_files(
     missions: list,
     start_date: datetime = None,
-    end_date: datetime = None
-    ) -> list[Path]:
+    end_date: datetime = None,
+    refresh: bool = True,
+    catalog_workers: int = 16,
+    ) -> dict[Path, FileFingerprint]:
     """
-    Generate a list of NetCDF along-track files based on missions and optional date filtering.
+    Generate the NetCDF along-track files based on missions and optional date filtering, ordered by date.
     If start_date and end_date are both None → return ALL files for those missions.
+
+    The files come from the local file catalog, which is incrementally refreshed first unless refresh is False.
+    They map to their size & mtime as of that refresh, run refresh-catalog --full after rewriting files in place.
     """
 
     oceandb_etl = OceanDBETl()
@@ -168,52 +178,46 @@ def get_netcdf4_files(
 
     click.echo(f"Ingesting missions: {missions}")
     click.echo(f"N Missions {len(missions)}")
-    prefix = "SEALEVEL_GLO_PHY_L3_MY_008_062"
-    all_netcdf_files = []
-
-    if start_date is None and end_date is None:
-        # ingest EVERYTHING
-        year_months = None
-
-    else:
-        # at least one bound is provided
-        if start_date and end_date and end_date < start_date:
-            raise ValueError("end_date must be >= start_date")
 
-        year_months = list(iter_year_months(start_date, end_date))
+    if start_date and end_date and end_date < start_date:
+        raise ValueError("end_date must be >= start_date")
 
-    # Collect files
-    #For whatever reason the s6a satellite data directory is different than all the others.
-
-    for mission in missions:
-        file_structure = f"cmems_obs-sl_glo_phy-ssh_my_{mission}-l3-duacs_PT1S_202411"
-        second_file_structure = f"cmems_obs-sl_glo_phy-ssh_my_{mission}-lr-l3-duacs_PT1S_202411"
-
-        for structure in [file_structure, second_file_structure]:
-            ingest_directory = (
-                    Path(oceandb_etl.config.along_track_data_directory)
-                    / prefix
-                    / structure
-            )
+    # Look the files up in the local file catalog rather than walking the directory tree
+    catalog = AlongTrackFileCatalog()
+    if refresh or catalog.is_empty():
+        catalog.refresh(workers=catalog_workers)
 
-            if not ingest_directory.exists():
-                # Not all missions have both structures
-                continue
+    return catalog.fingerprints(
+        missions=missions,
+        start_date=_to_naive(start_date),
+        end_date=_to_naive(end_date),
+    )
 
-            if year_months is None:
-                # Ingest ALL .nc files recursively
-                nc_files = list(ingest_directory.rglob("*.nc"))
-            else:
-                # Ingest date-filtered months only
-                nc_files = []
-                for year, month in year_months:
-                    month_dir = ingest_directory / f"{year:04d}" / f"{month:02d}"
-                    if month_dir.exists():
-                        nc_files.extend(month_dir.rglob("*.nc"))
 
-            all_netcdf_files.extend(nc_files)
+@cli.command("refresh-catalog")
+@click.option(
+    "--full",
+    is_flag=True,
+    default=False,
+    help="List every directory, even those whose mtime is unchanged (e.g. after files were rewritten in place).",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=16,
+    show_default=True,
+    help="Threads scanning directories concurrently.",
+)
+def refresh_catalog(full, workers):
+    """
+    Update the local catalog of along-track files.
 
-    return all_netcdf_files
+    The catalog (a SQLite database at ``FILE_CATALOG_PATH``, by default
+    ``~/.cache/oceandb/along_track_files.sqlite``) records the mission, date,
+    size and mtime of every file under ``ALONG_TRACK_DATA_DIRECTORY``. Only
+    directories whose mtime changed since the last refresh are listed again.
+    """
+    AlongTrackFileCatalog().refresh(workers=workers, full=full)
 
 
 @cli.command()
@@ -228,7 +232,100 @@ def get_netcdf4_files(
     type=click.DateTime(formats=["%Y-%m-%d"]),
     required=False,
 )
-def ingest_along_track(missions, start_date, end_date):
+@click.option(
+    "--loader",
+    type=click.Choice(["copy", "insert"]),
+    default="copy",
+    show_default=True,
+    help="COPY BINARY bulk loader, or the row-by-row INSERT path for comparison.",
+)
+@click.option(
+    "--batch-size",
+    type=int,
+    default=OceanDBETl.copy_batch_size,
+    show_default=True,
+    help="Rows sent per COPY write.",
+)
+@click.option(
+    "--decode-workers",
+    type=int,
+    default=6,
+    show_default=True,
+    help="Processes decoding NetCDF files.",
+)
+@click.option(
+    "--write-workers",
+    type=int,
+    default=2,
+    show_default=True,
+    help="Processes writing to Postgres, one connection each.",
+)
+@click.option(
+    "--file-queue-size",
+    type=int,
+    default=64,
+    show_default=True,
+    help="Max files waiting to be decoded.",
+)
+@click.option(
+    "--data-queue-size",
+    type=int,
+    default=8,
+    show_default=True,
+    help="Max decoded files held in memory waiting to be written.",
+)
+@click.option(
+    "--bulk",
+    is_flag=True,
+    default=False,
+    help="Drop the secondary along_track indices during the load and rebuild them per partition afterwards.",
+)
+@click.option(
+    "--index-workers",
+    type=int,
+    default=4,
+    show_default=True,
+    help="Concurrent connections rebuilding indices in --bulk mode.",
+)
+@click.option(
+    "--maintenance-work-mem",
+    default="1GB",
+    show_default=True,
+    help="maintenance_work_mem of each index build connection in --bulk and --attach modes.",
+)
+@click.option(
+    "--attach",
+    is_flag=True,
+    default=False,
+    help="Load each month into an UNLOGGED staging table and swap it in as the month's partition.",
+)
+@click.option(
+    "--reprocess",
+    is_flag=True,
+    default=False,
+    help="With --attach, reload files that were already ingested, replacing their rows.",
+)
+@click.option(
+    "--refresh-catalog/--no-refresh-catalog",
+    default=True,
+    show_default=True,
+    help="Incrementally refresh the local file catalog before looking up the files to ingest.",
+)
+@click.option(
+    "--metrics-jsonl",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Append the per stage timings of every ingested file to this JSON lines file.",
+)
+@click.option(
+    "--metrics-textfile",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Prometheus textfile (e.g. in the node exporter textfile directory) updated with ingest histograms & counters.",
+)
+def ingest_along_track(missions, start_date, end_date, loader, batch_size, decode_workers, write_workers,
+                       file_queue_size, data_queue_size, bulk, index_workers, maintenance_work_mem, attach, reprocess,
+                       refresh_catalog, metrics_jsonl, metrics_textfile):
     """
     Ingest along-track altimetry data for one or more missions.
 
@@ -252,11 +349,56 @@ def ingest_along_track(missions, start_date, end_date):
         ``YYYY-MM-DD``. If only one of ``start_date`` or ``end_date`` is provided,
         the command will raise an error.
 
+    loader : str, optional
+        ``copy`` (default) streams rows with ``COPY ... FROM STDIN (FORMAT BINARY)``,
+        ``insert`` uses the row-by-row ``executemany`` path. Both log rows/s.
+
+    batch_size : int, optional
+        Number of rows sent per COPY write.
+
+    decode_workers, write_workers : int, optional
+        Sizes of the NetCDF decode and Postgres write process pools.
+
+    file_queue_size, data_queue_size : int, optional
+        Bounds of the queues between discovery → decode and decode → write.
+        Queue depths are logged periodically to help tune the worker counts.
+
+    bulk : bool, optional
+        Bulk-load mode for first-time backfills. The secondary ``along_track``
+        indices are dropped before loading, then rebuilt partition by partition
+        on ``index_workers`` concurrent connections with ``maintenance_work_mem``
+        and checked against ``EXPECTED_TABLE_INDEXES``. Every partition is
+        reindexed, so this only pays off when loading a large share of the data.
+
+    attach : bool, optional
+        Load-then-attach mode. Files are grouped by month; each month is copied
+        into an UNLOGGED staging table, deduplicated, indexed, set LOGGED and
+        atomically swapped in as the ``along_track_YYYY_MM`` partition. Rows of
+        other files already in that partition are carried over.
+
+    reprocess : bool, optional
+        With ``--attach``, also reload files that were already ingested.
+
+    metrics_jsonl, metrics_textfile : Path, optional
+        Every file is timed per stage (open, read, time, basin_mask, encode,
+        load, metadata). The timings are summarised at the end of the run and
+        can be written as JSON lines and as a Prometheus textfile for the node
+        exporter textfile collector. Not used with ``--attach``.
+
+    refresh_catalog : bool, optional
+        Files are looked up in the local file catalog (see ``refresh-catalog``).
+        By default the catalog is incrementally refreshed first; skip this when
+        it is known to be current.
+
     Behavior
     --------
     - If no dates are provided → ingest **all** available files.
     - If both dates are provided → ingest only files belonging to year/month
       folders within the given range.
+    - Files are compared with the ``along_track_ingest_manifest`` table by size
+      and modification time; only new, changed or previously failed files are
+      ingested. A changed file whose content hash is identical is not reloaded,
+      otherwise its previous rows are replaced.
     - The command asks for confirmation before running ingestion, as the
       operation may take several hours depending on the number and size of
       files.
@@ -275,27 +417,63 @@ def ingest_along_track(missions, start_date, end_date):
     """
 
 
+    if bulk and attach:
+        raise click.UsageError("--bulk and --attach cannot be combined")
+    if reprocess and not attach:
+        raise click.UsageError("--reprocess requires --attach")
+
     missions = list(missions)
-    nc_files = get_netcdf4_files(missions=missions, start_date=start_date, end_date=end_date)
+    fingerprints = get_netcdf4_files(
+        missions=missions,
+        start_date=start_date,
+        end_date=end_date,
+        refresh=refresh_catalog,
+    )
+    nc_files = list(fingerprints)
+
+    # Compare the files with the ingest manifest so that only new or changed files are processed, the catalog
+    # already holds their size & mtime
+    oceandb_etl = OceanDBETl()
+    diff = oceandb_etl.diff_ingest_manifest(nc_files, fingerprints=fingerprints)
+    files_to_ingest = nc_files if reprocess else diff.to_ingest
+    print(f"{len(diff.new)} new, {len(diff.changed)} changed, {len(diff.unchanged)} unchanged files")
 
-    if not click.confirm(f"Ingesting {len(nc_files)} files This may take many hours. Continue?"):
+    if not click.confirm(f"Ingesting {len(files_to_ingest)} files This may take many hours. Continue?"):
         return
-
-    # Query the ingested metadata so that we can skip processing files that have already been processed
-    oceandb_etl = OceanDBETl()
-    metadata_filenames = oceandb_etl.query_metadata()
+    oceandb_etl.prepare_ingest_manifest(diff)
 
     start_ingest_time = time.perf_counter()
 
-    along_track_files = [
-        file
-        for file in nc_files
-        if file.name not in metadata_filenames
-    ]
+    if attach:
+        AlongTrackStagingLoader().load(
+            files_to_ingest,
+            decode_workers=decode_workers,
+            batch_size=batch_size,
+            maintenance_work_mem=maintenance_work_mem,
+        )
+        print(f"Full Ingest Time {time.perf_counter() - start_ingest_time:.2f} seconds")
+        return
 
-    process_count = 6
-    with Pool(process_count) as multiprocessing_pool:
-        multiprocessing_pool.map(oceandb_etl.process_along_track_file, along_track_files)
+    pipeline = AlongTrackIngestPipeline(
+        decode_workers=decode_workers,
+        write_workers=write_workers,
+        file_queue_size=file_queue_size,
+        data_queue_size=data_queue_size,
+        loader=loader,
+        batch_size=batch_size,
+        metrics=IngestMetrics(jsonl_path=metrics_jsonl, textfile_path=metrics_textfile),
+    )
+    if bulk:
+        ocean_db_init = OceanDBInit()
+        ocean_db_init.drop_along_track_indices()
+    try:
+        pipeline.run(files_to_ingest)
+    finally:
+        if bulk:
+            ocean_db_init.rebuild_along_track_indices(
+                workers=index_workers,
+                maintenance_work_mem=maintenance_work_mem
+            )
 
     # for file in along_track_files:
     #     file_name = file.name
@@ -334,3 +512,156 @@ def ingest_along_track(missions, start_date, end_date):
     #     print(f"✅ {file.name} | {size_mb:.2f} MB | {duration:.2f} seconds")
     #
     #
+
+
+@cli.group()
+def partitions():
+    """
+    Manage the along_track partitions.
+
+    Partitions are created on demand during ingest, sized per era by
+    ``ALONG_TRACK_PARTITION_ERAS`` (e.g. ``1990-01-01=year,2002-01-01=month``).
+    Fewer, larger partitions plan faster; merge sparse periods and split
+    dense ones as the archive grows.
+    """
+
+
+@partitions.command("list")
+def list_partitions():
+    """List the along_track partitions and their ranges."""
+    for partition in AlongTrackPartitionManager().list_partitions():
+        click.echo(f"{partition.name:40} {partition.start:%Y-%m-%d %H:%M} -> {partition.end:%Y-%m-%d %H:%M}")
+
+
+@partitions.command("create")
+@click.argument("start_date", callback=parse_date)
+@click.argument("end_date", callback=parse_date)
+def create_partitions(start_date, end_date):
+    """Pre-create the partitions missing in [START_DATE, END_DATE)."""
+    AlongTrackPartitionManager().ensure_partitions(start_date, end_date - timedelta(microseconds=1))
+
+
+@partitions.command("merge")
+@click.argument("start_date", callback=parse_date)
+@click.argument("end_date", callback=parse_date)
+def merge_partitions(start_date, end_date):
+    """
+    Merge the partitions within [START_DATE, END_DATE) into one, e.g.
+    ``oceandb partitions merge 1993-01-01 1994-01-01`` for a yearly partition.
+    """
+    AlongTrackPartitionManager().merge_partitions(start_date, end_date)
+
+
+@partitions.command("split")
+@click.argument("name")
+@click.option("--granularity", type=click.Choice(GRANULARITIES), default="month", show_default=True)
+def split_partition(name, granularity):
+    """Split partition NAME into weekly, monthly or yearly partitions."""
+    AlongTrackPartitionManager().split_partition(name, granularity)
+
+
+@partitions.command("drop-empty")
+def drop_empty_partitions():
+    """Drop partitions without rows."""
+    AlongTrackPartitionManager().drop_empty_partitions()
+
+
+@cli.command("benchmark-ingest")
+@click.argument("missions", nargs=-1)
+@click.option(
+    "--start-date",
+    callback=parse_date,
+    default="2020-01-01",
+    show_default=True,
+    help="First day of synthetic data (YYYY-MM-DD).",
+)
+@click.option(
+    "--days",
+    type=int,
+    default=10,
+    show_default=True,
+    help="Days of synthetic data per mission.",
+)
+@click.option(
+    "--points",
+    type=int,
+    default=60_000,
+    show_default=True,
+    help="1 Hz measurements per synthetic file (at most 86400).",
+)
+@click.option(
+    "--directory",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=None,
+    help="Where to write the synthetic files, a temporary directory by default. Existing files are reused.",
+)
+@click.option(
+    "--load/--no-load",
+    default=True,
+    show_default=True,
+    help="Time the COPY into the database, --no-load only times decode & transform.",
+)
+@click.option(
+    "--commit",
+    is_flag=True,
+    default=False,
+    help="Commit the loaded rows instead of rolling them back.",
+)
+@click.option(
+    "--batch-size",
+    type=int,
+    default=None,
+    help="Rows per COPY write.",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Append the result as a JSON line to this file.",
+)
+@click.option(
+    "--label",
+    default=None,
+    help="Label stored with the JSON result, e.g. a git revision.",
+)
+def benchmark_ingest(missions, start_date, days, points, directory, load, commit, batch_size, output, label):
+    """
+    Benchmark the along-track ingest on synthetic DUACS files.
+
+    Synthetic L3 files (same variables, packing and file names as the
+    Copernicus product) are generated for each mission (``j3`` by default)
+    and run through the decode, transform and load stages, each timed
+    separately in files/s and rows/s. The load runs against the configured
+    database (e.g. ``make run_postgres``) and is rolled back unless
+    ``--commit`` is given.
+
+    Example::
+
+        oceandb benchmark-ingest j3 s3a --days 30 --output benchmarks.jsonl --label my-change
+    """
+    import tempfile
+    from OceanDB.benchmark import IngestBenchmark
+    from OceanDB.utils.synthetic import generate_synthetic_along_track_files, synthetic_file_path
+
+    missions = list(missions) or ["j3"]
+    end_date = start_date + timedelta(days=days - 1)
+
+    with tempfile.TemporaryDirectory(prefix="oceandb_benchmark_") as temporary_directory:
+        directory = directory or Path(temporary_directory)
+        if all(synthetic_file_path(directory, mission, end_date).exists() for mission in missions):
+            files = [
+                synthetic_file_path(directory, mission, start_date + timedelta(days=day))
+                for mission in missions for day in range(days)
+            ]
+        else:
+            click.echo(f"Writing {len(missions) * days} synthetic files to {directory}")
+            files = generate_synthetic_along_track_files(
+                directory, missions, start_date, end_date, n_points=points
+            )
+
+        benchmark = IngestBenchmark(load=load, rollback=not commit, batch_size=batch_size)
+        result = benchmark.run(files)
+
+    click.echo(result.report())
+    if output is not None:
+        benchmark.append_result(result, output, label=label, missions=missions, days=days, points=points)
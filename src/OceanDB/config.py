@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -16,6 +17,31 @@ class Config(BaseSettings):
     copernicus_password: str
     copernicus_username: str
 
+    # along_track partition size per era, e.g. "1990-01-01=year,2002-01-01=month", see OceanDB.OceanDB_Partitions
+    along_track_partition_eras: str = Field(default="1990-01-01=month")
+
+    # Per process connection pool of the query classes (requires psycopg-pool), see OceanDB.utils.connection_pool.
+    # Idle connections above min_size are closed after max_idle seconds, every connection after max_lifetime seconds.
+    postgres_pool_enabled: bool = Field(default=False)
+    postgres_pool_min_size: int = Field(default=1)
+    postgres_pool_max_size: int = Field(default=10)
+    postgres_pool_max_idle: float = Field(default=600.)
+    postgres_pool_max_lifetime: float = Field(default=3600.)
+    # Seconds to wait for a free connection
+    postgres_pool_timeout: float = Field(default=30.)
+
+    # Rows fetched per round trip by the streaming (named, server side) cursors, see OceanDB.stream_query
+    postgres_cursor_itersize: int = Field(default=10_000)
+
+    # AlongTrack query window cache, see OceanDB.utils.query_cache.  The directory holds the disk tier and the
+    # invalidation stamps written by ingests, share it between the ingest & query processes.
+    query_cache_max_bytes: int = Field(default=512 * 2 ** 20)
+    query_cache_directory: Optional[str] = Field(default=None)
+    query_cache_disk_max_bytes: int = Field(default=8 * 2 ** 30)
+
+    # Local SQLite catalog of the along track files, see OceanDB.file_catalog
+    file_catalog_path: str = Field(default=str(Path.home() / ".cache" / "oceandb" / "along_track_files.sqlite"))
+
     model_config = SettingsConfigDict(
         env_prefix="",                # no prefix (POSTGRES_HOST, etc.)
         env_file=".env",               # default fallback
@@ -0,0 +1,278 @@
+"""
+Persistent catalog of the along track NetCDF files on disk
+
+Walking the along track directory tree on a network filesystem takes minutes, so the files are recorded in a local
+SQLite database with their mission & measurement date (parsed from the DUACS file name), size and mtime.  Mission and
+date filtering are then index lookups.
+
+The catalog is refreshed incrementally: directories are scanned level by level on a thread pool, and a directory whose
+mtime is unchanged since the last refresh is not listed again, its files and subdirectories are taken from the catalog.
+A directory's mtime only changes when entries are added, removed or renamed, so use a full refresh after files were
+rewritten in place.
+
+Only the datasets of the along track product are cataloged (see ALONG_TRACK_DATASET_PATTERN), other products or dataset
+versions downloaded under the same data directory are never ingested into along_track.
+"""
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+
+from OceanDB.OceanDB_ETL import FileFingerprint, parse_along_track_file_name
+from OceanDB.config import Config
+from OceanDB.utils.logging import get_logger
+
+logger = get_logger()
+
+ALONG_TRACK_PRODUCT = "SEALEVEL_GLO_PHY_L3_MY_008_062"
+# Dataset directories of the product, one per mission (some named -lr-), in the ingested version
+ALONG_TRACK_DATASET_PATTERN = re.compile(r"cmems_obs-sl_glo_phy-ssh_my_[a-z0-9]+(-lr)?-l3-duacs_PT1S_202411")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS directories_parent_idx ON directories (parent);
+
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    mission TEXT NOT NULL,
+    date TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_mission_date_idx ON files (mission, date);
+CREATE INDEX IF NOT EXISTS files_date_idx ON files (date);
+CREATE INDEX IF NOT EXISTS files_directory_idx ON files (directory);
+"""
+
+
+@dataclass
+class CatalogRefreshStats:
+    directories_scanned: int = 0
+    directories_unchanged: int = 0
+    directories_removed: int = 0
+    files: int = 0
+    seconds: float = 0.
+
+
+@dataclass
+class DirectoryScan:
+    """Result of scanning one directory, files & subdirectories are None when the directory is unchanged"""
+    path: str
+    mtime_ns: Optional[int]
+    files: Optional[List[Tuple[str, int, int]]] = None
+    subdirectories: Optional[List[str]] = None
+
+
+def scan_directory(path: str, known_mtime_ns: Optional[int], full: bool) -> DirectoryScan:
+    """
+    List the .nc files & subdirectories of path, unless its mtime matches known_mtime_ns.
+    mtime_ns is None if the directory no longer exists.
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return DirectoryScan(path, None)
+    if not full and mtime_ns == known_mtime_ns:
+        return DirectoryScan(path, mtime_ns)
+
+    files, subdirectories = [], []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append(entry.path)
+            elif entry.name.endswith(".nc") and entry.is_file():
+                stat = entry.stat()
+                files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+    return DirectoryScan(path, mtime_ns, files, subdirectories)
+
+
+class AlongTrackFileCatalog:
+    """
+    SQLite catalog of the along track files under Config.along_track_data_directory.
+
+    catalog_path: SQLite database, defaults to Config.file_catalog_path
+    root: along track data directory, defaults to Config.along_track_data_directory.  Only the dataset directories of
+    root/ALONG_TRACK_PRODUCT matching ALONG_TRACK_DATASET_PATTERN are cataloged.
+    """
+
+    def __init__(self, catalog_path: Optional[str] = None, root: Optional[str] = None):
+        if catalog_path is None or root is None:
+            config = Config()
+            catalog_path = catalog_path or config.file_catalog_path
+            root = root or config.along_track_data_directory
+        self.catalog_path = Path(catalog_path).expanduser()
+        self.root = str(Path(root).expanduser())
+        self.product_directory = os.path.join(self.root, ALONG_TRACK_PRODUCT)
+        self.catalog_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.connect() as connection:
+            connection.executescript(SCHEMA)
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.catalog_path)
+
+    def is_empty(self) -> bool:
+        with self.connect() as connection:
+            return connection.execute("SELECT NOT EXISTS (SELECT 1 FROM directories)").fetchone()[0] == 1
+
+    def refresh(self, workers: int = 16, full: bool = False) -> CatalogRefreshStats:
+        """
+        Bring the catalog up to date with the filesystem.
+
+        workers: threads stat'ing & listing directories concurrently
+        full: list every directory even if its mtime is unchanged
+        """
+        start = time.perf_counter()
+        stats = CatalogRefreshStats()
+        with self.connect() as connection:
+            # Catalogs built before the walk was limited to the product's datasets also hold other directories,
+            # dropped one by one as the data root above the product directory is among them
+            for (path,) in connection.execute("SELECT path FROM directories").fetchall():
+                if not self.is_cataloged(path):
+                    connection.execute("DELETE FROM files WHERE directory = ?", (path,))
+                    connection.execute("DELETE FROM directories WHERE path = ?", (path,))
+                    stats.directories_removed += 1
+            known_mtimes = dict(connection.execute("SELECT path, mtime_ns FROM directories"))
+            pending = [self.product_directory]
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                while pending:
+                    scans = executor.map(
+                        lambda path: scan_directory(path, known_mtimes.get(path), full), pending
+                    )
+                    pending = []
+                    for scan in scans:
+                        if scan.mtime_ns is None:
+                            self._remove_directory(connection, scan.path)
+                            stats.directories_removed += 1
+                        elif scan.files is None:
+                            stats.directories_unchanged += 1
+                            pending.extend(
+                                row[0] for row in
+                                connection.execute("SELECT path FROM directories WHERE parent = ?", (scan.path,))
+                            )
+                        else:
+                            scan.subdirectories = [path for path in scan.subdirectories if self.is_cataloged(path)]
+                            stats.directories_scanned += 1
+                            stats.directories_removed += self._record_directory(connection, scan)
+                            pending.extend(scan.subdirectories)
+            stats.files = connection.execute("SELECT count(*) FROM files").fetchone()[0]
+
+        stats.seconds = time.perf_counter() - start
+        logger.info(
+            f"File catalog refreshed in {stats.seconds:.2f}s: {stats.files} files, {stats.directories_scanned} "
+            f"directories scanned, {stats.directories_unchanged} unchanged, {stats.directories_removed} removed"
+        )
+        return stats
+
+    def is_cataloged(self, path: str) -> bool:
+        """
+        Whether the directory path is the product directory or lies in one of the product's along track datasets
+        """
+        if path == self.product_directory:
+            return True
+        relative = os.path.relpath(path, self.product_directory)
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            return False
+        return ALONG_TRACK_DATASET_PATTERN.fullmatch(relative.split(os.sep)[0]) is not None
+
+    def _record_directory(self, connection: sqlite3.Connection, scan: DirectoryScan) -> int:
+        """
+        Replace the catalog entries of a rescanned directory, returns the number of removed subdirectories
+        """
+        parent = os.path.dirname(scan.path) if scan.path != self.product_directory else None
+        connection.execute(
+            "INSERT INTO directories (path, parent, mtime_ns) VALUES (?, ?, ?) "
+            "ON CONFLICT (path) DO UPDATE SET mtime_ns = excluded.mtime_ns",
+            (scan.path, parent, scan.mtime_ns)
+        )
+
+        subdirectories = set(scan.subdirectories)
+        removed = [
+            row[0] for row in connection.execute("SELECT path FROM directories WHERE parent = ?", (scan.path,))
+            if row[0] not in subdirectories
+        ]
+        for path in removed:
+            self._remove_directory(connection, path)
+
+        connection.execute("DELETE FROM files WHERE directory = ?", (scan.path,))
+        rows = []
+        for path, size, mtime_ns in scan.files:
+            file_name = os.path.basename(path)
+            try:
+                mission, date = parse_along_track_file_name(file_name)
+            except ValueError:
+                logger.info(f"Not cataloging {path}, not a DUACS along track file name")
+                continue
+            rows.append((path, scan.path, file_name, mission, date.strftime("%Y-%m-%d"), size, mtime_ns))
+        connection.executemany(
+            "INSERT OR REPLACE INTO files (path, directory, file_name, mission, date, size, mtime_ns) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        return len(removed)
+
+    @staticmethod
+    def _remove_directory(connection: sqlite3.Connection, path: str):
+        """Remove a directory and everything below it from the catalog"""
+        # Prefix comparison rather than LIKE, file names are full of '_' wildcards
+        prefix = path.rstrip(os.sep) + os.sep
+        connection.execute(
+            "DELETE FROM files WHERE directory = ? OR substr(directory, 1, ?) = ?", (path, len(prefix), prefix)
+        )
+        connection.execute(
+            "DELETE FROM directories WHERE path = ? OR substr(path, 1, ?) = ?", (path, len(prefix), prefix)
+        )
+
+    def _select(self, columns: str, missions: Optional[Iterable[str]], start_date: Optional[datetime],
+                end_date: Optional[datetime]) -> List[tuple]:
+        clauses, params = [], []
+        if missions is not None:
+            missions = list(missions)
+            clauses.append(f"mission IN ({', '.join('?' * len(missions))})")
+            params.extend(missions)
+        if start_date is not None:
+            clauses.append("date >= ?")
+            params.append(start_date.strftime("%Y-%m-01"))
+        if end_date is not None:
+            clauses.append("date < ?")
+            params.append((end_date.replace(day=1) + relativedelta(months=1)).strftime("%Y-%m-%d"))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.connect() as connection:
+            return connection.execute(f"SELECT {columns} FROM files {where} ORDER BY date, path", params).fetchall()
+
+    def files(
+            self,
+            missions: Optional[Iterable[str]] = None,
+            start_date: Optional[datetime] = None,
+            end_date: Optional[datetime] = None,
+    ) -> List[Path]:
+        """
+        Cataloged files of the given missions, from the month of start_date through the month of end_date (inclusive)
+        """
+        return [Path(row[0]) for row in self._select("path", missions, start_date, end_date)]
+
+    def fingerprints(
+            self,
+            missions: Optional[Iterable[str]] = None,
+            start_date: Optional[datetime] = None,
+            end_date: Optional[datetime] = None,
+    ) -> Dict[Path, FileFingerprint]:
+        """
+        Size & mtime of the cataloged files as of the last refresh, see files for the filters
+        """
+        return {
+            Path(path): FileFingerprint(file_size=size, file_mtime_ns=mtime_ns)
+            for path, size, mtime_ns in self._select("path, size, mtime_ns", missions, start_date, end_date)
+        }
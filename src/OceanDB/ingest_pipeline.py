@@ -0,0 +1,323 @@
+"""
+Staged along-track ingest pipeline
+
+    file discovery ──file_queue──▶ decode workers ──data_queue──▶ writer workers ──▶ Postgres
+
+Discovery runs in a thread of the parent process, NetCDF decode/transform and DB writes run in separate process
+pools. The queues are bounded, so a slow stage blocks the stage feeding it instead of buffering decoded files in
+memory.  Each writer keeps a single connection open for its lifetime.
+
+If a worker process dies (e.g. a writer cannot connect), the other workers are terminated and run raises an
+IngestPipelineError instead of waiting on queues nobody consumes.
+"""
+import multiprocessing as mp
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+
+import psycopg as pg
+
+from OceanDB.OceanDB_ETL import OceanDBETl
+from OceanDB.utils.basin_mask import load_basin_mask
+from OceanDB.utils.logging import get_logger
+from OceanDB.utils.metrics import IngestMetrics
+
+logger = get_logger()
+
+# Sentinel telling a worker to exit
+STOP = None
+# Seconds the parent's threads block on a queue or process before checking whether the pipeline was aborted
+POLL_INTERVAL = .5
+
+
+class IngestPipelineError(RuntimeError):
+    """
+    A pipeline worker process died
+    """
+
+
+@dataclass
+class IngestPipelineStats:
+    files_discovered: int = 0
+    files_skipped: int = 0
+    files_decoded: int = 0
+    files_written: int = 0
+    files_failed: int = 0
+    rows_written: int = 0
+    decode_seconds: float = 0.
+    write_seconds: float = 0.
+    max_file_queue_depth: int = 0
+    max_data_queue_depth: int = 0
+    failed_files: List[str] = field(default_factory=list)
+
+
+def queue_depth(q) -> Optional[int]:
+    """qsize() is not implemented on every platform (e.g. macOS)"""
+    try:
+        return q.qsize()
+    except NotImplementedError:
+        return None
+
+
+def put_unless_stopped(q, item, stopped: threading.Event) -> bool:
+    """
+    Put item on the bounded queue q, giving up once stopped is set.  Returns whether the item was put.
+    """
+    while not stopped.is_set():
+        try:
+            q.put(item, timeout=POLL_INTERVAL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def decode_worker(file_queue, data_queue, result_queue):
+    """
+    Decode NetCDF files from file_queue and put (file, AlongTrackData, AlongTrackMetaData) on data_queue
+    """
+    oceandb_etl = OceanDBETl()
+    while True:
+        file = file_queue.get()
+        if file is STOP:
+            break
+        start = time.perf_counter()
+        try:
+            along_track_data, along_track_metadata = oceandb_etl.extract_along_track_file(file)
+            if along_track_data is None:
+                raise ValueError(f"Could not extract along track data from {file.name}")
+        except Exception as ex:
+            result_queue.put(("failed", file.name, repr(ex)))
+            continue
+        result_queue.put(("decoded", file.name, time.perf_counter() - start))
+        data_queue.put((file, along_track_data, along_track_metadata))
+
+
+def write_worker(data_queue, result_queue, loader: str, batch_size: Optional[int]):
+    """
+    Write decoded files from data_queue to Postgres, committing once per file
+    """
+    oceandb_etl = OceanDBETl()
+    with pg.connect(oceandb_etl.config.postgres_dsn) as connection:
+        while True:
+            item = data_queue.get()
+            if item is STOP:
+                break
+            file, along_track_data, along_track_metadata = item
+            start = time.perf_counter()
+            try:
+                rows = oceandb_etl.ingest_along_track_file(
+                    along_track_data=along_track_data,
+                    along_track_metadata=along_track_metadata,
+                    connection=connection,
+                    loader=loader,
+                    batch_size=batch_size,
+                )
+                connection.commit()
+                if rows:
+                    oceandb_etl.invalidate_query_caches(*along_track_data.time_range())
+            except Exception as ex:
+                connection.rollback()
+                if along_track_data.fingerprint is not None:
+                    try:
+                        oceandb_etl.record_failed_manifest_entry(connection, file.name, along_track_data.fingerprint)
+                        connection.commit()
+                    except Exception:
+                        connection.rollback()
+                result_queue.put(("failed", file.name, repr(ex)))
+                continue
+            result_queue.put((
+                "written", file.name, rows, time.perf_counter() - start, along_track_data.timings,
+                along_track_data.fingerprint.file_size if along_track_data.fingerprint else 0,
+            ))
+
+
+class AlongTrackIngestPipeline:
+    """
+    Pipelined along-track ingest with separate decode and write pools connected by bounded queues.
+
+    decode_workers: processes decoding & transforming NetCDF files (CPU bound)
+    write_workers: processes writing to Postgres, each holding one connection (I/O bound, usually fewer)
+    file_queue_size: max files waiting to be decoded
+    data_queue_size: max decoded files waiting to be written, each holds a file's arrays in memory
+    report_interval: seconds between queue depth reports
+    metrics: aggregates the per stage timings of every written file, its Prometheus textfile is rewritten at each report
+    """
+
+    def __init__(
+            self,
+            decode_workers: int = 6,
+            write_workers: int = 2,
+            file_queue_size: int = 64,
+            data_queue_size: int = 8,
+            loader: str = "copy",
+            batch_size: Optional[int] = None,
+            report_interval: float = 10.,
+            metrics: Optional[IngestMetrics] = None,
+    ):
+        if decode_workers < 1 or write_workers < 1:
+            raise ValueError("The pipeline needs at least one decode worker and one write worker")
+        self.decode_workers = decode_workers
+        self.write_workers = write_workers
+        self.file_queue_size = file_queue_size
+        self.data_queue_size = data_queue_size
+        self.loader = loader
+        self.batch_size = batch_size
+        self.report_interval = report_interval
+        self.metrics = metrics
+
+    def run(self, files: Iterable[Path], skip_file_names: Optional[Set[str]] = None) -> IngestPipelineStats:
+        """
+        Ingest files, skipping any whose name is in skip_file_names (e.g. already ingested files)
+        """
+        skip_file_names = skip_file_names or set()
+        stats = IngestPipelineStats()
+        context = mp.get_context()
+        file_queue = context.Queue(maxsize=self.file_queue_size)
+        data_queue = context.Queue(maxsize=self.data_queue_size)
+        result_queue = context.Queue()
+
+        decoders = [
+            context.Process(target=decode_worker, args=(file_queue, data_queue, result_queue), daemon=True)
+            for _ in range(self.decode_workers)
+        ]
+        writers = [
+            context.Process(
+                target=write_worker,
+                args=(data_queue, result_queue, self.loader, self.batch_size),
+                daemon=True
+            )
+            for _ in range(self.write_workers)
+        ]
+        # Convert the basin mask once here, the decoders then only map it
+        load_basin_mask()
+        for process in decoders + writers:
+            process.start()
+
+        stopped = threading.Event()
+
+        def discover():
+            for file in files:
+                if file.name in skip_file_names:
+                    stats.files_skipped += 1
+                    continue
+                if not put_unless_stopped(file_queue, file, stopped):
+                    return
+                stats.files_discovered += 1
+            for _ in decoders:
+                if not put_unless_stopped(file_queue, STOP, stopped):
+                    return
+
+        def close_writers():
+            # The writers can only stop once every decoder has flushed its output
+            for process in decoders:
+                while process.is_alive():
+                    if stopped.is_set():
+                        return
+                    process.join(timeout=POLL_INTERVAL)
+            for _ in writers:
+                if not put_unless_stopped(data_queue, STOP, stopped):
+                    return
+
+        discovery_thread = threading.Thread(target=discover, daemon=True)
+        closer_thread = threading.Thread(target=close_writers, daemon=True)
+        discovery_thread.start()
+        closer_thread.start()
+
+        start = time.perf_counter()
+        last_report = start
+        while any(process.is_alive() for process in writers) or not result_queue.empty():
+            try:
+                self._record_result(stats, result_queue.get(timeout=1.), self.metrics)
+            except queue.Empty:
+                pass
+
+            crashed = [process for process in decoders + writers if process.exitcode not in (None, 0)]
+            if crashed:
+                stopped.set()
+                self._abort(decoders + writers, [file_queue, data_queue, result_queue],
+                            [discovery_thread, closer_thread])
+                raise IngestPipelineError(
+                    f"{len(crashed)} pipeline worker(s) died (exit codes {[process.exitcode for process in crashed]}), "
+                    f"{stats.files_written} files were written before the pipeline stopped"
+                )
+
+            file_depth = queue_depth(file_queue)
+            data_depth = queue_depth(data_queue)
+            stats.max_file_queue_depth = max(stats.max_file_queue_depth, file_depth or 0)
+            stats.max_data_queue_depth = max(stats.max_data_queue_depth, data_depth or 0)
+            if time.perf_counter() - last_report >= self.report_interval:
+                last_report = time.perf_counter()
+                self._report(stats, file_depth, data_depth, last_report - start)
+                if self.metrics is not None:
+                    self.metrics.write_textfile()
+
+        discovery_thread.join()
+        closer_thread.join()
+        for process in writers:
+            process.join()
+        while True:
+            try:
+                self._record_result(stats, result_queue.get(timeout=.1), self.metrics)
+            except queue.Empty:
+                break
+
+        duration = time.perf_counter() - start
+        logger.info(
+            f"Pipeline finished in {duration:.2f}s: {stats.files_written} files, {stats.rows_written} rows "
+            f"({stats.rows_written / duration:,.0f} rows/s), {stats.files_failed} failed, "
+            f"{stats.files_skipped} skipped, max queue depths files={stats.max_file_queue_depth}/{self.file_queue_size} "
+            f"decoded={stats.max_data_queue_depth}/{self.data_queue_size}"
+        )
+        for failure in stats.failed_files:
+            logger.info(f"Failed: {failure}")
+        if self.metrics is not None:
+            logger.info(f"Per stage timings\n{self.metrics.summary()}")
+            self.metrics.write_textfile()
+        return stats
+
+    @staticmethod
+    def _abort(processes: list, queues: list, threads: List[threading.Thread]):
+        """
+        Terminate the workers and let the threads feeding the queues exit, the stopped event must be set
+        """
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join(timeout=5.)
+        # Items left on the queues are dropped instead of blocking the parent's exit
+        for q in queues:
+            q.cancel_join_thread()
+        for thread in threads:
+            thread.join(timeout=5.)
+
+    @staticmethod
+    def _record_result(stats: IngestPipelineStats, result: tuple, metrics: Optional[IngestMetrics] = None):
+        kind, file_name, *values = result
+        if kind == "decoded":
+            stats.files_decoded += 1
+            stats.decode_seconds += values[0]
+        elif kind == "written":
+            rows, seconds, timings, size = values
+            stats.files_written += 1
+            stats.rows_written += rows
+            stats.write_seconds += seconds
+            if metrics is not None:
+                metrics.record_file(file_name, timings, rows, size)
+        else:
+            stats.files_failed += 1
+            stats.failed_files.append(f"{file_name}: {values[0]}")
+            if metrics is not None:
+                metrics.record_failure(file_name, values[0])
+
+    def _report(self, stats: IngestPipelineStats, file_depth: Optional[int], data_depth: Optional[int], elapsed: float):
+        # A full data queue means the writers are the bottleneck, an empty one means the decoders are
+        logger.info(
+            f"queue depth files={file_depth}/{self.file_queue_size} decoded={data_depth}/{self.data_queue_size} | "
+            f"discovered {stats.files_discovered} decoded {stats.files_decoded} written {stats.files_written} "
+            f"failed {stats.files_failed} | {stats.rows_written / elapsed:,.0f} rows/s"
+        )
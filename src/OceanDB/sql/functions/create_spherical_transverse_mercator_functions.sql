@@ -0,0 +1,21 @@
+-- Spherical transverse mercator of utils.projections, central meridian lon0, sphere radius 0.9996 * WGS84 a.
+-- Plain SQL functions so the planner inlines them into the queries.
+CREATE OR REPLACE FUNCTION spherical_transverse_mercator_x(
+    latitude double precision,
+    longitude double precision,
+    lon0 double precision
+) RETURNS double precision
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT 0.9996 * 6378137.0 * atanh(sin(radians(longitude - lon0)) * cos(radians(latitude)))
+$$;
+
+CREATE OR REPLACE FUNCTION spherical_transverse_mercator_y(
+    latitude double precision,
+    longitude double precision,
+    lon0 double precision
+) RETURNS double precision
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT 0.9996 * 6378137.0 * atan(tan(radians(latitude)) / NULLIF(cos(radians(longitude - lon0)), 0))
+$$;
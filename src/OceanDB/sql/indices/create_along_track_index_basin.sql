@@ -1,4 +1,4 @@
-CREATE INDEX IF NOT EXISTS along_track_basin_idx
-    ON public.along_track USING btree
+CREATE INDEX IF NOT EXISTS {index_name}
+    ON {table_name} USING btree
     (basin_id ASC NULLS LAST)
     WITH (deduplicate_items=True);
\ No newline at end of file
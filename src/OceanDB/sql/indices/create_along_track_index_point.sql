@@ -1,4 +1,4 @@
-CREATE INDEX IF NOT EXISTS along_track_point_idx
-            ON along_track USING gist
+CREATE INDEX IF NOT EXISTS {index_name}
+            ON {table_name} USING gist
             (along_track_point)
             WITH (buffering=auto);
\ No newline at end of file
@@ -1,3 +1,3 @@
-CREATE INDEX IF NOT EXISTS along_track_time_idx
-    ON along_track USING btree
+CREATE INDEX IF NOT EXISTS {index_name}
+    ON {table_name} USING btree
     (date_time ASC NULLS LAST);
\ No newline at end of file
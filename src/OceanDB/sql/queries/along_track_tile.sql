@@ -0,0 +1,18 @@
+SELECT
+    latitude,
+    longitude,
+    sla_filtered,
+    date_time,
+    basin_id,
+    array_position(%(missions)s::text[], mission)::smallint AS mission_index
+FROM along_track
+WHERE ST_DWithin(
+    along_track_point,
+    ST_Segmentize(
+        ST_MakeEnvelope(%(min_longitude)s, %(min_latitude)s, %(max_longitude)s, %(max_latitude)s, 4326),
+        %(segment_degrees)s
+    )::geography,
+    %(distance)s
+)
+AND date_time BETWEEN %(start_date_time)s AND %(end_date_time)s
+AND mission = ANY(%(missions)s)
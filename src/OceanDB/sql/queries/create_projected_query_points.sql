@@ -0,0 +1,14 @@
+CREATE TEMP TABLE IF NOT EXISTS projected_query_points
+(
+    query_index integer PRIMARY KEY,
+    latitude double precision,
+    longitude double precision,
+    central_date_time timestamp without time zone,
+    x0 double precision,
+    y0 double precision,
+    min_longitude double precision,
+    min_latitude double precision,
+    max_longitude double precision,
+    max_latitude double precision,
+    connected_basin_ids smallint[]
+) ON COMMIT DROP;
@@ -0,0 +1,9 @@
+CREATE TEMP TABLE IF NOT EXISTS query_points
+(
+    query_index integer PRIMARY KEY,
+    latitude double precision,
+    longitude double precision,
+    central_date_time timestamp without time zone,
+    distance double precision,
+    connected_basin_ids smallint[]
+) ON COMMIT DROP;
@@ -1,13 +1,30 @@
 SELECT
-    latitude,
-    longitude,
-    sla_filtered,
-    EXTRACT(EPOCH FROM (%(central_date_time)s - date_time)) AS time_difference_secs,
-    along_track_point <-> ST_SetSRID(ST_MakePoint(%(longitude)s, %(latitude)s), 4326) AS distance
-FROM along_track
-WHERE date_time BETWEEN %(central_date_time)s - %(time_delta)s::interval
-                    AND %(central_date_time)s + %(time_delta)s::interval
-  AND basin_id = ANY(%(connected_basin_ids)s)
-  AND mission = ANY(%(missions)s)
-ORDER BY distance
-LIMIT 3;
\ No newline at end of file
+    p.latitude,
+    p.longitude,
+    p.sla_filtered{p_variables},
+    p.time_difference_secs,
+    p.distance
+FROM unnest(%(mission_groups)s::text[], %(mission_group_k)s::integer[]) AS m(missions, k)
+CROSS JOIN LATERAL (
+    SELECT
+        latitude,
+        longitude,
+        sla_filtered{variables},
+        EXTRACT(EPOCH FROM (%(central_date_time)s - date_time))::double precision AS time_difference_secs,
+        along_track_point <-> ST_SetSRID(ST_MakePoint(%(longitude)s, %(latitude)s), 4326)::geography AS distance
+    FROM along_track
+    WHERE date_time BETWEEN {min_date_time} AND {max_date_time}
+      AND date_time BETWEEN %(start_date_time)s AND %(end_date_time)s
+      AND basin_id = ANY(%(connected_basin_ids)s)
+      AND mission = ANY(string_to_array(m.missions, ','))
+      AND (%(max_distance)s::double precision IS NULL OR ST_DWithin(
+          along_track_point,
+          ST_SetSRID(ST_MakePoint(%(longitude)s, %(latitude)s), 4326)::geography,
+          %(max_distance)s,
+          false
+      ))
+    ORDER BY distance
+    LIMIT m.k
+) p
+ORDER BY p.distance
+LIMIT %(k)s;
@@ -0,0 +1,38 @@
+SELECT
+    q.query_index,
+    p.latitude,
+    p.longitude,
+    p.sla_filtered,
+    p.distance,
+    p.time_difference_secs{p_variables}
+FROM query_points q
+CROSS JOIN LATERAL (
+    SELECT n.*
+    FROM unnest(%(mission_groups)s::text[], %(mission_group_k)s::integer[]) AS m(missions, k)
+    CROSS JOIN LATERAL (
+        SELECT
+            latitude,
+            longitude,
+            sla_filtered{variables},
+            EXTRACT(EPOCH FROM (q.central_date_time - date_time))::double precision AS time_difference_secs,
+            along_track_point <-> ST_SetSRID(ST_MakePoint(q.longitude, q.latitude), 4326)::geography AS distance
+        FROM along_track
+        WHERE date_time BETWEEN q.central_date_time - %(time_delta)s::interval
+                            AND q.central_date_time + %(time_delta)s::interval
+          AND date_time BETWEEN %(min_central_date_time)s::timestamp - %(time_delta)s::interval
+                            AND %(max_central_date_time)s::timestamp + %(time_delta)s::interval
+          AND basin_id = ANY(q.connected_basin_ids)
+          AND mission = ANY(string_to_array(m.missions, ','))
+          AND (%(max_distance)s::double precision IS NULL OR ST_DWithin(
+              along_track_point,
+              ST_SetSRID(ST_MakePoint(q.longitude, q.latitude), 4326)::geography,
+              %(max_distance)s,
+              false
+          ))
+        ORDER BY distance
+        LIMIT m.k
+    ) n
+    ORDER BY n.distance
+    LIMIT %(k)s
+) p
+ORDER BY q.query_index, p.distance;
@@ -0,0 +1,39 @@
+SELECT
+    q.query_index,
+    p.latitude,
+    p.longitude,
+    p.sla_filtered,
+    p.distance,
+    p.time_difference_secs,
+    p.x,
+    p.y,
+    p.x - q.x0 AS delta_x,
+    p.y - q.y0 AS delta_y{p_variables}
+FROM projected_query_points q
+CROSS JOIN LATERAL (
+    SELECT
+        latitude,
+        longitude,
+        sla_filtered{variables},
+        ST_Distance(ST_MakePoint(q.longitude, q.latitude), along_track_point) AS distance,
+        EXTRACT(EPOCH FROM (q.central_date_time - date_time))::double precision AS time_difference_secs,
+        projected.x,
+        projected.y
+    FROM along_track
+    CROSS JOIN LATERAL (
+        SELECT
+            spherical_transverse_mercator_x(latitude, longitude, q.longitude) AS x,
+            spherical_transverse_mercator_y(latitude, longitude, q.longitude) AS y
+    ) projected
+    WHERE ST_Within(along_track_point::geometry,
+                    ST_MakeEnvelope(q.min_longitude, q.min_latitude, q.max_longitude, q.max_latitude, 4326))
+    AND date_time BETWEEN q.central_date_time - %(time_delta)s::interval
+                      AND q.central_date_time + %(time_delta)s::interval
+    AND date_time BETWEEN %(min_central_date_time)s::timestamp - %(time_delta)s::interval
+                      AND %(max_central_date_time)s::timestamp + %(time_delta)s::interval
+    AND (q.connected_basin_ids IS NULL OR basin_id = ANY(q.connected_basin_ids))
+    AND mission = ANY(%(missions)s)
+    AND projected.x BETWEEN q.x0 - %(Lx)s AND q.x0 + %(Lx)s
+    AND projected.y BETWEEN q.y0 - %(Ly)s AND q.y0 + %(Ly)s
+) p
+ORDER BY q.query_index;
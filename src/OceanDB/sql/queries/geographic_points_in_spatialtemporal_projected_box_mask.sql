@@ -0,0 +1,23 @@
+SELECT
+    latitude,
+    longitude,
+    sla_filtered,
+    ST_Distance(ST_MakePoint(%(longitude)s, %(latitude)s), along_track_point) AS distance,
+    EXTRACT(EPOCH FROM (%(central_date_time)s - date_time))::double precision AS time_difference_secs,
+    projected.x,
+    projected.y,
+    projected.x - %(x0)s AS delta_x,
+    projected.y - %(y0)s AS delta_y{variables}
+FROM along_track
+CROSS JOIN LATERAL (
+    SELECT
+        spherical_transverse_mercator_x(latitude, longitude, %(longitude)s) AS x,
+        spherical_transverse_mercator_y(latitude, longitude, %(longitude)s) AS y
+) projected
+WHERE ST_Within(along_track_point::geometry, ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, 4326))
+AND date_time BETWEEN %(central_date_time)s - %(time_delta)s::interval
+                  AND %(central_date_time)s + %(time_delta)s::interval
+AND basin_id = ANY(%(connected_basin_ids)s)
+AND mission = ANY(%(missions)s)
+AND projected.x BETWEEN %(x0)s - %(Lx)s AND %(x0)s + %(Lx)s
+AND projected.y BETWEEN %(y0)s - %(Ly)s AND %(y0)s + %(Ly)s;
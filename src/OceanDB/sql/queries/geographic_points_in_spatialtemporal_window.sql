@@ -1,7 +1,7 @@
 SELECT
     latitude,
     longitude,
-    sla_filtered,
+    sla_filtered{variables},
 	ST_Distance(ST_MakePoint(%(longitude)s, %(latitude)s),along_track_point) as distance,
     EXTRACT(EPOCH FROM (%(central_date_time)s - date_time)) AS time_difference_secs
 FROM along_track
@@ -0,0 +1,29 @@
+SELECT
+    q.query_index,
+    p.latitude,
+    p.longitude,
+    p.sla_filtered,
+    p.distance,
+    p.time_difference_secs{p_variables}
+FROM query_points q
+CROSS JOIN LATERAL (
+    SELECT
+        latitude,
+        longitude,
+        sla_filtered{variables},
+        ST_Distance(ST_MakePoint(q.longitude, q.latitude), along_track_point) as distance,
+        EXTRACT(EPOCH FROM (q.central_date_time - date_time))::double precision AS time_difference_secs
+    FROM along_track
+    WHERE ST_DWithin(
+        along_track_point::geography,
+        ST_SetSRID(ST_MakePoint(q.longitude, q.latitude), 4326)::geography,
+        q.distance
+    )
+    AND date_time BETWEEN q.central_date_time - %(time_delta)s::interval
+                      AND q.central_date_time + %(time_delta)s::interval
+    AND date_time BETWEEN %(min_central_date_time)s::timestamp - %(time_delta)s::interval
+                      AND %(max_central_date_time)s::timestamp + %(time_delta)s::interval
+    AND basin_id = ANY(q.connected_basin_ids)
+    AND mission = ANY(%(missions)s)
+) p
+ORDER BY q.query_index;
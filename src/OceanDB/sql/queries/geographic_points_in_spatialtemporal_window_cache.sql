@@ -0,0 +1,14 @@
+SELECT
+    latitude,
+    longitude,
+    sla_filtered,
+    date_time
+FROM along_track
+WHERE ST_DWithin(
+    along_track_point::geography,
+    ST_SetSRID(ST_MakePoint(%(longitude)s, %(latitude)s), 4326)::geography,
+    %(distance)s
+)
+AND date_time BETWEEN %(start_date_time)s AND %(end_date_time)s
+AND basin_id = ANY(%(connected_basin_ids)s)
+AND mission = ANY(%(missions)s)
@@ -0,0 +1,12 @@
+CREATE TABLE IF NOT EXISTS public.{table_name} (
+            file_name text NOT NULL,
+            file_size bigint NOT NULL,
+            file_mtime_ns bigint NOT NULL,
+            content_hash text NULL,
+            row_count bigint NULL,
+            ingest_seconds double precision NULL,
+            status text NOT NULL,
+            updated_at timestamp with time zone NOT NULL DEFAULT now(),
+            CONSTRAINT along_track_ingest_manifest_pkey PRIMARY KEY (file_name),
+            CONSTRAINT along_track_ingest_manifest_status CHECK (status IN ('complete', 'failed'))
+          );
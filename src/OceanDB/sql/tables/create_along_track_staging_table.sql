@@ -0,0 +1,5 @@
+CREATE UNLOGGED TABLE {staging_name}
+(
+    LIKE {table_name} INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING STORAGE
+);
+ALTER TABLE {staging_name} ALTER COLUMN id SET DEFAULT nextval({sequence_name}::regclass);
@@ -0,0 +1,158 @@
+from contextlib import nullcontext
+
+import numpy as np
+import pytest
+
+from OceanDB.AlongTrack import AlongTrack
+
+# Settings Config requires, placeholders let the query & ingest classes be built without a .env or database
+REQUIRED_SETTINGS = ["POSTGRES_USERNAME", "POSTGRES_PASSWORD", "ALONG_TRACK_DATA_DIRECTORY", "EDDY_DATA_DIRECTORY",
+                     "COPERNICUS_USERNAME", "COPERNICUS_PASSWORD"]
+
+
+class FakeCopy:
+    """
+    COPY of a FakeConnection, records the rows (or buffers) written and returns the connection's copy_data
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def write(self, buffer):
+        self.rows.append(bytes(buffer))
+
+    def write_row(self, row):
+        self.rows.append(row)
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+
+class FakeCursor:
+    """
+    Cursor of a FakeConnection, records its statements on the connection and returns the connection's rows
+    """
+
+    def __init__(self, connection, name=None, row_factory=None):
+        self.connection = connection
+        self.name = name
+        self.itersize = None
+        self.rows = list(connection.rows)
+        self.fetches = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, query, params=None, prepare=None):
+        self.connection.record(query, params, prepare)
+
+    def executemany(self, query, params_seq, returning=False):
+        for params in params_seq:
+            self.connection.record(query, params)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        self.fetches.append(len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def copy(self, query, params=None):
+        self.connection.record(query, params)
+        # Split mid row, like the network does
+        copy = FakeCopy([self.connection.copy_data[:50], self.connection.copy_data[50:]])
+        self.connection.copies.append(copy)
+        return copy
+
+
+class FakeConnection:
+    """
+    Stands in for a psycopg connection without a database: every cursor returns rows, every COPY returns copy_data.
+
+    statements: (query, params) of everything run on the connection, queries rendered with whitespace collapsed
+    prepared: the queries executed with prepare=True
+    """
+
+    def __init__(self, rows=(), copy_data: bytes = b""):
+        self.rows = list(rows)
+        self.copy_data = copy_data
+        self.statements = []
+        self.prepared = []
+        self.cursors = []
+        self.copies = []
+        self.autocommit = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def record(self, query, params=None, prepare=None):
+        query = " ".join((query if isinstance(query, str) else query.as_string(None)).split())
+        self.statements.append((query, params))
+        if prepare:
+            self.prepared.append(query)
+
+    @property
+    def queries(self):
+        return [query for query, _ in self.statements]
+
+    def cursor(self, name=None, row_factory=None):
+        cursor = FakeCursor(self, name, row_factory)
+        self.cursors.append(cursor)
+        return cursor
+
+    def execute(self, query, params=None, prepare=None):
+        self.record(query, params, prepare)
+        return self.cursor()
+
+    def transaction(self):
+        return nullcontext()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    for name in REQUIRED_SETTINGS:
+        monkeypatch.setenv(name, "unused")
+
+
+@pytest.fixture
+def along_track(settings) -> AlongTrack:
+    return AlongTrack()
+
+
+@pytest.fixture
+def masked_along_track(along_track, monkeypatch) -> AlongTrack:
+    """
+    AlongTrack that puts every point in basin 1, connected to basin 2, without the basin mask file or the database
+    """
+    along_track.__dict__["basin_connection_map"] = {1: [1, 2]}
+    monkeypatch.setattr(along_track, "basin_mask", lambda latitudes, longitudes: np.ones(len(latitudes), dtype=int))
+    return along_track
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from OceanDB import AlongTrackTile as along_track_tile
+from OceanDB.AlongTrackTile import AlongTrackTile, BruteForceTree, WGS84_MEAN_RADIUS, unit_vectors
+from OceanDB.utils.geodesic import vincenty_distance
+from OceanDB.utils.projections import latitude_longitude_to_spherical_transverse_mercator
+from OceanDB.utils.query_cache import to_postgres_microseconds
+
+DATE = datetime(2013, 3, 14, 5)
+DAY = 86_400_000_000
+
+
+@pytest.fixture
+def along_track(masked_along_track):
+    masked_along_track.basin_connection_map.update({2: [2, 1], 3: [3]})
+    return masked_along_track
+
+
+@pytest.fixture
+def rows():
+    rng = np.random.default_rng(0)
+    n_rows = 30_000
+    return {
+        "latitude": rng.uniform(-75, -60, n_rows),
+        "longitude": rng.uniform(15, 45, n_rows),
+        # Every hundredth a fill value
+        "sla_filtered": np.where(np.arange(n_rows) % 100, rng.integers(-500, 500, n_rows), 32767).astype(np.int16),
+        "date_time": to_postgres_microseconds(DATE) + rng.integers(-20 * DAY, 20 * DAY, n_rows),
+        "basin_id": rng.choice(np.array([1, 2, 3], dtype=np.int16), n_rows),
+        "mission_index": rng.choice(np.array([1, 2], dtype=np.int16), n_rows),
+    }
+
+
+@pytest.fixture(params=["kdtree", "brute_force"])
+def tile(request, monkeypatch, along_track, rows):
+    if request.param == "brute_force":
+        monkeypatch.setattr(along_track_tile, "cKDTree", None)
+    elif along_track_tile.cKDTree is None:
+        pytest.skip("scipy is not installed")
+    monkeypatch.setattr(AlongTrackTile, "_fetch", lambda self, start_date, end_date: rows)
+    return AlongTrackTile(along_track, -70, -65, 25, 35, DATE - timedelta(days=2), DATE + timedelta(days=2),
+                          missions=["al", "c2"], margin=200_000., time_margin=timedelta(days=5))
+
+
+def queries():
+    latitudes = np.array([-67.5, -69.9, -65.2, -50.])
+    longitudes = np.array([30., 25.1, 34.8, 30.])
+    dates = [DATE, DATE + timedelta(days=1), DATE - timedelta(hours=7), DATE]
+    return latitudes, longitudes, dates
+
+
+def test_brute_force_tree():
+    xyz = unit_vectors(np.linspace(-10, 10, 50), np.linspace(0, 20, 50))
+    tree = BruteForceTree(xyz)
+    distances, indices = tree.query(xyz[10], k=3)
+    assert indices[0] == 10 and set(indices) == {9, 10, 11}
+    assert sorted(tree.query_ball_point(xyz[10], distances[-1])) == [9, 10, 11]
+
+
+def test_points_in_r_dt(monkeypatch, tile, rows):
+    fallback = []
+    monkeypatch.setattr(tile.along_track, "geographic_points_in_r_dt",
+                        lambda latitudes, **kwargs: fallback.append(latitudes) or ["sql"] * len(latitudes))
+    latitudes, longitudes, dates = queries()
+    results = list(tile.geographic_points_in_r_dt(
+        latitudes, longitudes, dates, distances=150_000., time_window=timedelta(days=3), missions=["al"]
+    ))
+
+    np.testing.assert_array_equal(fallback[0], [-50.])
+    assert results[3] == "sql"
+    for latitude, longitude, date, result in zip(latitudes, longitudes, dates, results[:3]):
+        distance = vincenty_distance(latitude, longitude, rows["latitude"], rows["longitude"])
+        time_difference = to_postgres_microseconds(date) - rows["date_time"]
+        expected = ((distance <= 150_000.) & (np.abs(time_difference) <= 3 * DAY) & (rows["mission_index"] == 1)
+                    & np.isin(rows["basin_id"], [1, 2]))
+        assert expected.any()
+        assert np.array_equal(np.sort(result.latitude), np.sort(rows["latitude"][expected]))
+        np.testing.assert_allclose(np.sort(result.distance), np.sort(distance[expected]))
+        np.testing.assert_allclose(np.sort(result.delta_t), np.sort(time_difference[expected] / 1e6))
+        sla_filtered = np.where(rows["sla_filtered"] == 32767, np.nan, 0.001 * rows["sla_filtered"])
+        np.testing.assert_allclose(np.sort(result.sla_filtered), np.sort(sla_filtered[expected]))
+
+
+def test_nearest_neighbors_dt(monkeypatch, tile, rows):
+    monkeypatch.setattr(tile.along_track, "geographic_nearest_neighbors_dt",
+                        lambda latitudes, **kwargs: ["sql"] * len(latitudes))
+    latitudes, longitudes, dates = queries()
+    results = list(tile.geographic_nearest_neighbors_dt(latitudes, longitudes, dates, time_window=timedelta(days=2),
+                                                       missions=["al", "c2"]))
+
+    assert results[3] == "sql"
+    xyz = unit_vectors(rows["latitude"], rows["longitude"])
+    for latitude, longitude, date, result in zip(latitudes, longitudes, dates, results[:3]):
+        chords = np.linalg.norm(xyz - unit_vectors(latitude, longitude), axis=1)
+        distance = 2 * WGS84_MEAN_RADIUS * np.arcsin(chords / 2)
+        valid = ((np.abs(to_postgres_microseconds(date) - rows["date_time"]) <= DAY)
+                 & np.isin(rows["basin_id"], [1, 2]))
+        nearest = np.flatnonzero(valid)[np.argsort(distance[valid])[:3]]
+        np.testing.assert_array_equal(result.latitude, rows["latitude"][nearest])
+        np.testing.assert_allclose(result.distance, distance[nearest])
+
+
+def test_projected_points_in_dx_dy_dt(monkeypatch, tile, rows):
+    fallback = []
+    monkeypatch.setattr(tile.along_track, "projected_points_in_dx_dy_dt",
+                        lambda latitudes, **kwargs: fallback.append(latitudes) or ["sql"] * len(latitudes))
+    latitudes, longitudes, dates = queries()
+    results = list(tile.projected_points_in_dx_dy_dt(
+        latitudes, longitudes, dates, Lx=100_000., Ly=50_000., time_window=timedelta(days=3),
+        missions=["al", "c2"], should_basin_mask=False
+    ))
+
+    assert results[3] == "sql"
+    for latitude, longitude, date, result in zip(latitudes, longitudes, dates, results[:3]):
+        x0, y0 = latitude_longitude_to_spherical_transverse_mercator(latitude, longitude, lon0=longitude)
+        x, y = latitude_longitude_to_spherical_transverse_mercator(rows["latitude"], rows["longitude"], lon0=longitude)
+        expected = ((np.abs(x - x0) <= 100_000.) & (np.abs(y - y0) <= 50_000.)
+                    & (np.abs(to_postgres_microseconds(date) - rows["date_time"]) <= 3 * DAY))
+        assert np.array_equal(np.sort(result.latitude), np.sort(rows["latitude"][expected]))
+        np.testing.assert_allclose(np.sort(result.delta_x), np.sort(x[expected] - x0))
+
+    # A box wider than the margin is not covered by the tile
+    list(tile.projected_points_in_dx_dy_dt(latitudes[:1], longitudes[:1], dates[:1], Lx=300_000.,
+                                          missions=["al", "c2"]))
+    np.testing.assert_array_equal(fallback[-1], latitudes[:1])
+
+
+def test_nearest_neighbors_per_mission(monkeypatch, tile, rows):
+    monkeypatch.setattr(tile.along_track, "geographic_nearest_neighbors_dt",
+                        lambda latitudes, **kwargs: ["sql"] * len(latitudes))
+    latitudes, longitudes, dates = queries()
+    results = list(tile.geographic_nearest_neighbors_dt(latitudes[:3], longitudes[:3], dates[:3],
+                                                       time_window=timedelta(days=2), max_distance=60_000.,
+                                                       k_per_mission={"al": 2, "c2": 1}))
+
+    xyz = unit_vectors(rows["latitude"], rows["longitude"])
+    for latitude, longitude, date, result in zip(latitudes, longitudes, dates, results):
+        chords = np.linalg.norm(xyz - unit_vectors(latitude, longitude), axis=1)
+        distance = 2 * WGS84_MEAN_RADIUS * np.arcsin(chords / 2)
+        valid = ((np.abs(to_postgres_microseconds(date) - rows["date_time"]) <= DAY)
+                 & np.isin(rows["basin_id"], [1, 2]) & (distance <= 60_000.))
+        expected = []
+        for mission_index, k in [(1, 2), (2, 1)]:
+            candidates = np.flatnonzero(valid & (rows["mission_index"] == mission_index))
+            expected.extend(candidates[np.argsort(distance[candidates])[:k]])
+        expected = np.array(expected)[np.argsort(distance[expected], kind="stable")]
+        np.testing.assert_allclose(result.distance, distance[expected])
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from OceanDB.AsyncAlongTrack import AsyncAlongTrack
+
+
+@pytest.fixture
+def along_track(settings):
+    return AsyncAlongTrack(max_concurrency=3)
+
+
+def test_in_order_bounds_concurrency(along_track):
+    running = 0
+    max_running = 0
+
+    def job(index):
+        async def run():
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            # Later jobs finish first
+            await asyncio.sleep(0.01 * (10 - index))
+            running -= 1
+            return [index, None]
+        return run
+
+    async def collect():
+        return [result async for result in along_track._in_order([job(index) for index in range(10)])]
+
+    results = asyncio.run(collect())
+
+    assert results == [item for index in range(10) for item in (index, None)]
+    assert max_running == 3
+
+
+def test_in_order_cancels_pending_jobs(along_track):
+    started = []
+    finished = []
+
+    def job(index):
+        async def run():
+            started.append(index)
+            await asyncio.sleep(0 if index == 0 else 10)
+            finished.append(index)
+            return [index]
+        return run
+
+    async def first():
+        results = along_track._in_order([job(index) for index in range(5)])
+        result = await results.__anext__()
+        await results.aclose()
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(first()) == 0
+    assert max(started) <= 3
+    assert finished == [0]
@@ -0,0 +1,41 @@
+import netCDF4 as nc
+import numpy as np
+import pytest
+
+from OceanDB.utils.basin_mask import basin_mask, convert_basin_mask
+
+
+@pytest.fixture
+def mask(tmp_path):
+    source = tmp_path / "basin_mask.nc"
+    with nc.Dataset(source, "w") as ds:
+        ds.createDimension("lat", 1080)
+        ds.createDimension("lon", 2160)
+        variable = ds.createVariable("basinmask", "i4", ("lat", "lon"))
+        variable[:] = np.arange(1080 * 2160, dtype=np.int32).reshape(1080, 2160) % 100
+    destination = convert_basin_mask(source, tmp_path / "cache" / "basin_mask.npy")
+    return np.load(destination, mmap_mode="r")
+
+
+def test_convert_basin_mask(mask):
+    assert mask.dtype == np.int16
+    assert mask.shape == (1080, 2160)
+    assert not mask.flags.writeable
+
+
+def test_basin_mask_lookup(mask):
+    latitude = np.ma.masked_array([-90.0, 0.0, 0.1, 90.0, 45.0])
+    longitude = np.array([0.0, -0.1, 180.0, 359.99, -1e-14])
+    expected = np.array([
+        mask[0, 0],
+        mask[540, 2159],
+        mask[540, 1080],
+        mask[1079, 2159],
+        mask[810, 0],
+    ])
+    np.testing.assert_array_equal(basin_mask(latitude, longitude, mask=mask), expected)
+
+
+def test_basin_mask_rejects_nan(mask):
+    with pytest.raises(ValueError):
+        basin_mask([np.nan], [0.0], mask=mask)
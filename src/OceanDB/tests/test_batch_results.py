@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from OceanDB.AlongTrack import SLA_Batch, SLA_Geographic
+
+
+def result(n_rows: int, start: float = 0.) -> SLA_Geographic:
+    values = start + np.arange(n_rows, dtype=np.float64)
+    return SLA_Geographic(latitude=values, longitude=values + 100, sla_filtered=values / 1000, distance=values * 10,
+                          delta_t=-values)
+
+
+@pytest.fixture
+def batch(along_track) -> SLA_Batch:
+    return along_track.as_batch([result(2), None, result(3, start=10)])
+
+
+def test_offsets_and_query_index(batch):
+    assert len(batch) == 3
+    np.testing.assert_array_equal(batch.offsets, [0, 2, 2, 5])
+    np.testing.assert_array_equal(batch.columns["query_index"], [0, 0, 2, 2, 2])
+    np.testing.assert_array_equal(batch[2]["latitude"], [10, 11, 12])
+    assert len(batch[1]["latitude"]) == 0
+    assert batch.attributes["sla_filtered"]["units"] == "m"
+    assert "scale_factor" not in batch.attributes["sla_filtered"]
+
+
+def test_empty_batch():
+    batch = SLA_Batch.from_results([None, None])
+    np.testing.assert_array_equal(batch.offsets, [0, 0, 0])
+    assert set(batch.columns) == {"query_index", "latitude", "longitude", "sla_filtered", "distance", "delta_t"}
+
+
+def test_to_xarray(batch):
+    dataset = batch.to_xarray()
+    assert dataset.sizes == {"obs": 5, "query": 3, "query_offset": 4}
+    np.testing.assert_array_equal(dataset["row_size"], [2, 0, 3])
+    assert dataset["row_size"].attrs["sample_dimension"] == "obs"
+    assert dataset["latitude"].attrs["standard_name"] == "latitude"
+    np.testing.assert_array_equal(dataset["sla_filtered"], batch.columns["sla_filtered"])
+
+
+def test_to_arrow(batch):
+    pa = pytest.importorskip("pyarrow")
+    table = batch.to_arrow()
+    assert table.num_rows == 5
+    assert table.schema.field("query_index").type == pa.int32()
+    assert table.schema.field("sla_filtered").metadata[b"units"] == b"m"
+    np.testing.assert_array_equal(table.column("distance").to_numpy(), batch.columns["distance"])
@@ -0,0 +1,124 @@
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from OceanDB.AlongTrack import time_ordered_chunks
+from OceanDB.tests.conftest import FakeConnection
+from OceanDB.utils.binary_copy import PGCOPY_HEADER, PGCOPY_TRAILER, encode_binary_copy_rows
+
+
+def test_time_ordered_chunks():
+    dates = [datetime(2013, 3, 14) + timedelta(days=day) for day in [5, 1, 3, 0, 4, 2, 6]]
+    chunks = time_ordered_chunks(dates, 3)
+
+    assert [list(chunk) for chunk in chunks] == [[3, 1, 5], [2, 4, 0], [6]]
+
+
+def test_batched_query_regroups_rows_by_query_index(along_track, monkeypatch):
+    query_index = np.array([0, 0, 2, 3, 3, 3], dtype=np.int32)
+    latitude = np.arange(len(query_index), dtype=float)
+    rows = encode_binary_copy_rows(
+        [("query_index", query_index), ("latitude", latitude), ("longitude", latitude + 100),
+         ("sla_filtered", np.arange(len(query_index), dtype=np.int16) * 10), ("distance", latitude * 1000),
+         ("time_difference_secs", -latitude)],
+        dict(along_track.batch_result_columns),
+    )
+    connection = FakeConnection(copy_data=PGCOPY_HEADER + rows.tobytes() + PGCOPY_TRAILER)
+    monkeypatch.setattr(along_track, "connection", lambda: nullcontext(connection))
+
+    n_points = 5
+    results = list(along_track._batched_query(
+        query_file=along_track.geo_spatiotemporal_batch_query,
+        latitudes=np.arange(n_points, dtype=float),
+        longitudes=np.zeros(n_points),
+        dates=[datetime(2013, 3, 14)] * n_points,
+        distances=[1000.] * n_points,
+        connected_basin_ids=[[1]] * n_points,
+        params={},
+        batch_size=n_points,
+    ))
+
+    assert len(connection.copies[0].rows) == n_points
+    assert [result is None for result in results] == [False, True, False, False, True]
+    np.testing.assert_array_equal(results[0].latitude, [0, 1])
+    np.testing.assert_array_equal(results[2].longitude, [102])
+    np.testing.assert_array_equal(results[3].delta_t, [-3, -4, -5])
+    np.testing.assert_allclose(results[3].sla_filtered, [.03, .04, .05])
+
+
+def test_projected_points_in_dx_dy_dt_batches(along_track, monkeypatch):
+    query_index = np.array([0, 0, 2], dtype=np.int32)
+    values = {name: np.arange(3, dtype=dtype) for name, dtype in along_track.projected_batch_result_columns}
+    values["query_index"] = query_index
+    rows = encode_binary_copy_rows([(name, values[name]) for name, _ in along_track.projected_batch_result_columns],
+                                   dict(along_track.projected_batch_result_columns))
+    connection = FakeConnection(copy_data=PGCOPY_HEADER + rows.tobytes() + PGCOPY_TRAILER)
+    monkeypatch.setattr(along_track, "connection", lambda: nullcontext(connection))
+
+    results = list(along_track.projected_points_in_dx_dy_dt(
+        np.array([-69., -68., -67.]), np.array([28., 29., 30.]), [datetime(2013, 3, 14)] * 3, Lx=1e5, Ly=5e4,
+        should_basin_mask=False, batch_size=3
+    ))
+
+    assert [result is None for result in results] == [False, True, False]
+    np.testing.assert_array_equal(results[0].delta_x, [0, 1])
+    np.testing.assert_array_equal(results[2].delta_y, [2])
+    # Each point is copied with its projected center & latitude/longitude envelope, unmasked
+    [point_rows, _] = [copy.rows for copy in connection.copies]
+    assert len(point_rows) == 3 and len(point_rows[0]) == 11
+    assert point_rows[0][4] == 0. and point_rows[0][-1] is None
+    assert "ANALYZE \"projected_query_points\"" in connection.queries
+    assert not connection.prepared
+
+
+def test_parallel_batched_query_keeps_input_order(along_track, monkeypatch):
+    def run_batch(connection, query_file, batch, params, variables=(), projected=False):
+        # The chunk holding the latest dates finishes first
+        time.sleep(0.01 * (10 - batch[0][2].day))
+        return [point[0] for point in batch]
+
+    monkeypatch.setattr(along_track, "connection", nullcontext)
+    monkeypatch.setattr(along_track, "_run_batch", run_batch)
+
+    n_points = 10
+    rng = np.random.default_rng(0)
+    days = rng.permutation(n_points)
+    results = list(along_track._batched_query(
+        query_file=along_track.geo_spatiotemporal_batch_query,
+        latitudes=np.arange(n_points, dtype=float),
+        longitudes=np.zeros(n_points),
+        dates=[datetime(2013, 3, 1 + day) for day in days],
+        distances=[1000.] * n_points,
+        connected_basin_ids=[[1]] * n_points,
+        params={},
+        batch_size=2,
+        parallelism=4,
+    ))
+
+    assert results == list(range(n_points))
+
+
+def test_parallel_batched_query_without_points(along_track, monkeypatch):
+    monkeypatch.setattr(along_track, "connection", nullcontext)
+
+    assert list(along_track._batched_query(
+        query_file=along_track.geo_spatiotemporal_batch_query,
+        latitudes=np.array([]),
+        longitudes=np.array([]),
+        dates=[],
+        distances=[],
+        connected_basin_ids=[],
+        params={},
+        batch_size=2,
+        parallelism=4,
+    )) == []
+
+
+def test_parallelism_requires_batches(along_track):
+    with pytest.raises(ValueError, match="batch_size"):
+        next(along_track.geographic_points_in_r_dt(
+            np.array([0.]), np.array([0.]), [datetime(2013, 3, 14)], batch_size=None, parallelism=2
+        ))
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+import numpy as np
+
+from OceanDB import benchmark
+from OceanDB.benchmark import IngestBenchmark
+from OceanDB.tests.conftest import FakeConnection
+from OceanDB.utils.synthetic import generate_synthetic_along_track_files
+
+
+def test_partitions_are_created_in_the_benchmark_transaction(settings, tmp_path, monkeypatch):
+    files = generate_synthetic_along_track_files(tmp_path, ["al"], datetime(2013, 3, 31), datetime(2013, 4, 1),
+                                                 n_points=100)
+    monkeypatch.setattr(benchmark, "load_basin_mask", lambda: None)
+    monkeypatch.setattr(IngestBenchmark, "basin_mask", lambda self, latitudes, longitudes: np.ones(len(latitudes)))
+    connection = FakeConnection()
+    opened = []
+
+    def connect(dsn):
+        # Only the benchmark's own, another connection would wait on the lock its COPY holds on along_track
+        assert not opened
+        opened.append(dsn)
+        return connection
+
+    monkeypatch.setattr(benchmark.pg, "connect", connect)
+
+    result = IngestBenchmark().run(files)
+
+    assert (result.files, result.rows) == (2, 200)
+    created = [query for query in connection.queries if query.startswith("CREATE TABLE")]
+    assert ['"along_track_2013_03"' in query for query in created] == [True, False]
+    assert '"along_track_2013_04"' in created[1]
+    # The partitions of a transaction that may roll back are not cached, every file checks the catalog
+    assert sum(query.startswith("SELECT pg_advisory_xact_lock") for query in connection.queries) == 2
@@ -0,0 +1,104 @@
+import struct
+import numpy as np
+
+from OceanDB.utils.binary_copy import (
+    PGCOPY_HEADER,
+    PGCOPY_TRAILER,
+    decode_binary_copy_rows,
+    encode_binary_copy_rows,
+    iter_binary_copy_batches,
+    iter_decode_binary_copy_rows,
+)
+
+
+def test_encode_binary_copy_rows():
+    columns = [
+        ("file_name", "dt_global_al_phy_l3_1hz_20130314_20240205.nc"),
+        ("track", np.array([1, 2, 3], dtype=np.int16)),
+        ("latitude", np.ma.masked_array([-69.5, 0.0, 12.25])),
+        ("date_time", np.array([0, 1_000_000, 416_448_000_000_000], dtype=np.int64)),
+    ]
+    rows = encode_binary_copy_rows(columns, {"track": "i2", "latitude": "f8", "date_time": "i8"})
+
+    assert len(rows) == 3
+    raw = rows[2].tobytes()
+    n_fields, name_length = struct.unpack_from(">hi", raw, 0)
+    assert n_fields == 4
+    assert raw[6:6 + name_length] == b"dt_global_al_phy_l3_1hz_20130314_20240205.nc"
+    offset = 6 + name_length
+    assert struct.unpack_from(">ih", raw, offset) == (2, 3)
+    offset += 6
+    assert struct.unpack_from(">id", raw, offset) == (8, 12.25)
+    offset += 12
+    assert struct.unpack_from(">iq", raw, offset) == (8, 416_448_000_000_000)
+
+
+def test_iter_binary_copy_batches():
+    rows = encode_binary_copy_rows([("cycle", np.arange(5))], {"cycle": "i2"})
+    batches = [bytes(batch) for batch in iter_binary_copy_batches(rows, batch_size=2)]
+
+    assert batches[0] == PGCOPY_HEADER
+    assert batches[-1] == PGCOPY_TRAILER
+    assert len(batches) == 5
+    assert b"".join(batches[1:-1]) == rows.tobytes()
+
+
+def test_decode_binary_copy_rows():
+    columns = [("query_index", "i4"), ("latitude", "f8"), ("sla_filtered", "i2")]
+    values = {
+        "query_index": np.array([0, 0, 2], dtype=np.int32),
+        "latitude": np.array([-69.5, 0.0, 12.25]),
+        "sla_filtered": np.array([-120, 32767, 5], dtype=np.int16),
+    }
+    rows = encode_binary_copy_rows([(name, values[name]) for name, _ in columns], dict(columns))
+    data = b"".join(bytes(batch) for batch in iter_binary_copy_batches(rows, batch_size=2))
+
+    decoded = decode_binary_copy_rows(data, columns)
+    for name, dtype in columns:
+        assert decoded[name].dtype == np.dtype(dtype)
+        np.testing.assert_array_equal(decoded[name], values[name])
+
+    empty = decode_binary_copy_rows(PGCOPY_HEADER + PGCOPY_TRAILER, columns)
+    assert all(len(array) == 0 for array in empty.values())
+
+
+def test_decode_binary_copy_rows_with_nulls():
+    data = (
+        PGCOPY_HEADER
+        + struct.pack(">hiiid", 2, 4, 7, 8, 1.5)
+        + struct.pack(">hiii", 2, 4, 8, -1)
+        + PGCOPY_TRAILER
+    )
+    decoded = decode_binary_copy_rows(data, [("query_index", "i4"), ("distance", "f8")])
+
+    np.testing.assert_array_equal(decoded["query_index"], [7, 8])
+    np.testing.assert_array_equal(decoded["distance"], [1.5, np.nan])
+
+
+def test_iter_decode_binary_copy_rows():
+    columns = [("query_index", "i4"), ("sla_filtered", "i2")]
+    values = {
+        "query_index": np.arange(7, dtype=np.int32),
+        "sla_filtered": np.arange(-3, 4, dtype=np.int16),
+    }
+    rows = encode_binary_copy_rows([(name, values[name]) for name, _ in columns], dict(columns))
+    data = b"".join(bytes(batch) for batch in iter_binary_copy_batches(rows, batch_size=2))
+    # Blocks that split the header & tuples anywhere
+    blocks = [data[start:start + 5] for start in range(0, len(data), 5)]
+
+    chunks = list(iter_decode_binary_copy_rows(blocks, columns, n_rows=3))
+    assert [len(chunk["query_index"]) for chunk in chunks] == [3, 3, 1]
+    for name, _ in columns:
+        np.testing.assert_array_equal(np.concatenate([chunk[name] for chunk in chunks]), values[name])
+
+    with_nulls = (
+        PGCOPY_HEADER
+        + struct.pack(">hiiih", 2, 4, 7, 2, 5)
+        + struct.pack(">hiii", 2, 4, 8, -1)
+        + struct.pack(">hiiih", 2, 4, 9, 2, 6)
+        + PGCOPY_TRAILER
+    )
+    first, last = iter_decode_binary_copy_rows([with_nulls[:30], with_nulls[30:]], columns, n_rows=2)
+    np.testing.assert_array_equal(first["sla_filtered"], [5, np.nan])
+    np.testing.assert_array_equal(last["query_index"], [9])
+    assert list(iter_decode_binary_copy_rows([PGCOPY_HEADER + PGCOPY_TRAILER], columns, n_rows=2)) == []
@@ -0,0 +1,49 @@
+import pytest
+
+from OceanDB.config import Config
+from OceanDB.utils import connection_pool
+
+
+@pytest.fixture
+def config(settings):
+    return Config()
+
+
+def test_pool_disabled_by_default(config):
+    assert config.postgres_pool_enabled is False
+    assert connection_pool.get_connection_pool(config) is None
+
+
+def test_pool_requires_psycopg_pool(config, monkeypatch):
+    monkeypatch.setattr(connection_pool, "ConnectionPool", None)
+    config.postgres_pool_enabled = True
+    with pytest.raises(ImportError, match="psycopg-pool"):
+        connection_pool.get_connection_pool(config)
+
+
+def test_pool_is_shared_and_dropped_after_fork(config, monkeypatch):
+    created = []
+
+    class FakePool:
+        check_connection = staticmethod(lambda connection: None)
+
+        def __init__(self, conninfo, **kwargs):
+            self.conninfo = conninfo
+            self.kwargs = kwargs
+            created.append(self)
+
+    monkeypatch.setattr(connection_pool, "ConnectionPool", FakePool)
+    monkeypatch.setattr(connection_pool, "_pools", {})
+    monkeypatch.setattr(connection_pool, "_inherited_pools", [])
+    config.postgres_pool_enabled = True
+    config.postgres_pool_max_size = 4
+
+    pool = connection_pool.get_connection_pool(config)
+    assert connection_pool.get_connection_pool(config) is pool
+    assert pool.conninfo == config.postgres_dsn
+    assert pool.kwargs["max_size"] == 4
+
+    connection_pool._forget_connection_pools()
+    assert connection_pool.get_connection_pool(config) is not pool
+    assert connection_pool._inherited_pools == [pool]
+    assert len(created) == 2
@@ -0,0 +1,75 @@
+import os
+from datetime import datetime
+
+from OceanDB.file_catalog import ALONG_TRACK_PRODUCT, AlongTrackFileCatalog
+
+
+def touch(directory, name):
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / name).write_bytes(b"netcdf")
+    return directory / name
+
+
+def test_refresh_and_query(tmp_path):
+    root = tmp_path / "along_track"
+    al = root / ALONG_TRACK_PRODUCT / "cmems_obs-sl_glo_phy-ssh_my_al-l3-duacs_PT1S_202411"
+    j3 = root / ALONG_TRACK_PRODUCT / "cmems_obs-sl_glo_phy-ssh_my_j3-l3-duacs_PT1S_202411"
+    touch(al / "2013" / "03", "dt_global_al_phy_l3_1hz_20130314_20240205.nc")
+    touch(al / "2013" / "04", "dt_global_al_phy_l3_1hz_20130401_20240205.nc")
+    touch(j3 / "2019" / "01", "dt_global_j3_phy_l3_1hz_20190131_20240205.nc")
+    touch(j3 / "2019" / "01", "README.txt")
+    # Other dataset versions & products are not ingested
+    touch(root / ALONG_TRACK_PRODUCT / "cmems_obs-sl_glo_phy-ssh_my_al-l3-duacs_PT1S_202311" / "2013" / "03",
+          "dt_global_al_phy_l3_1hz_20130315_20230205.nc")
+    touch(root / "SEALEVEL_GLO_PHY_L4_MY_008_047" / "2013" / "03", "dt_global_al_phy_l3_1hz_20130316_20240205.nc")
+
+    catalog = AlongTrackFileCatalog(catalog_path=tmp_path / "catalog.sqlite", root=root)
+    assert catalog.is_empty()
+    stats = catalog.refresh(workers=4)
+    assert stats.files == 3
+
+    assert [file.name for file in catalog.files(missions=["al"], end_date=datetime(2013, 3, 31))] == [
+        "dt_global_al_phy_l3_1hz_20130314_20240205.nc"
+    ]
+    assert len(catalog.files(start_date=datetime(2013, 4, 15))) == 2
+    assert catalog.files(missions=["s3a"]) == []
+
+    # Nothing changed, every directory is skipped
+    stats = catalog.refresh(workers=4)
+    assert stats.directories_scanned == 0
+
+    # A new file only rescans its directory, a removed directory drops its files
+    new_file = touch(al / "2013" / "04", "dt_global_al_phy_l3_1hz_20130402_20240205.nc")
+    for path in (j3 / "2019" / "01").iterdir():
+        path.unlink()
+    (j3 / "2019" / "01").rmdir()
+    stats = catalog.refresh(workers=4)
+    assert stats.directories_scanned == 2
+    assert stats.files == 3
+    assert new_file in catalog.files(missions=["al"])
+    assert catalog.files(missions=["j3"]) == []
+
+    fingerprint = catalog.fingerprints(missions=["al"])[new_file]
+    assert fingerprint.file_size == 6
+    assert fingerprint.file_mtime_ns == os.stat(new_file).st_mtime_ns
+
+
+def test_refresh_prunes_directories_outside_the_product(tmp_path):
+    root = tmp_path / "along_track"
+    al = root / ALONG_TRACK_PRODUCT / "cmems_obs-sl_glo_phy-ssh_my_al-l3-duacs_PT1S_202411"
+    touch(al / "2013" / "03", "dt_global_al_phy_l3_1hz_20130314_20240205.nc")
+    other = touch(root / "other" / "2013" / "03", "dt_global_al_phy_l3_1hz_20130315_20240205.nc")
+    catalog = AlongTrackFileCatalog(catalog_path=tmp_path / "catalog.sqlite", root=root)
+    # A catalog built when the whole data directory was walked
+    with catalog.connect() as connection:
+        connection.execute("INSERT INTO directories (path, parent, mtime_ns) VALUES (?, NULL, 0)", (str(root),))
+        connection.execute("INSERT INTO directories (path, parent, mtime_ns) VALUES (?, ?, 0)",
+                           (str(other.parent), str(other.parent.parent)))
+        connection.execute(
+            "INSERT INTO files (path, directory, file_name, mission, date, size, mtime_ns) "
+            "VALUES (?, ?, ?, 'al', '2013-03-15', 6, 0)", (str(other), str(other.parent), other.name)
+        )
+
+    stats = catalog.refresh(workers=4)
+    assert stats.directories_removed == 2
+    assert [file.name for file in catalog.files()] == ["dt_global_al_phy_l3_1hz_20130314_20240205.nc"]
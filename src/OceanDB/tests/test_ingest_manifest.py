@@ -0,0 +1,99 @@
+from dataclasses import fields
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from OceanDB.OceanDB_ETL import AlongTrackData, FileFingerprint, OceanDBETl
+from OceanDB.tests.conftest import FakeConnection
+from OceanDB.utils.metrics import IngestMetrics
+
+
+@pytest.fixture
+def oceandb_etl(settings) -> OceanDBETl:
+    return OceanDBETl()
+
+
+def test_unchanged_content_keeps_the_row_count(oceandb_etl, monkeypatch):
+    fingerprint = FileFingerprint(file_size=10, file_mtime_ns=20, content_hash="abc")
+    along_track_data = SimpleNamespace(
+        file_name="dt_global_al_phy_l3_1hz_20130314_20240205.nc", fingerprint=fingerprint, timings={}, time=np.ones(1),
+        time_range=lambda: (datetime(2013, 3, 14), datetime(2013, 3, 15)),
+    )
+    monkeypatch.setattr(oceandb_etl.partition_manager, "ensure_partitions", lambda first, last: None)
+    monkeypatch.setattr(oceandb_etl, "ensure_ingest_manifest_table", lambda: None)
+    monkeypatch.setattr(oceandb_etl, "manifest_entry", lambda connection, file_name: ("abc", "complete"))
+    connection = FakeConnection()
+
+    assert oceandb_etl.ingest_along_track_file(along_track_data, None, connection=connection) == 0
+    [(query, params)] = connection.statements
+    assert query.startswith("UPDATE") and "row_count" not in query and "ingest_seconds" not in query
+    assert params == (10, 20, along_track_data.file_name)
+
+
+def test_diff_does_not_write_before_the_ingest(oceandb_etl, monkeypatch, tmp_path):
+    files = [tmp_path / name for name in ["legacy.nc", "new.nc", "complete.nc"]]
+    for file in files:
+        file.write_bytes(b"data")
+    fingerprints = {file: FileFingerprint.from_path(file) for file in files}
+    complete = fingerprints[files[2]]
+    monkeypatch.setattr(oceandb_etl, "query_manifest",
+                        lambda: {"complete.nc": (complete.file_size, complete.file_mtime_ns, "complete")})
+    monkeypatch.setattr(oceandb_etl, "query_unmanifested_metadata", lambda: {"legacy.nc"})
+    recorded = []
+    monkeypatch.setattr(oceandb_etl, "record_legacy_manifest_entries", recorded.extend)
+    monkeypatch.setattr(oceandb_etl, "ensure_ingest_manifest_table", lambda: recorded.append("created"))
+
+    diff = oceandb_etl.diff_ingest_manifest(files, fingerprints=fingerprints)
+    assert (diff.new, diff.unchanged) == ([files[1]], [files[0], files[2]])
+    assert recorded == []
+
+    oceandb_etl.prepare_ingest_manifest(diff)
+    assert recorded == ["created", ("legacy.nc", fingerprints[files[0]])]
+
+
+def test_database_without_manifest_table(oceandb_etl, monkeypatch):
+    connection = FakeConnection([(False,)])
+    monkeypatch.setattr("OceanDB.OceanDB_ETL.pg.connect", lambda dsn: connection)
+
+    assert oceandb_etl.query_manifest() == {}
+    oceandb_etl.query_unmanifested_metadata()
+    assert connection.statements[-1][0] == 'SELECT file_name FROM "along_track_metadata"'
+
+    oceandb_etl.ensure_ingest_manifest_table()
+    oceandb_etl.ensure_ingest_manifest_table()
+    created = [query for query, _ in connection.statements if "CREATE TABLE IF NOT EXISTS" in query]
+    assert len(created) == 1 and '"along_track_ingest_manifest"' in created[0]
+
+
+def test_file_without_measurements(oceandb_etl, monkeypatch):
+    empty = np.array([])
+    along_track_data = AlongTrackData(
+        *[empty] * len(fields(AlongTrackData)[:-2]),
+        fingerprint=FileFingerprint(file_size=10, file_mtime_ns=20, content_hash="abc"),
+    )
+    along_track_data.file_name = "dt_global_al_phy_l3_1hz_20130314_20240205.nc"
+    connection = FakeConnection()
+    recorded = []
+    monkeypatch.setattr("OceanDB.OceanDB_ETL.pg.connect", lambda dsn: connection)
+    monkeypatch.setattr(oceandb_etl.partition_manager, "ensure_partitions", pytest.fail)
+    monkeypatch.setattr(oceandb_etl, "invalidate_query_caches", pytest.fail)
+    monkeypatch.setattr(oceandb_etl, "ensure_ingest_manifest_table", lambda: None)
+    monkeypatch.setattr(oceandb_etl, "manifest_entry", lambda connection, file_name: None)
+    monkeypatch.setattr(oceandb_etl, "copy_along_track_data_to_postgresql", lambda **kwargs: 0)
+    monkeypatch.setattr(oceandb_etl, "import_metadata_to_psql", lambda metadata, connection: None)
+    monkeypatch.setattr(oceandb_etl, "record_manifest_entry", lambda *args: recorded.append(args[1:4]))
+
+    assert oceandb_etl.ingest_along_track_file(along_track_data, None) == 0
+    assert recorded == [(along_track_data.file_name, along_track_data.fingerprint, 0)]
+
+
+def test_file_that_cannot_be_extracted(oceandb_etl, monkeypatch, tmp_path):
+    metrics = IngestMetrics()
+    monkeypatch.setattr(oceandb_etl, "extract_along_track_file", lambda file: (None, None))
+    monkeypatch.setattr(oceandb_etl, "ingest_along_track_file", pytest.fail)
+
+    file = tmp_path / "dt_global_al_phy_l3_1hz_20130314_20240205.nc"
+    assert oceandb_etl.process_along_track_file(file, metrics=metrics) == 0
+    assert (metrics.files, metrics.failures) == (0, 1)
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+import pytest
+
+from OceanDB import ingest_pipeline
+from OceanDB.ingest_pipeline import STOP, AlongTrackIngestPipeline, IngestPipelineError
+
+
+def fake_decode_worker(file_queue, data_queue, result_queue):
+    while True:
+        file = file_queue.get()
+        if file is STOP:
+            break
+        result_queue.put(("decoded", file.name, 0.))
+        data_queue.put(file)
+
+
+def fake_write_worker(data_queue, result_queue, loader, batch_size):
+    while True:
+        file = data_queue.get()
+        if file is STOP:
+            break
+        result_queue.put(("written", file.name, 10, 0., {}, 0))
+
+
+def crashing_write_worker(data_queue, result_queue, loader, batch_size):
+    raise ConnectionError("could not connect to the database")
+
+
+@pytest.fixture
+def files(monkeypatch):
+    monkeypatch.setattr(ingest_pipeline, "load_basin_mask", lambda: None)
+    monkeypatch.setattr(ingest_pipeline, "decode_worker", fake_decode_worker)
+    # Many more files than the queues hold, so a stalled stage blocks the ones feeding it
+    return [Path(f"dt_global_al_phy_l3_1hz_2013{day:04d}_20240205.nc") for day in range(200)]
+
+
+def test_pipeline_writes_every_file(files, monkeypatch):
+    monkeypatch.setattr(ingest_pipeline, "write_worker", fake_write_worker)
+    pipeline = AlongTrackIngestPipeline(decode_workers=2, write_workers=2, file_queue_size=4, data_queue_size=2)
+    stats = pipeline.run(files, skip_file_names={files[0].name})
+
+    assert (stats.files_skipped, stats.files_decoded, stats.files_written) == (1, 199, 199)
+    assert stats.rows_written == 1990
+
+
+def test_writer_crash_stops_the_pipeline(files, monkeypatch):
+    monkeypatch.setattr(ingest_pipeline, "write_worker", crashing_write_worker)
+    pipeline = AlongTrackIngestPipeline(decode_workers=2, write_workers=1, file_queue_size=4, data_queue_size=2)
+
+    with pytest.raises(IngestPipelineError, match="died"):
+        pipeline.run(files)
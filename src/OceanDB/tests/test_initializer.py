@@ -0,0 +1,60 @@
+import pytest
+
+from OceanDB import OceanDB_Initializer
+from OceanDB.OceanDB_Initializer import EXPECTED_TABLE_INDEXES, OceanDBInit
+from OceanDB.tests.conftest import FakeConnection
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    connection = FakeConnection([(name, True) for name in EXPECTED_TABLE_INDEXES["along_track"]])
+    monkeypatch.setattr(OceanDB_Initializer.pg, "connect", lambda dsn: connection)
+    return connection
+
+
+@pytest.fixture
+def initializer(settings, connection, monkeypatch) -> OceanDBInit:
+    initializer = OceanDBInit()
+    monkeypatch.setattr(initializer, "along_track_partitions", lambda: ["along_track_2013_03", "along_track_2013_04"])
+    return initializer
+
+
+def test_along_track_index_files_match_the_expected_indexes(initializer):
+    assert {index["params"]["index_name"] for index in initializer.along_track_index_files} == (
+        EXPECTED_TABLE_INDEXES["along_track"]
+    )
+
+
+def test_drop_along_track_indices(initializer, connection):
+    initializer.drop_along_track_indices()
+
+    assert sorted(connection.queries) == sorted(
+        f'DROP INDEX IF EXISTS "{name}"' for name in EXPECTED_TABLE_INDEXES["along_track"]
+    )
+
+
+def test_rebuild_along_track_indices(initializer, connection):
+    initializer.rebuild_along_track_indices(workers=3, maintenance_work_mem="2GB")
+    statements = connection.queries
+
+    parent = [statement for statement in statements if 'ON ONLY "along_track"' in statement]
+    assert len(parent) == len(EXPECTED_TABLE_INDEXES["along_track"])
+    assert 'CREATE INDEX IF NOT EXISTS "along_track_basin_idx" ON ONLY "along_track" USING btree' in parent[0]
+    # The partition indexes are only built once every parent index exists
+    assert all(statement in parent for statement in statements[:len(parent)])
+
+    for partition_name in ["along_track_2013_03", "along_track_2013_04"]:
+        for parent_index_name in EXPECTED_TABLE_INDEXES["along_track"]:
+            index_name = initializer.partition_index_name(partition_name, parent_index_name)
+            assert any(statement.startswith(f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{partition_name}" ')
+                       for statement in statements)
+            assert f'ALTER INDEX "{parent_index_name}" ATTACH PARTITION "{index_name}"' in statements
+    assert statements.count("SELECT set_config('maintenance_work_mem', %s, false)") == 3
+
+
+def test_validate_along_track_indices(initializer, connection):
+    initializer.validate_along_track_indices()
+
+    connection.rows = [("along_track_basin_idx", False), ("along_track_date_idx", True)]
+    with pytest.raises(RuntimeError, match=r"missing: \['along_track_file_name_idx'.*invalid: \['along_track_basin"):
+        initializer.validate_along_track_indices()
@@ -0,0 +1,42 @@
+import json
+
+from OceanDB.utils.metrics import Histogram, IngestMetrics, format_timings, stage_timer
+
+
+def test_stage_timer_accumulates():
+    timings = {}
+    for _ in range(2):
+        with stage_timer(timings, "load"):
+            pass
+    with stage_timer(None, "load"):
+        pass
+    assert list(timings) == ["load"]
+    assert timings["load"] >= 0
+    assert format_timings({"load": 0.5, "open": 0.25}) == "open 0.250s load 0.500s total 0.750s"
+
+
+def test_histogram():
+    histogram = Histogram(buckets=[0.1, 1.])
+    for value in [0.05, 0.5, 0.5, 5.]:
+        histogram.observe(value)
+    assert histogram.counts == [1, 3]
+    assert histogram.count == 4
+    assert histogram.quantile(.5) == 1.
+
+
+def test_ingest_metrics_outputs(tmp_path):
+    metrics = IngestMetrics(jsonl_path=tmp_path / "ingest.jsonl", textfile_path=tmp_path / "prom" / "oceandb.prom")
+    metrics.record_file("a.nc", {"open": 0.01, "load": 0.2}, rows=100, size=1_000)
+    metrics.record_failure("b.nc", "ValueError()")
+    metrics.write_textfile()
+
+    lines = [json.loads(line) for line in (tmp_path / "ingest.jsonl").read_text().splitlines()]
+    assert lines[0]["seconds"] == {"open": 0.01, "load": 0.2}
+    assert lines[1]["error"] == "ValueError()"
+
+    text = (tmp_path / "prom" / "oceandb.prom").read_text()
+    assert 'oceandb_ingest_stage_seconds_bucket{stage="load",le="0.25"} 1' in text
+    assert 'oceandb_ingest_stage_seconds_count{stage="time"} 0' in text
+    assert "oceandb_ingest_rows_total 100" in text
+    assert "oceandb_ingest_failures_total 1" in text
+    assert list((tmp_path / "prom").iterdir()) == [tmp_path / "prom" / "oceandb.prom"]
@@ -0,0 +1,84 @@
+import re
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+import numpy as np
+import psycopg as pg
+import pytest
+
+from OceanDB.AlongTrack import AlongTrack
+from OceanDB.OceanDB_Partitions import AlongTrackPartitionManager
+from OceanDB.tests.conftest import FakeConnection
+
+DATE = datetime(2013, 3, 14, 5)
+
+
+def test_nearest_neighbor_params(along_track):
+    params = along_track._nearest_neighbor_params(timedelta(days=2), ["al", "c2"], 5, 100_000, None)
+    assert (params["mission_groups"], params["mission_group_k"], params["k"]) == (["al,c2"], [5], 5)
+    assert (params["time_delta"], params["max_distance"]) == (timedelta(days=1), 100_000.)
+
+    params = along_track._nearest_neighbor_params(timedelta(days=2), None, 3, None, {"al": 2, "j3": 4, "s3a": 0})
+    assert (params["mission_groups"], params["mission_group_k"], params["k"]) == (["al", "j3"], [2, 4], 6)
+
+    with pytest.raises(ValueError):
+        along_track._nearest_neighbor_params(timedelta(days=2), None, 0, None, None)
+    with pytest.raises(ValueError):
+        along_track._nearest_neighbor_params(timedelta(days=2), None, 3, None, {"sentinel": 1})
+
+
+def test_point_time_bounds_are_computed_on_the_client(along_track):
+    params = along_track._nearest_neighbor_params(timedelta(days=2), None, 3, None, None)
+    [point_params] = along_track._nearest_neighbor_point_params([-69.], [28.], [DATE], [[1, 2]], params)
+    assert (point_params["start_date_time"], point_params["end_date_time"]) == (
+        DATE - timedelta(days=1), DATE + timedelta(days=1)
+    )
+    assert along_track._batch_dates([(0, 0, DATE, None, None), (0, 0, DATE - timedelta(days=3), None, None)]) == {
+        "min_central_date_time": DATE - timedelta(days=3), "max_central_date_time": DATE
+    }
+
+
+def test_per_point_queries_are_prepared_per_day(masked_along_track, monkeypatch):
+    rows = [{"latitude": -69., "longitude": 28., "sla_filtered": 5, "distance": 10., "time_difference_secs": 0.}]
+    connection = FakeConnection(rows)
+    monkeypatch.setattr(masked_along_track, "connection", lambda: nullcontext(connection))
+
+    dates = [DATE, DATE + timedelta(hours=3), DATE + timedelta(days=1)]
+    results = list(masked_along_track.geographic_nearest_neighbors_dt(
+        np.array([-69.] * 3), np.array([28.] * 3), dates, time_window=timedelta(days=2), batch_size=None
+    ))
+
+    assert [len(result.latitude) for result in results] == [1, 1, 1]
+    assert connection.prepared == connection.queries
+    assert len(set(connection.prepared)) == 2
+    assert "BETWEEN '2013-03-13 00:00:00'::timestamp AND '2013-03-16 00:00:00'::timestamp" in connection.prepared[0]
+    assert [params["start_date_time"] for _, params in connection.statements] == [date - timedelta(days=1)
+                                                                                  for date in dates]
+
+
+def test_knn_plan_uses_point_index_on_pruned_partitions():
+    try:
+        along_track = AlongTrack()
+        connection = pg.connect(along_track.config.postgres_dsn, connect_timeout=2)
+    except Exception as ex:
+        pytest.skip(f"No database: {ex}")
+
+    time_window = timedelta(days=10)
+    params = along_track._nearest_neighbor_params(time_window, ["al"], 3, None, None)
+    [point_params] = along_track._nearest_neighbor_point_params([-69.], [28.], [DATE], [[1, 2]], params)
+    with connection:
+        with pg.ClientCursor(connection) as cursor:
+            query = cursor.mogrify(along_track._nearest_neighbor_query_sql(
+                [], point_params["start_date_time"], point_params["end_date_time"]
+            ), point_params)
+            cursor.execute("EXPLAIN " + query)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        partitions = AlongTrackPartitionManager().existing_partitions(connection.cursor())
+
+    assert re.search(r"Index Scan using \w*point\w* on", plan), plan
+    scanned = set(re.findall(r" on (along_track_\w+)", plan))
+    overlapping = {
+        partition.name for partition in partitions
+        if partition.start <= point_params["end_date_time"] and partition.end > point_params["start_date_time"]
+    }
+    assert scanned and scanned <= overlapping, plan
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import pytest
+
+from OceanDB.OceanDB_Partitions import (
+    PartitionRange,
+    parse_partition_bound,
+    parse_partition_eras,
+    partition_name,
+    plan_partitions,
+)
+
+ERAS = parse_partition_eras("1990-01-01=year,2002-01-01=month,2016-01-01=week")
+
+
+def names(partitions):
+    return [partition.name for partition in partitions]
+
+
+def test_partition_names():
+    assert partition_name(datetime(2013, 1, 1), datetime(2014, 1, 1)) == "along_track_2013"
+    assert partition_name(datetime(2013, 3, 1), datetime(2013, 4, 1)) == "along_track_2013_03"
+    assert partition_name(datetime(2018, 12, 31), datetime(2019, 1, 7)) == "along_track_2019_w01"
+    assert partition_name(datetime(2013, 3, 1), datetime(2013, 3, 15)) == "along_track_20130301_20130315"
+
+
+def test_parse():
+    assert ERAS[1] == (datetime(2002, 1, 1), "month")
+    with pytest.raises(ValueError):
+        parse_partition_eras("1990-01-01=fortnight")
+    assert parse_partition_bound("FOR VALUES FROM ('2013-03-01 00:00:00') TO ('2013-04-01 00:00:00')") == (
+        datetime(2013, 3, 1), datetime(2013, 4, 1)
+    )
+
+
+def test_plan_partitions_per_era():
+    assert names(plan_partitions(datetime(1995, 6, 1), datetime(1995, 6, 2), ERAS, [])) == ["along_track_1995"]
+    assert names(plan_partitions(datetime(2010, 1, 31, 23), datetime(2010, 2, 1, 1), ERAS, [])) == [
+        "along_track_2010_01", "along_track_2010_02"
+    ]
+    # 2016-01-01 is a Friday, the first weekly partition is clipped to the era
+    assert [(p.start, p.end) for p in plan_partitions(datetime(2015, 12, 31), datetime(2016, 1, 5), ERAS, [])] == [
+        (datetime(2015, 12, 1), datetime(2016, 1, 1)),
+        (datetime(2016, 1, 1), datetime(2016, 1, 4)),
+        (datetime(2016, 1, 4), datetime(2016, 1, 11)),
+    ]
+
+
+def test_plan_partitions_around_existing():
+    existing = [PartitionRange("along_track_20100110_20100120", datetime(2010, 1, 10), datetime(2010, 1, 20))]
+    assert plan_partitions(datetime(2010, 1, 12), datetime(2010, 1, 15), ERAS, existing) == []
+    planned = plan_partitions(datetime(2010, 1, 5), datetime(2010, 1, 25), ERAS, existing)
+    assert [(p.start, p.end) for p in planned] == [
+        (datetime(2010, 1, 1), datetime(2010, 1, 10)),
+        (datetime(2010, 1, 20), datetime(2010, 2, 1)),
+    ]
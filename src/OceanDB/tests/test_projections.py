@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from OceanDB.utils.projections import (
+    latitude_longitude_bounds_for_transverse_mercator_box,
+    latitude_longitude_to_spherical_transverse_mercator,
+    spherical_transverse_mercator_to_latitude_longitude,
+)
+
+
+@pytest.mark.parametrize("lat0, lon0", [(0., 0.), (-45., 120.), (-70., 30.), (80., -100.)])
+def test_envelope_contains_box(lat0, lon0):
+    Lx, Ly = 1_000_000., 600_000.
+    x0, y0, min_latitude, min_longitude, max_latitude, max_longitude = \
+        latitude_longitude_bounds_for_transverse_mercator_box(lat0, lon0, Lx, Ly)
+
+    x, y = np.meshgrid(np.linspace(x0 - Lx / 2, x0 + Lx / 2, 101), np.linspace(y0 - Ly / 2, y0 + Ly / 2, 101))
+    latitude, longitude = spherical_transverse_mercator_to_latitude_longitude(x, y, lon0)
+    assert np.all((latitude >= min_latitude - 1e-9) & (latitude <= max_latitude + 1e-9))
+    assert np.all((longitude >= min_longitude - 1e-9) & (longitude <= max_longitude + 1e-9))
+    assert latitude.min() == pytest.approx(min_latitude) and latitude.max() == pytest.approx(max_latitude)
+
+
+def test_envelope_over_pole_and_antimeridian():
+    _, _, min_latitude, min_longitude, max_latitude, max_longitude = \
+        latitude_longitude_bounds_for_transverse_mercator_box(np.array([88., 0.]), np.array([10., 179.]), 1e6, 1e6)
+    np.testing.assert_array_equal(max_latitude, [90., max_latitude[1]])
+    np.testing.assert_array_equal(min_longitude, [-180., -180.])
+    np.testing.assert_array_equal(max_longitude, [180., 180.])
+
+
+def test_projected_box_query_params(along_track):
+    latitudes, longitudes = np.array([-60., 10.]), np.array([30., -150.])
+    date = datetime(2013, 3, 14)
+    query_file, params, x0s, y0s = along_track._projected_box_query(
+        latitudes, longitudes, [date, date], 200_000., 100_000., timedelta(days=5), ["al"], False
+    )
+
+    assert "spherical_transverse_mercator_x" in along_track.load_sql_file(query_file)
+    assert [point_params["connected_basin_ids"] for point_params in params] == [None, None]
+    for latitude, longitude, point_params in zip(latitudes, longitudes, params):
+        x0, y0 = latitude_longitude_to_spherical_transverse_mercator(latitude, longitude, lon0=longitude)
+        assert (point_params["x0"], point_params["y0"]) == (pytest.approx(x0), pytest.approx(y0))
+        assert (point_params["Lx"], point_params["Ly"], point_params["missions"]) == (200_000., 100_000., ["al"])
+        # ST_MakeEnvelope(xmin, ymin, xmax, ymax) takes longitudes as x
+        assert point_params["xmin"] < longitude < point_params["xmax"]
+        assert point_params["ymin"] < latitude < point_params["ymax"]
+
+
+def test_projected_box_query_basin_mask(along_track, monkeypatch):
+    along_track.__dict__["basin_connection_map"] = {1: [1, 2], 3: [3]}
+    monkeypatch.setattr(along_track, "basin_mask", lambda latitudes, longitudes: np.array([1, 3]))
+    date = datetime(2013, 3, 14)
+    query_file, params, _, _ = along_track._projected_box_query(
+        np.array([-60., 10.]), np.array([30., -150.]), [date, date], 200_000., 100_000., timedelta(days=5), None, True
+    )
+
+    query = along_track.load_sql_file(query_file)
+    assert "basin_id = ANY(%(connected_basin_ids)s)" in query and "ST_Intersects" not in query
+    assert [point_params["connected_basin_ids"] for point_params in params] == [[1, 2], [3]]
@@ -0,0 +1,141 @@
+import os
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from OceanDB.AlongTrack import AlongTrack
+from OceanDB.utils.geodesic import vincenty_distance
+from OceanDB.utils.query_cache import CachedWindow, QueryCache, invalidate_query_caches, to_postgres_microseconds
+
+DATE = datetime(2013, 3, 14, 5)
+
+
+def window(n_rows: int, start: int = 0, end: int = 1, created: float = None) -> CachedWindow:
+    columns = {
+        "latitude": np.zeros(n_rows),
+        "longitude": np.zeros(n_rows),
+        "sla_filtered": np.zeros(n_rows, dtype=np.int16),
+        "date_time": np.zeros(n_rows, dtype=np.int64),
+    }
+    if created is None:
+        return CachedWindow(columns=columns, start=start, end=end)
+    return CachedWindow(columns=columns, start=start, end=end, created=created)
+
+
+def test_vincenty_distance():
+    # Flinders Peak to Buninyong, Vincenty (1975)
+    distance = vincenty_distance(-37.95103342, 144.42486789, -37.65282114, 143.92649554)
+    assert distance == pytest.approx(54_972.271, abs=1e-3)
+    np.testing.assert_allclose(vincenty_distance([0, 10], 0, [0, 10], [1, 0]), [111_319.491, 0.], atol=1e-3)
+
+
+def test_keys_are_quantized():
+    cache = QueryCache()
+    key = cache.key(-69.1, 28.2, DATE, timedelta(days=5), 500_000, ["al"], [1, 2])
+
+    assert key == cache.key(-69.4, 28.4, DATE + timedelta(hours=3), timedelta(days=5), 500_000., ("al",), (1, 2))
+    assert key != cache.key(-69.6, 28.4, DATE, timedelta(days=5), 500_000, ["al"], [1, 2])
+    assert key.longitude_cell == cache.key(-69.1, 388.2, DATE, timedelta(days=5), 500_000, ["al"], [1, 2]).longitude_cell
+
+    latitude, longitude, distance, start, end = cache.cell_window(key)
+    assert (latitude, longitude) == (-69.25, 28.25)
+    assert distance > 500_000 + vincenty_distance(-69.5, 28., -69.25, 28.25)
+    assert start <= to_postgres_microseconds(DATE - timedelta(days=5))
+    assert end >= to_postgres_microseconds(DATE + timedelta(days=5))
+
+
+def test_lru_byte_budget():
+    cache = QueryCache(max_bytes=2 * window(100).nbytes)
+    keys = [cache.key(latitude, 0, DATE, timedelta(days=1), 1000, ["al"], [1]) for latitude in [0, 1, 2]]
+    cache.put(keys[0], window(100))
+    cache.put(keys[1], window(100))
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[2], window(100))
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    statistics = cache.statistics()
+    assert (statistics.hits, statistics.misses, statistics.evictions, statistics.entries) == (2, 1, 1, 2)
+
+
+def test_disk_tier(tmp_path):
+    cache = QueryCache(max_bytes=window(100).nbytes, directory=tmp_path)
+    keys = [cache.key(latitude, 0, DATE, timedelta(days=1), 1000, ["al"], [1]) for latitude in [0, 1]]
+    evicted = window(100)
+    evicted.columns["latitude"][:] = 42.
+    cache.put(keys[0], evicted)
+    cache.put(keys[1], window(100))
+
+    loaded = cache.get(keys[0])
+    assert isinstance(loaded.columns["latitude"], np.memmap)
+    np.testing.assert_array_equal(loaded.columns["latitude"], 42.)
+    assert cache.statistics().disk_hits == 1
+
+
+def test_invalidation(tmp_path):
+    start = to_postgres_microseconds(datetime(2013, 3, 1))
+    end = to_postgres_microseconds(datetime(2013, 3, 20))
+    cache = QueryCache(directory=tmp_path)
+    other_process_cache = QueryCache(directory=tmp_path)
+    key = cache.key(0, 0, DATE, timedelta(days=1), 1000, ["al"], [1])
+    cache.put(key, window(10, start, end, created=time.time() - 10))
+    other_process_cache._entries[key] = window(10, start, end, created=time.time() - 10)
+
+    invalidate_query_caches(datetime(2013, 4, 1), datetime(2013, 4, 2), tmp_path)
+    assert cache.get(key) is not None
+
+    invalidate_query_caches(datetime(2013, 3, 19), datetime(2013, 3, 21), tmp_path)
+    assert cache.get(key) is None
+    assert os.path.exists(tmp_path / "invalidated" / "2013-03")
+
+    # Not reached by the in process invalidation, dropped because of the month stamp
+    cached = window(10, start, end, created=time.time() - 10)
+    other_process_cache._entries.clear()
+    other_process_cache._entries[key] = cached
+    other_process_cache._bytes = cached.nbytes
+    assert other_process_cache.get(key) is None
+
+
+def test_cached_points_in_r_dt(monkeypatch, settings):
+    along_track = AlongTrack(query_cache=QueryCache())
+
+    rng = np.random.default_rng(0)
+    n_rows = 20_000
+    rows = {
+        "latitude": rng.uniform(-72, -66, n_rows),
+        "longitude": rng.uniform(20, 36, n_rows),
+        "sla_filtered": np.where(np.arange(n_rows) % 100, rng.integers(-500, 500, n_rows), 32767).astype(np.int16),
+        "date_time": to_postgres_microseconds(DATE) + rng.integers(-10, 10, n_rows) * 86_400_000_000,
+    }
+    fetches = []
+
+    def fetch(connection, key):
+        latitude, longitude, distance, start, end = along_track.query_cache.cell_window(key)
+        fetches.append(key)
+        keep = ((vincenty_distance(latitude, longitude, rows["latitude"], rows["longitude"]) <= distance)
+                & (rows["date_time"] >= start) & (rows["date_time"] <= end))
+        return CachedWindow(columns={name: values[keep] for name, values in rows.items()}, start=start, end=end)
+
+    monkeypatch.setattr(along_track, "connection", nullcontext)
+    monkeypatch.setattr(along_track, "_fetch_cache_window", fetch)
+
+    latitudes = np.array([-69.1, -69.2, -69.3, -50.])
+    longitudes = np.array([28., 28.1, 28.2, 28.])
+    dates = [DATE, DATE + timedelta(hours=1), DATE, DATE]
+    results = list(along_track._cached_points_in_r_dt(
+        latitudes, longitudes, dates, [100_000.] * 4, [[1]] * 4, timedelta(days=3), ["al"]
+    ))
+
+    assert len(fetches) == 2
+    assert results[3] is None
+    for latitude, longitude, date, result in zip(latitudes, longitudes, dates, results[:3]):
+        distance = vincenty_distance(latitude, longitude, rows["latitude"], rows["longitude"])
+        time_difference = to_postgres_microseconds(date) - rows["date_time"]
+        expected = (distance <= 100_000.) & (np.abs(time_difference) <= 3 * 86_400_000_000)
+        assert np.array_equal(np.sort(result.latitude), np.sort(rows["latitude"][expected]))
+        np.testing.assert_allclose(np.sort(result.delta_t), np.sort(time_difference[expected] / 1e6))
+        sla_filtered = np.where(rows["sla_filtered"] == 32767, np.nan, 0.001 * rows["sla_filtered"])
+        np.testing.assert_allclose(np.sort(result.sla_filtered), np.sort(sla_filtered[expected]))
@@ -0,0 +1,54 @@
+from contextlib import nullcontext
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from OceanDB.tests.conftest import FakeConnection
+from OceanDB.utils.sql_registry import SQLRegistry, sql_registry
+
+DATE = datetime(2013, 3, 14)
+
+
+def test_templates_are_loaded_once():
+    registry = SQLRegistry()
+    query = registry.get("queries/geographic_nearest_neighbor.sql")
+
+    assert "LIMIT %(k)s" in query
+    assert registry.get("queries/geographic_nearest_neighbor.sql") is query
+    assert "queries/orbits/orbit_path_for_mission.sql" in registry.templates
+    with pytest.raises(FileNotFoundError):
+        registry.get("queries/missing.sql")
+
+
+def test_statement_statistics():
+    registry = SQLRegistry()
+    with registry.timed("queries/geographic_nearest_neighbor.sql", executions=3):
+        pass
+    with pytest.raises(RuntimeError):
+        with registry.timed("queries/geographic_nearest_neighbor.sql"):
+            raise RuntimeError()
+
+    statistics = registry.statistics()
+    assert statistics["queries/geographic_nearest_neighbor.sql"].executions == 4
+    assert statistics["queries/geographic_nearest_neighbor.sql"].seconds >= 0
+
+    registry.reset_statistics()
+    assert registry.statistics() == {}
+
+
+def test_per_point_queries_are_prepared(masked_along_track, monkeypatch):
+    row = {"latitude": -69., "longitude": 28., "sla_filtered": 5, "distance": 10., "time_difference_secs": 0.,
+           "x": 0., "y": 0., "delta_x": 0., "delta_y": 0.}
+    connection = FakeConnection([row])
+    monkeypatch.setattr(masked_along_track, "connection", lambda: nullcontext(connection))
+    sql_registry.reset_statistics()
+    latitudes, longitudes, dates = np.array([-69., -68.]), np.array([28., 29.]), [DATE, DATE]
+
+    assert len(list(masked_along_track.geographic_points_in_r_dt(latitudes, longitudes, dates, batch_size=None))) == 2
+    projected = masked_along_track.projected_points_in_dx_dy_dt(latitudes, longitudes, dates, batch_size=None)
+    assert len(list(projected)) == 2
+
+    assert len(connection.prepared) == len(connection.statements) == 4
+    statistics = sql_registry.statistics()
+    assert statistics[masked_along_track.geo_spatiotemporal_query].executions == 2
@@ -0,0 +1,64 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from OceanDB import OceanDB_Staging
+from OceanDB.OceanDB_Staging import AlongTrackStagingLoader
+from OceanDB.tests.conftest import FakeConnection
+
+
+class Pool:
+    def __init__(self, processes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def imap_unordered(self, function, iterable):
+        return map(function, iterable)
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    connection = FakeConnection([(7,)])
+    monkeypatch.setattr(OceanDB_Staging.pg, "connect", lambda dsn: connection)
+    return connection
+
+
+@pytest.fixture
+def loader(settings, connection, monkeypatch):
+    monkeypatch.setattr(OceanDB_Staging, "Pool", Pool)
+    monkeypatch.setattr(OceanDB_Staging, "load_basin_mask", lambda: None)
+    loader = AlongTrackStagingLoader()
+    loader.recorded = []
+    monkeypatch.setattr(loader, "ensure_ingest_manifest_table", lambda: None)
+    monkeypatch.setattr(loader, "check_month_partition", lambda cursor, name, min_date, max_date: True)
+    monkeypatch.setattr(loader, "finalize_staging_table", lambda *args: None)
+    monkeypatch.setattr(loader, "swap_partition", lambda *args: None)
+    monkeypatch.setattr(loader, "import_metadata_to_psql", lambda metadata, connection: None)
+    monkeypatch.setattr(loader, "invalidate_query_caches", lambda first, last: None)
+    monkeypatch.setattr(loader, "record_manifest_entry",
+                        lambda connection, file_name, *args: loader.recorded.append(file_name))
+    monkeypatch.setattr(loader, "copy_along_track_data_to_postgresql", lambda data, **kwargs: 10)
+    return loader
+
+
+def test_failed_decode_keeps_the_file_rows(loader, connection, monkeypatch):
+    files = [Path(f"dt_global_{mission}_phy_l3_1hz_20130314_20240205.nc") for mission in ["al", "c2", "j2"]]
+
+    def extract(file):
+        metadata = SimpleNamespace(file_name=file.name)
+        if "_c2_" in file.name:
+            return None, metadata
+        return SimpleNamespace(file_name=file.name, fingerprint=None), metadata
+
+    monkeypatch.setattr(loader, "extract_along_track_file", extract)
+    assert loader.load_month(2013, 3, files) == 7
+
+    [(_, params)] = [statement for statement in connection.statements if "INSERT INTO" in statement[0]]
+    assert params == ([files[0].name, files[2].name],)
+    assert loader.recorded == [files[0].name, files[2].name]
@@ -0,0 +1,63 @@
+from contextlib import nullcontext
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from OceanDB.AlongTrack import SLA_Geographic, SLA_Projected
+from OceanDB.tests.conftest import FakeConnection
+from OceanDB.utils.binary_copy import encode_binary_copy_rows, iter_binary_copy_batches
+
+
+@pytest.fixture
+def along_track(masked_along_track):
+    return masked_along_track
+
+
+def use_connection(monkeypatch, along_track, rows) -> FakeConnection:
+    connection = FakeConnection(rows)
+    monkeypatch.setattr(along_track, "connection", lambda: nullcontext(connection))
+    return connection
+
+
+def test_stream_query_fetches_itersize_rows(monkeypatch, along_track):
+    connection = use_connection(monkeypatch, along_track, [{"id": i} for i in range(25)])
+    chunks = list(along_track.stream_query("SELECT id FROM along_track", itersize=10))
+
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    [cursor] = connection.cursors
+    assert cursor.name and cursor.itersize == 10
+    assert cursor.fetches == [10, 10, 5, 0]
+
+
+def test_stream_geographic_points_in_r_dt(monkeypatch, along_track):
+    rows = [
+        {"latitude": -69. + i, "longitude": 28., "sla_filtered": i, "distance": 10. * i, "time_difference_secs": 0}
+        for i in range(7)
+    ]
+    connection = use_connection(monkeypatch, along_track, rows)
+    chunks = list(along_track.stream_geographic_points_in_r_dt(-69., 28., datetime(2013, 3, 14), itersize=3))
+
+    assert all(isinstance(chunk, SLA_Geographic) for chunk in chunks)
+    assert [len(chunk.latitude) for chunk in chunks] == [3, 3, 1]
+    np.testing.assert_allclose(np.concatenate([chunk.sla_filtered for chunk in chunks]), 0.001 * np.arange(7))
+    [(_, params)] = connection.statements
+    assert params["connected_basin_ids"] == [1, 2]
+
+
+def test_stream_projected_points_in_dx_dy_dt(monkeypatch, along_track):
+    columns = along_track.projected_result_columns
+    values = {name: np.arange(7, dtype=dtype) for name, dtype in columns}
+    rows = encode_binary_copy_rows([(name, values[name]) for name, _ in columns], dict(columns))
+    connection = FakeConnection(copy_data=b"".join(bytes(batch) for batch in iter_binary_copy_batches(rows, 2)))
+    monkeypatch.setattr(along_track, "connection", lambda: nullcontext(connection))
+    chunks = list(along_track.stream_projected_points_in_dx_dy_dt(-69., 28., datetime(2013, 3, 14), itersize=3))
+
+    assert all(isinstance(chunk, SLA_Projected) for chunk in chunks)
+    assert [len(chunk.latitude) for chunk in chunks] == [3, 3, 1]
+    np.testing.assert_allclose(np.concatenate([chunk.delta_y for chunk in chunks]), np.arange(7))
+    np.testing.assert_allclose(np.concatenate([chunk.sla_filtered for chunk in chunks]), 0.001 * np.arange(7))
+    # Read with COPY, not a server side cursor
+    assert [cursor.name for cursor in connection.cursors] == [None]
+    [(_, params)] = connection.statements
+    assert params["connected_basin_ids"] == [1, 2]
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import netCDF4 as nc
+import numpy as np
+import pytest
+
+from OceanDB.OceanDB_ETL import OceanDBETl, parse_along_track_file_name
+from OceanDB.utils.synthetic import generate_synthetic_along_track_files
+
+
+@pytest.fixture
+def oceandb_etl(settings):
+    return OceanDBETl()
+
+
+def test_synthetic_files(tmp_path):
+    files = generate_synthetic_along_track_files(
+        tmp_path, ["j3", "s3a"], datetime(2020, 2, 28), datetime(2020, 3, 1), n_points=1_000
+    )
+
+    assert len(files) == 6
+    assert files[2].relative_to(tmp_path).parts[-3:] == ("2020", "03", "dt_global_j3_phy_l3_1hz_20200301_20240205.nc")
+    assert parse_along_track_file_name(files[3].name) == ("s3a", datetime(2020, 2, 28))
+
+    with nc.Dataset(files[0]) as ds:
+        assert ds.Conventions == "CF-1.6"
+        assert ds.variables["time"].units == "days since 1950-01-01 00:00:00"
+        time = ds.variables["time"][:]
+        assert np.all(np.diff(time) > 0)
+        assert time[0] >= (datetime(2020, 2, 28) - datetime(1950, 1, 1)).days
+        assert np.all(np.abs(ds.variables["latitude"][:]) <= 66)
+        sla = ds.variables["sla_filtered"]
+        assert sla.dtype == np.int16
+        assert sla.scale_factor == np.float32(0.001) or sla.scale_factor == 0.001
+        assert sla._FillValue == 32767
+        assert np.ma.count_masked(sla[:]) > 0
+
+
+def test_synthetic_file_reads_like_duacs(tmp_path, oceandb_etl):
+    file, = generate_synthetic_along_track_files(
+        tmp_path, ["al"], datetime(2015, 6, 1), datetime(2015, 6, 1), n_points=500
+    )
+    with nc.Dataset(file) as ds:
+        variables = oceandb_etl.read_along_track_variables(ds)
+        metadata = oceandb_etl.extract_dataset_metadata(ds, file)
+
+    assert metadata.file_name == file.name
+    assert metadata.platform == "al"
+    assert len(variables["latitude"]) == 500
+    assert variables["sla_unfiltered"].dtype == np.int16
+    assert variables["time_calendar"] == "gregorian"
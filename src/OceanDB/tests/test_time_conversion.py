@@ -0,0 +1,49 @@
+import netCDF4 as nc
+import numpy as np
+import pytest
+
+from OceanDB.utils.time_conversion import (
+    netcdf_time_to_datetime64,
+    netcdf_time_to_postgres_microseconds,
+    parse_netcdf_time_units,
+    postgres_microseconds_to_datetime64,
+)
+
+UNITS = "days since 1950-01-01 00:00:00"
+
+
+def test_matches_num2date_date2num():
+    rng = np.random.default_rng(0)
+    days = np.sort(rng.uniform(14_610, 27_000, size=10_000))  # 1990 -> 2023
+
+    expected = nc.date2num(
+        nc.num2date(days, UNITS, only_use_cftime_datetimes=False, only_use_python_datetimes=False),
+        "microseconds since 2000-01-01 00:00:00",
+    )
+    microseconds = netcdf_time_to_postgres_microseconds(days, UNITS)
+
+    # cftime and numpy may round values that fall exactly between two microseconds differently
+    assert microseconds.dtype == np.int64
+    np.testing.assert_allclose(microseconds, np.asarray(expected, dtype=np.int64), rtol=0, atol=1)
+
+
+def test_datetime64_round_trip():
+    days = np.array([0.0, 18262.0, 18262.5])
+    datetimes = netcdf_time_to_datetime64(days, UNITS)
+
+    assert datetimes.dtype == np.dtype("datetime64[us]")
+    assert str(datetimes[0]) == "1950-01-01T00:00:00.000000"
+    assert str(datetimes[2]) == "2000-01-01T12:00:00.000000"
+    np.testing.assert_array_equal(
+        postgres_microseconds_to_datetime64(netcdf_time_to_postgres_microseconds(days, UNITS)),
+        datetimes,
+    )
+
+
+def test_parse_units():
+    assert parse_netcdf_time_units("seconds since 2000-01-01")[0] == 1_000_000
+    assert str(parse_netcdf_time_units("hours since 1985-1-1 06:30")[1]) == "1985-01-01T06:30:00.000000"
+    with pytest.raises(ValueError):
+        parse_netcdf_time_units("fortnights since 1950-01-01")
+    with pytest.raises(ValueError):
+        netcdf_time_to_postgres_microseconds([0.0], UNITS, calendar="noleap")
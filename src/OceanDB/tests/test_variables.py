@@ -0,0 +1,124 @@
+from contextlib import nullcontext
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from OceanDB.AlongTrack import SLA_Geographic, SLA_Projected, unpack_variables
+from OceanDB.tests.conftest import FakeConnection
+from OceanDB.utils.binary_copy import encode_binary_copy_rows, iter_binary_copy_batches
+
+DATE = datetime(2013, 3, 14)
+
+
+@pytest.fixture
+def along_track(masked_along_track):
+    return masked_along_track
+
+
+def test_check_variables(along_track):
+    assert along_track._check_variables(None) == []
+    assert along_track._check_variables(["dac", "sla_filtered", "tpa_correction", "dac"]) == ["dac", "tpa_correction"]
+    with pytest.raises(ValueError, match="time"):
+        along_track._check_variables(["time"])
+    with pytest.raises(ValueError, match="adt"):
+        along_track._check_variables(["mdt", "adt"])
+
+
+def test_query_sql_selects_variables(along_track):
+    query = along_track._query_sql(along_track.geo_spatiotemporal_batch_query, ["dac", "mdt"]).as_string(None)
+    assert 'sla_filtered, "dac", "mdt",' in query
+    assert 'p.time_difference_secs, "p"."dac", "p"."mdt"' in query
+
+    query = along_track._query_sql(along_track.projected_box_batch_query, ["dac"]).as_string(None)
+    assert 'p.y - q.y0 AS delta_y, "p"."dac"' in query and 'sla_filtered, "dac",' in query
+
+    for query_file in [along_track.geo_spatiotemporal_query, along_track.nearest_neighbor_batch_query,
+                       along_track.projected_box_mask_query, along_track.projected_box_batch_query]:
+        query = along_track._query_sql(query_file).as_string(None)
+        assert "{" not in query and '"dac"' not in query
+
+
+def test_batch_result_variables_are_scaled(along_track):
+    columns = along_track.batch_result_columns + [("dac", "i2"), ("cycle", "i2")]
+    values = {
+        "query_index": np.array([0, 0, 2], dtype=np.int32),
+        "latitude": np.array([-69., -68., 10.]),
+        "longitude": np.array([28., 29., 30.]),
+        "sla_filtered": np.array([10, 32767, 30], dtype=np.int16),
+        "distance": np.array([1., 2., 3.]),
+        "time_difference_secs": np.array([0., 60., 120.]),
+        "dac": np.array([-150, 0, 42], dtype=np.int16),
+        "cycle": np.array([7, 7, 8], dtype=np.int16),
+    }
+    rows = encode_binary_copy_rows([(name, values[name]) for name, _ in columns], dict(columns))
+    data = b"".join(bytes(batch) for batch in iter_binary_copy_batches(rows, batch_size=2))
+
+    first, missing, last = along_track._split_batch_result(data, 3, ["dac", "cycle"])
+    assert missing is None
+    np.testing.assert_allclose(first.variables["dac"], [-0.15, 0.])
+    np.testing.assert_array_equal(first.variables["cycle"], [7, 7])
+    np.testing.assert_allclose(last.variables["dac"], [0.042])
+    np.testing.assert_allclose(first.sla_filtered, [0.01, np.nan])
+    np.testing.assert_allclose(last.sla_filtered, [0.03])
+
+
+def test_fill_values_become_nan(along_track):
+    packing = along_track._variable_packing(["dac", "cycle"])
+    assert packing == {"dac": (0.001, 0., 32767), "cycle": (1., 0., 32767)}
+
+    variables = unpack_variables(
+        {"dac": np.array([-150, 32767, 42], dtype=np.int16), "cycle": [7, None, 32767]}, packing
+    )
+    np.testing.assert_allclose(variables["dac"], [-0.15, np.nan, 0.042])
+    np.testing.assert_array_equal(variables["cycle"], [7, np.nan, np.nan])
+
+
+def test_projected_rows_variables(along_track, monkeypatch):
+    columns = along_track.projected_result_columns + [("mdt", "i2"), ("lwe", "i2")]
+    values = {
+        "latitude": np.array([-69., -68.]),
+        "longitude": np.array([28., 28.]),
+        "sla_filtered": np.array([32767, 6], dtype=np.int16),
+        "distance": np.array([0., 1e5]),
+        "time_difference_secs": np.array([0., 60.]),
+        "x": np.array([0., 5e4]),
+        "y": np.array([100., 200.]),
+        "delta_x": np.array([0., 5e4]),
+        "delta_y": np.array([0., 100.]),
+        "mdt": np.array([1200, -300], dtype=np.int16),
+        "lwe": np.array([32767, 4], dtype=np.int16),
+    }
+    rows = encode_binary_copy_rows([(name, values[name]) for name, _ in columns], dict(columns))
+    connection = FakeConnection(copy_data=b"".join(bytes(batch) for batch in iter_binary_copy_batches(rows, 1)))
+    monkeypatch.setattr(along_track, "connection", lambda: nullcontext(connection))
+    [chunk] = along_track.stream_projected_points_in_dx_dy_dt(-69., 28., DATE, variables=["mdt", "lwe"])
+
+    assert isinstance(chunk, SLA_Projected)
+    assert connection.queries[0].startswith("COPY (SELECT")
+    assert 'AS delta_y, "mdt", "lwe" FROM' in connection.queries[0]
+    np.testing.assert_allclose(chunk.delta_x, [0., 5e4])
+    np.testing.assert_allclose(chunk.variables["mdt"], [1.2, -0.3])
+    np.testing.assert_allclose(chunk.variables["lwe"], [np.nan, 0.004])
+    np.testing.assert_allclose(chunk.sla_filtered, [np.nan, 0.006])
+
+    geographic = SLA_Geographic(chunk.latitude, chunk.longitude, chunk.sla_filtered, chunk.distance, chunk.delta_t,
+                                variables=chunk.variables)
+    inside = SLA_Projected.from_sla_geographic_filter_dx_dy(geographic, 1e4, 1e4, latitude=-69., longitude=28.)
+    np.testing.assert_allclose(inside.variables["mdt"], [1.2])
+
+    batch = along_track.as_batch([chunk, None])
+    np.testing.assert_allclose(batch.columns["mdt"], [1.2, -0.3])
+    assert batch.attributes["tpa_correction"]["units"] == "m"
+    assert "variables" not in batch.columns
+
+
+def test_variables_bypass_the_query_cache(along_track, monkeypatch):
+    along_track.query_cache = object()
+    batched = []
+    monkeypatch.setattr(along_track, "_batched_query", lambda **kwargs: batched.append(kwargs) or iter([None]))
+
+    assert list(along_track.geographic_points_in_r_dt(np.array([-69.]), np.array([28.]), [DATE],
+                                                      variables=["sla_unfiltered"])) == [None]
+    assert batched[0]["variables"] == ["sla_unfiltered"]
+    assert SLA_Geographic(*[np.zeros(0)] * 5).variables == {}
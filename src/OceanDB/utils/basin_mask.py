@@ -0,0 +1,100 @@
+"""
+1/6° basin mask lookup
+
+The packaged NetCDF mask is converted once into an int16 .npy file in the cache directory, which every process then
+maps read-only.  The pages are shared through the OS page cache, so ingest & query workers neither decode the NetCDF
+nor hold a private copy of the mask.
+"""
+import os
+import tempfile
+from importlib import resources
+from pathlib import Path
+from typing import Optional, Union
+
+import netCDF4 as nc
+import numpy as np
+import numpy.typing as npt
+
+BASIN_MASK_RESOURCE = "basin_masks/new_basin_mask.nc"
+BASIN_MASK_VARIABLE = "basinmask"
+BASIN_MASK_DTYPE = np.int16
+CELLS_PER_DEGREE = 6
+DEFAULT_CACHE_DIRECTORY = Path.home() / ".cache" / "oceandb"
+
+# Memory map of the mask, opened once per process
+_basin_mask: Optional[np.ndarray] = None
+
+
+def basin_mask_source() -> Path:
+    return Path(str(resources.files("OceanDB.data").joinpath(BASIN_MASK_RESOURCE)))
+
+
+def convert_basin_mask(source: Union[str, Path], destination: Union[str, Path]) -> Path:
+    """
+    Convert the NetCDF basin mask to an int16 .npy file.  The file is written next to the destination and renamed into
+    place, so concurrent conversions never expose a partial file.
+    """
+    destination = Path(destination)
+    with nc.Dataset(source) as ds:
+        ds.set_auto_mask(False)
+        basin_mask = ds.variables[BASIN_MASK_VARIABLE][:]
+
+    info = np.iinfo(BASIN_MASK_DTYPE)
+    if basin_mask.min() < info.min or basin_mask.max() > info.max:
+        raise ValueError(f"Basin ids in {source} do not fit in {np.dtype(BASIN_MASK_DTYPE)}")
+    if basin_mask.shape != (180 * CELLS_PER_DEGREE, 360 * CELLS_PER_DEGREE):
+        raise ValueError(f"Unexpected basin mask shape {basin_mask.shape} in {source}")
+
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=destination.parent, suffix=".npy.tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.ascontiguousarray(basin_mask, dtype=BASIN_MASK_DTYPE))
+        os.replace(temporary, destination)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return destination
+
+
+def basin_mask_path(cache_directory: Optional[Union[str, Path]] = None) -> Path:
+    """
+    Path of the memory mappable mask, converting the packaged NetCDF first if the cache is missing or stale
+    """
+    source = basin_mask_source()
+    destination = Path(cache_directory or DEFAULT_CACHE_DIRECTORY) / f"{Path(BASIN_MASK_RESOURCE).stem}.npy"
+    if not destination.exists() or destination.stat().st_mtime_ns < source.stat().st_mtime_ns:
+        convert_basin_mask(source, destination)
+    return destination
+
+
+def load_basin_mask(cache_directory: Optional[Union[str, Path]] = None) -> np.ndarray:
+    """
+    Read-only memory map of the (latitude, longitude) basin mask.  Call it in a parent process before starting workers
+    so the conversion happens once.
+    """
+    global _basin_mask
+    if _basin_mask is None:
+        _basin_mask = np.load(basin_mask_path(cache_directory), mmap_mode="r")
+    return _basin_mask
+
+
+def basin_mask(latitude: npt.ArrayLike, longitude: npt.ArrayLike, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Basin id of each (latitude, longitude) as int16.
+
+    Longitudes are wrapped to [0, 360), latitudes are clipped to [-90, 90] so the north pole falls in the last row.
+    Non finite coordinates raise a ValueError.
+    """
+    mask = load_basin_mask() if mask is None else mask
+    latitude = np.asarray(np.ma.getdata(latitude), dtype=np.float64)
+    longitude = np.asarray(np.ma.getdata(longitude), dtype=np.float64)
+    if not (np.isfinite(latitude).all() and np.isfinite(longitude).all()):
+        raise ValueError("Cannot look up the basin of non finite coordinates")
+
+    n_latitude, n_longitude = mask.shape
+    i = np.floor((latitude + 90) * CELLS_PER_DEGREE).astype(np.intp)
+    np.clip(i, 0, n_latitude - 1, out=i)
+    # % 360 can round up to 360 for tiny negative longitudes, hence the second wrap
+    j = np.floor((longitude % 360) * CELLS_PER_DEGREE).astype(np.intp) % n_longitude
+    return mask[i, j]
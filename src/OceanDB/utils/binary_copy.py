@@ -0,0 +1,237 @@
+import struct
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+
+# https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.4
+PGCOPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+PGCOPY_HEADER = PGCOPY_SIGNATURE + struct.pack(">ii", 0, 0)
+PGCOPY_TRAILER = struct.pack(">h", -1)
+
+ColumnValue = Union[npt.ArrayLike, str, bytes]
+
+
+def _constant_bytes(value: Union[str, bytes]) -> bytes:
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    return value
+
+
+def binary_copy_row_dtype(columns: Sequence[Tuple[str, ColumnValue]], dtypes: dict) -> np.dtype:
+    """
+    Build the structured dtype of a single COPY BINARY tuple.
+
+    Every tuple starts with a big-endian int16 field count, followed by an int32 length and the value of each field.
+    Because every column has a fixed width (numbers, or text that is constant for the whole batch, such as the file
+    name), every tuple has the same layout and a batch of tuples is just a structured NumPy array.
+    """
+    fields: List[Tuple[str, str]] = [("n_fields", ">i2")]
+    for name, value in columns:
+        fields.append((f"{name}__length", ">i4"))
+        if isinstance(value, (str, bytes)):
+            fields.append((name, f"S{len(_constant_bytes(value))}"))
+        else:
+            fields.append((name, np.dtype(dtypes[name]).newbyteorder(">").str))
+    return np.dtype(fields)
+
+
+def encode_binary_copy_rows(columns: Sequence[Tuple[str, ColumnValue]], dtypes: dict) -> np.ndarray:
+    """
+    Encode column arrays as COPY BINARY tuples, without creating a Python object per row.
+
+    Parameters
+    ----------
+    columns : sequence of (name, values)
+        Column names in table order. ``values`` is either an array with one value per row, or a ``str``/``bytes``
+        constant written into every row (text columns).
+    dtypes : dict
+        Postgres wire dtype of each array column, e.g. ``{"track": "i2", "latitude": "f8", "date_time": "i8"}``.
+        ``date_time`` must already be microseconds since 2000-01-01, the binary representation of ``timestamp``.
+
+    Returns
+    -------
+    np.ndarray
+        Structured array with one element per tuple; its raw buffer is valid COPY BINARY data (without header and
+        trailer).
+    """
+    lengths = {len(np.ma.getdata(value)) for _, value in columns if not isinstance(value, (str, bytes))}
+    if len(lengths) > 1:
+        raise ValueError(f"All columns must have the same length, received lengths {sorted(lengths)}")
+    n_rows = lengths.pop() if lengths else 0
+
+    row_dtype = binary_copy_row_dtype(columns, dtypes)
+    rows = np.empty(n_rows, dtype=row_dtype)
+    rows["n_fields"] = len(columns)
+    for name, value in columns:
+        if isinstance(value, (str, bytes)):
+            rows[f"{name}__length"] = len(_constant_bytes(value))
+            rows[name] = _constant_bytes(value)
+        else:
+            rows[f"{name}__length"] = row_dtype[name].itemsize
+            rows[name] = np.ma.getdata(value)
+    return rows
+
+
+def iter_binary_copy_batches(rows: np.ndarray, batch_size: int) -> Iterator[memoryview]:
+    """
+    Yield the raw COPY BINARY stream for ``rows`` in batches of ``batch_size`` tuples.
+
+    The first batch is prefixed with the COPY header and the trailer is yielded last, so the output can be passed
+    directly to ``psycopg.Copy.write``.
+    """
+    if batch_size <= 0:
+        raise ValueError(f"batch_size must be positive, received {batch_size}")
+
+    raw = rows.view(np.uint8)
+    row_size = rows.dtype.itemsize
+    yield memoryview(PGCOPY_HEADER)
+    for start in range(0, len(rows), batch_size):
+        stop = min(start + batch_size, len(rows))
+        yield memoryview(raw[start * row_size:stop * row_size])
+    yield memoryview(PGCOPY_TRAILER)
+
+
+def _parse_binary_copy_header(data: Union[bytes, memoryview]) -> int:
+    """
+    Validate the COPY BINARY header and return the offset of the first tuple
+    """
+    if bytes(data[:len(PGCOPY_SIGNATURE)]) != PGCOPY_SIGNATURE:
+        raise ValueError("Not COPY BINARY data, the signature is missing")
+    _flags, extension_length = struct.unpack_from(">ii", data, len(PGCOPY_SIGNATURE))
+    return len(PGCOPY_HEADER) + extension_length
+
+
+def _decode_binary_copy_rows_with_nulls(data: Union[bytes, memoryview], offset: int,
+                                        columns: Sequence[Tuple[str, str]]) -> dict:
+    """
+    Tuple by tuple decoding, for streams with NULLs (length -1) whose tuples do not share a single layout.
+    Integer columns holding NULLs are returned as float64 with NaN.
+    """
+    wire_dtypes = [np.dtype(dtype).newbyteorder(">") for _, dtype in columns]
+    values = [[] for _ in columns]
+    while True:
+        (n_fields,) = struct.unpack_from(">h", data, offset)
+        offset += 2
+        if n_fields == -1:
+            break
+        if n_fields != len(columns):
+            raise ValueError(f"Expected {len(columns)} fields per tuple, received {n_fields}")
+        for index, wire_dtype in enumerate(wire_dtypes):
+            (length,) = struct.unpack_from(">i", data, offset)
+            offset += 4
+            if length == -1:
+                values[index].append(None)
+                continue
+            if length != wire_dtype.itemsize:
+                raise ValueError(f"Column {columns[index][0]} has {length} byte values, expected {wire_dtype.itemsize}")
+            values[index].append(np.frombuffer(data, wire_dtype, 1, offset)[0])
+            offset += length
+
+    decoded = {}
+    for (name, dtype), column in zip(columns, values):
+        if any(value is None for value in column):
+            decoded[name] = np.array([np.nan if value is None else value for value in column], dtype=np.float64)
+        else:
+            decoded[name] = np.array(column, dtype=dtype)
+    return decoded
+
+
+def decode_binary_copy_rows(data: Union[bytes, memoryview], columns: Sequence[Tuple[str, str]]) -> dict:
+    """
+    Decode the output of ``COPY (...) TO STDOUT (FORMAT BINARY)`` into one NumPy array per column.
+
+    Parameters
+    ----------
+    data : bytes
+        The complete COPY BINARY stream, header and trailer included.
+    columns : sequence of (name, dtype)
+        Fixed width wire dtype of each column, in query order, e.g. ``[("query_index", "i4"), ("latitude", "f8")]``.
+        Cast numeric expressions (e.g. ``EXTRACT(EPOCH ...)``) to ``double precision`` in the query.
+
+    Returns
+    -------
+    dict
+        Native byte order array of each column.
+
+    Without NULLs every tuple has the same layout, so the tuples are viewed as a structured array (see
+    binary_copy_row_dtype) and each column is byte swapped in one vectorized step.  Streams with NULLs fall back to
+    tuple by tuple decoding.
+    """
+    offset = _parse_binary_copy_header(data)
+    row_dtype = binary_copy_row_dtype([(name, None) for name, _ in columns], dict(columns))
+    body_size = len(data) - offset - len(PGCOPY_TRAILER)
+
+    if (body_size >= 0 and body_size % row_dtype.itemsize == 0
+            and bytes(data[len(data) - len(PGCOPY_TRAILER):]) == PGCOPY_TRAILER):
+        rows = np.frombuffer(data, row_dtype, body_size // row_dtype.itemsize, offset)
+        if _has_fixed_layout(rows, columns):
+            return {name: rows[name].astype(np.dtype(dtype)) for name, dtype in columns}
+
+    return _decode_binary_copy_rows_with_nulls(data, offset, columns)
+
+
+def _has_fixed_layout(rows: np.ndarray, columns: Sequence[Tuple[str, str]]) -> bool:
+    """
+    Whether tuples viewed as binary_copy_row_dtype really have that layout, i.e. hold no NULLs
+    """
+    return bool(np.all(rows["n_fields"] == len(columns))) and all(
+        bool(np.all(rows[f"{name}__length"] == rows.dtype[name].itemsize)) for name, _ in columns
+    )
+
+
+def _tuples_size(data: Union[bytes, bytearray], offset: int, columns: Sequence[Tuple[str, str]],
+                 n_rows: int) -> Optional[int]:
+    """
+    Size in bytes of the n_rows tuples starting at offset, None if data does not hold n_rows complete tuples yet
+    """
+    row_dtype = binary_copy_row_dtype([(name, None) for name, _ in columns], dict(columns))
+    if len(data) - offset >= n_rows * row_dtype.itemsize:
+        if _has_fixed_layout(np.frombuffer(data, row_dtype, n_rows, offset), columns):
+            return n_rows * row_dtype.itemsize
+
+    # Tuples with NULLs are shorter, walk their field lengths
+    position = offset
+    for _ in range(n_rows):
+        if position + 2 > len(data):
+            return None
+        (n_fields,) = struct.unpack_from(">h", data, position)
+        if n_fields == -1:
+            return None
+        position += 2
+        for _ in range(n_fields):
+            if position + 4 > len(data):
+                return None
+            (length,) = struct.unpack_from(">i", data, position)
+            position += 4 + max(length, 0)
+    return position - offset if position <= len(data) else None
+
+
+def iter_decode_binary_copy_rows(chunks: Iterable[Union[bytes, memoryview]], columns: Sequence[Tuple[str, str]],
+                                 n_rows: int) -> Iterator[dict]:
+    """
+    Decode a COPY BINARY stream as it is read, e.g. the blocks of a psycopg Copy, into dicts of column arrays (see
+    decode_binary_copy_rows) of n_rows tuples each, the last one shorter.  Only about n_rows tuples are held in
+    memory at once, so results of any size can be processed.
+    """
+    if n_rows <= 0:
+        raise ValueError(f"n_rows must be positive, received {n_rows}")
+
+    buffer = bytearray()
+    offset = None
+    for chunk in chunks:
+        buffer += chunk
+        if offset is None:
+            if len(buffer) < len(PGCOPY_HEADER):
+                continue
+            offset = _parse_binary_copy_header(buffer)
+        while True:
+            size = _tuples_size(buffer, offset, columns, n_rows)
+            if size is None:
+                break
+            yield decode_binary_copy_rows(PGCOPY_HEADER + buffer[offset:offset + size] + PGCOPY_TRAILER, columns)
+            del buffer[:offset + size]
+            offset = 0
+
+    if offset is not None and len(buffer) - offset > len(PGCOPY_TRAILER):
+        yield decode_binary_copy_rows(PGCOPY_HEADER + buffer[offset:], columns)
@@ -0,0 +1,109 @@
+"""
+Per process Postgres connection pool
+
+The query classes open a connection per call, which is fine for scripts but means a TCP & auth handshake for every
+query of a long running service.  With POSTGRES_POOL_ENABLED=true, connection() lends connections from a
+psycopg_pool.ConnectionPool instead, one pool per DSN shared by every OceanDB instance (and thread) of the process.
+
+psycopg-pool is optional (pip install OceanDB[pool]).  Pools are not inherited across fork: a child process drops the
+parent's pools, without closing the parent's sockets, and opens its own on first use.
+"""
+import atexit
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import psycopg as pg
+from psycopg.rows import tuple_row
+
+from OceanDB.config import Config
+
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    ConnectionPool = None
+
+_pools: Dict[str, "ConnectionPool"] = {}
+_pools_lock = threading.Lock()
+# Pools inherited from the parent process, kept referenced so they are never finalized (which would terminate the
+# parent's sessions) in the child
+_inherited_pools: List["ConnectionPool"] = []
+
+
+def _reset_connection(connection: pg.Connection):
+    """
+    Undo per-use connection settings before the connection goes back to the pool
+    """
+    connection.row_factory = tuple_row
+    if connection.autocommit:
+        connection.autocommit = False
+
+
+def get_connection_pool(config: Config) -> Optional["ConnectionPool"]:
+    """
+    The process wide pool for config.postgres_dsn, created on first use.  None if pooling is disabled.
+    """
+    if not config.postgres_pool_enabled:
+        return None
+    if ConnectionPool is None:
+        raise ImportError("POSTGRES_POOL_ENABLED requires psycopg-pool, install it with pip install OceanDB[pool]")
+
+    dsn = config.postgres_dsn
+    with _pools_lock:
+        pool = _pools.get(dsn)
+        if pool is None:
+            pool = ConnectionPool(
+                dsn,
+                min_size=config.postgres_pool_min_size,
+                max_size=config.postgres_pool_max_size,
+                max_idle=config.postgres_pool_max_idle,
+                max_lifetime=config.postgres_pool_max_lifetime,
+                timeout=config.postgres_pool_timeout,
+                check=ConnectionPool.check_connection,
+                reset=_reset_connection,
+                name=f"oceandb-{os.getpid()}",
+                open=True,
+            )
+            _pools[dsn] = pool
+    return pool
+
+
+@contextmanager
+def connection(config: Config) -> Iterator[pg.Connection]:
+    """
+    A connection from the process pool, or a new connection if pooling is disabled.
+
+    Either way the block runs in a transaction that is committed on exit, or rolled back if it raises, and the
+    connection must not be used after the block.
+    """
+    pool = get_connection_pool(config)
+    if pool is None:
+        with pg.connect(config.postgres_dsn) as conn:
+            yield conn
+    else:
+        with pool.connection() as conn:
+            yield conn
+
+
+def close_connection_pools():
+    """
+    Close every pool of this process
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def _forget_connection_pools():
+    # The child shares the parent's sockets, so the pools are dropped without closing their connections
+    global _pools_lock
+    _inherited_pools.extend(_pools.values())
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_connection_pools)
+atexit.register(close_connection_pools)
@@ -0,0 +1,190 @@
+"""
+Ingest instrumentation
+
+Each file's ingest is timed per stage (see INGEST_STAGES) into a plain dict that travels with the AlongTrackData from
+the decode to the write process.  IngestMetrics aggregates the per file timings into histograms & throughput counters
+and writes them as
+
+    - JSON lines, one per file, with its stage timings, rows & bytes
+    - a Prometheus textfile (for the node exporter textfile collector), rewritten atomically
+"""
+import json
+import math
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+INGEST_STAGES = ["open", "read", "time", "basin_mask", "encode", "load", "metadata"]
+
+# Upper bounds in seconds of the per file stage histograms
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10., 30., 60.)
+
+
+@contextmanager
+def stage_timer(timings: Optional[Dict[str, float]], stage: str):
+    """
+    Add the duration of the block to timings[stage], does nothing if timings is None
+    """
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.) + time.perf_counter() - start
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """
+    e.g. "open 0.012s read 0.050s ... total 0.310s"
+    """
+    stages = [stage for stage in INGEST_STAGES if stage in timings]
+    return " ".join(
+        [f"{stage} {timings[stage]:.3f}s" for stage in stages] + [f"total {sum(timings.values()):.3f}s"]
+    )
+
+
+class Histogram:
+    """
+    Prometheus style cumulative histogram
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-th quantile, inf if it is above the last bucket
+        """
+        rank = q * self.count
+        for bound, count in zip(self.buckets, self.counts):
+            if count >= rank:
+                return bound
+        return math.inf
+
+
+class IngestMetrics:
+    """
+    Aggregate per file ingest timings.
+
+    jsonl_path: append a JSON line per file
+    textfile_path: Prometheus textfile, rewritten by write_textfile
+    """
+
+    def __init__(self, jsonl_path: Optional[Union[str, Path]] = None,
+                 textfile_path: Optional[Union[str, Path]] = None, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        self.textfile_path = Path(textfile_path) if textfile_path else None
+        self.histograms = {stage: Histogram(buckets) for stage in INGEST_STAGES}
+        self.files = 0
+        self.failures = 0
+        self.rows = 0
+        self.bytes = 0
+        self.start = time.time()
+
+    def record_file(self, file_name: str, timings: Dict[str, float], rows: int, size: int = 0):
+        """
+        Record the stage timings of an ingested file
+        """
+        self.files += 1
+        self.rows += rows
+        self.bytes += size
+        for stage, seconds in timings.items():
+            if stage in self.histograms:
+                self.histograms[stage].observe(seconds)
+
+        if self.jsonl_path is not None:
+            with open(self.jsonl_path, "a") as f:
+                f.write(json.dumps({
+                    "time": time.time(),
+                    "file_name": file_name,
+                    "rows": rows,
+                    "bytes": size,
+                    "seconds": {stage: round(timings[stage], 6) for stage in INGEST_STAGES if stage in timings},
+                    "total_seconds": round(sum(timings.values()), 6),
+                }) + "\n")
+
+    def record_failure(self, file_name: str, error: str):
+        self.failures += 1
+        if self.jsonl_path is not None:
+            with open(self.jsonl_path, "a") as f:
+                f.write(json.dumps({"time": time.time(), "file_name": file_name, "error": error}) + "\n")
+
+    def summary(self) -> str:
+        """
+        One line per stage: total seconds, share of the total, mean & p95 per file
+        """
+        total = sum(histogram.sum for histogram in self.histograms.values()) or 1.
+        lines = []
+        for stage, histogram in self.histograms.items():
+            if histogram.count:
+                lines.append(
+                    f"{stage:>10}: {histogram.sum:9.2f}s {100 * histogram.sum / total:5.1f}% "
+                    f"mean {histogram.sum / histogram.count:.4f}s p95 <= {histogram.quantile(.95)}s"
+                )
+        return "\n".join(lines)
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP oceandb_ingest_stage_seconds Per file duration of each along track ingest stage.",
+            "# TYPE oceandb_ingest_stage_seconds histogram",
+        ]
+        for stage, histogram in self.histograms.items():
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'oceandb_ingest_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'oceandb_ingest_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'oceandb_ingest_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+            lines.append(f'oceandb_ingest_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+        counters: List[tuple] = [
+            ("oceandb_ingest_files_total", "Along track files ingested.", self.files),
+            ("oceandb_ingest_failures_total", "Along track files that failed to ingest.", self.failures),
+            ("oceandb_ingest_rows_total", "Along track rows written.", self.rows),
+            ("oceandb_ingest_bytes_total", "NetCDF bytes ingested.", self.bytes),
+        ]
+        for name, help_text, value in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {value}"]
+
+        elapsed = max(time.time() - self.start, 1e-9)
+        lines += [
+            "# HELP oceandb_ingest_rows_per_second Rows written per second since the ingest started.",
+            "# TYPE oceandb_ingest_rows_per_second gauge",
+            f"oceandb_ingest_rows_per_second {self.rows / elapsed}",
+            "# HELP oceandb_ingest_start_time_seconds Unix time the ingest started.",
+            "# TYPE oceandb_ingest_start_time_seconds gauge",
+            f"oceandb_ingest_start_time_seconds {self.start}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self):
+        """
+        Rewrite the Prometheus textfile.  The node exporter may read it at any time, so it is written to a temporary
+        file in the same directory and renamed into place.
+        """
+        if self.textfile_path is None:
+            return
+        self.textfile_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=self.textfile_path.parent, suffix=".prom.tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.prometheus_text())
+            # mkstemp creates the file 0600, the node exporter usually runs as another user
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, self.textfile_path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
@@ -9,38 +9,36 @@ def latitude_longitude_bounds_for_transverse_mercator_box(
         Ly: float
     ):
     """
-    lat0:
-    lon0:
-    lat: latitude
-    longitude: longitude
+    Center (x0, y0) and latitude/longitude envelope (minLat, minLon, maxLat, maxLon) of the Lx by Ly box centered on
+    (lat0, lon0) in the transverse mercator projection with central meridian lon0.  lat0 & lon0 may be arrays, the
+    results are then arrays of the same shape.
+
+    Boxes reaching over a pole get latitude bounds up to the pole and the full longitude range, as do boxes crossing
+    the antimeridian.
     """
+    R = 0.9996 * 6378137.
     [x0, y0] = latitude_longitude_to_spherical_transverse_mercator(lat0, lon0, lon0=lon0)
-    x = np.zeros(6)
-    y = np.zeros(6)
-
-    x[1] = x0 - Lx / 2
-    y[1] = y0 - Ly / 2
-
-    x[2] = x0 - Lx / 2
-    y[2] = y0 + Ly / 2
-
-    x[3] = x0
-    y[3] = y0 + Ly / 2
-
-    x[4] = x0
-    y[4] = y0 - Ly / 2
-
-    x[5] = x0 + Lx / 2
-    y[5] = y0 - Ly / 2
+    x0, y0, lon0 = np.asarray(x0), np.asarray(y0), np.asarray(lon0, dtype=np.float64)
 
-    x[0] = x0 + Lx / 2
-    y[0] = y0 + Ly / 2
+    # Corners, and the middle of the top & bottom edges where the latitude is extremal
+    dx = np.array([1, -1, -1, 0, 0, 1]) * Lx / 2
+    dy = np.array([1, -1, 1, 1, -1, -1]) * Ly / 2
+    x = x0[..., np.newaxis] + dx
+    y = y0[..., np.newaxis] + dy
+    [lats, lons] = spherical_transverse_mercator_to_latitude_longitude(x, y, lon0[..., np.newaxis])
+    minLat = lats.min(axis=-1)
+    maxLat = lats.max(axis=-1)
+    minLon = lons.min(axis=-1)
+    maxLon = lons.max(axis=-1)
 
-    [lats, lons] = spherical_transverse_mercator_to_latitude_longitude(x, y, lon0)
-    minLat = min(lats)
-    maxLat = max(lats)
-    minLon = min(lons)
-    maxLon = max(lons)
+    # Past y = +/- R pi / 2 the box wraps over the pole (at x = 0) to the opposite meridian
+    north_pole = y0 + Ly / 2 >= R * np.pi / 2
+    south_pole = y0 - Ly / 2 <= -R * np.pi / 2
+    maxLat = np.where(north_pole, 90., maxLat)
+    minLat = np.where(south_pole, -90., minLat)
+    full_longitude = north_pole | south_pole | (minLon < -180.) | (maxLon > 180.)
+    minLon = np.where(full_longitude, -180., minLon)
+    maxLon = np.where(full_longitude, 180., maxLon)
 
     return x0, y0, minLat, minLon, maxLat, maxLon
 
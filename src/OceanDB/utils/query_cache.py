@@ -0,0 +1,339 @@
+"""
+Cache of along track query windows
+
+Neighbouring queries (e.g. the grid nodes of an optimal interpolation on the same date) fetch mostly the same
+along_track rows.  QueryCache quantizes the query point & date to a cell (lat_step x lon_step degrees x time_step) and
+caches, per cell, the rows within reach of any point of the cell: the query radius widened by the cell's half
+diagonal and the time window widened by half a time step.  Each query is then answered exactly from its cell's rows,
+with distances computed on the WGS84 spheroid like PostGIS (see utils.geodesic).
+
+Tiers
+    memory  LRU of the cell windows within max_bytes
+    disk    optional, windows evicted from memory are saved as .npy files under directory and read back memory-mapped,
+            oldest files are removed beyond disk_max_bytes
+
+Invalidation
+    Ingesting a file calls invalidate_query_caches with its time range.  Cached windows overlapping it are dropped from
+    the caches of the process, and a stamp per month is touched under the cache directory so caches of other
+    processes sharing the directory drop windows fetched before the stamp.
+"""
+import hashlib
+import json
+import math
+import os
+import shutil
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from OceanDB.utils.time_conversion import POSTGRES_EPOCH
+
+# Upper bound of the length of a degree of latitude or longitude on the WGS84 ellipsoid, in metres
+METRES_PER_DEGREE_BOUND = 111_700.
+
+_caches: "weakref.WeakSet[QueryCache]" = weakref.WeakSet()
+
+
+def to_postgres_microseconds(date: datetime) -> int:
+    """
+    Microseconds since 2000-01-01, the binary representation of a Postgres timestamp
+    """
+    return int((np.datetime64(date, "us") - POSTGRES_EPOCH).astype(np.int64))
+
+
+class QueryCacheKey(NamedTuple):
+    latitude_cell: int
+    longitude_cell: int
+    time_cell: int
+    time_window: int
+    distance: float
+    missions: Tuple[str, ...]
+    connected_basin_ids: Tuple[int, ...]
+
+    def digest(self) -> str:
+        return hashlib.blake2b(repr(tuple(self)).encode(), digest_size=16).hexdigest()
+
+
+@dataclass
+class CachedWindow:
+    """
+    along_track rows of a cell, date_time in Postgres microseconds, sla_filtered unscaled
+    """
+    columns: Dict[str, np.ndarray]
+    start: int
+    end: int
+    created: float = field(default_factory=time.time)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(values.nbytes for values in self.columns.values())
+
+
+@dataclass
+class QueryCacheStatistics:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.disk_hits + self.misses
+        return (self.hits + self.disk_hits) / lookups if lookups else float("nan")
+
+
+def _months(start: int, end: int) -> List[str]:
+    """
+    YYYY-MM of every month between Postgres microseconds start & end
+    """
+    first, last = (POSTGRES_EPOCH + np.array([start, end], dtype="timedelta64[us]")).astype("datetime64[M]")
+    return [str(month) for month in np.arange(first, last + 1)]
+
+
+def _stamp_directory(directory: Path) -> Path:
+    return directory / "invalidated"
+
+
+class QueryCache:
+    """
+    Two tier cache of along track query windows, keyed by quantized (lat, lon, date, window, radius, missions, basins)
+
+    max_bytes: memory budget of the cached rows
+    directory: disk tier & cross process invalidation stamps, None for a memory only cache
+    disk_max_bytes: disk tier budget
+    lat_step, lon_step: cell size in degrees
+    time_step: cell duration
+    """
+
+    def __init__(self, max_bytes: int = 512 * 2 ** 20, directory: Optional[Union[str, Path]] = None,
+                 disk_max_bytes: int = 8 * 2 ** 30, lat_step: float = 0.5, lon_step: float = 0.5,
+                 time_step: timedelta = timedelta(days=1)):
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory else None
+        self.disk_max_bytes = disk_max_bytes
+        self.lat_step = lat_step
+        self.lon_step = lon_step
+        self.time_step = int(time_step / timedelta(microseconds=1))
+        self._entries: "OrderedDict[QueryCacheKey, CachedWindow]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._statistics = QueryCacheStatistics()
+        _caches.add(self)
+
+    @classmethod
+    def from_config(cls, config) -> "QueryCache":
+        return cls(
+            max_bytes=config.query_cache_max_bytes,
+            directory=config.query_cache_directory,
+            disk_max_bytes=config.query_cache_disk_max_bytes,
+        )
+
+    ######################################################
+    #
+    # Cells
+    #
+    ######################################################
+    def key(self, latitude: float, longitude: float, date: datetime, time_window: timedelta, distance: float,
+            missions: Sequence[str], connected_basin_ids: Optional[Sequence[int]]) -> QueryCacheKey:
+        longitude = (float(longitude) + 180.) % 360. - 180.
+        return QueryCacheKey(
+            latitude_cell=math.floor(float(latitude) / self.lat_step),
+            longitude_cell=math.floor(longitude / self.lon_step),
+            time_cell=to_postgres_microseconds(date) // self.time_step,
+            time_window=int(time_window / timedelta(microseconds=1)),
+            distance=float(distance),
+            missions=tuple(missions),
+            connected_basin_ids=tuple(connected_basin_ids or ()),
+        )
+
+    def cell_window(self, key: QueryCacheKey) -> Tuple[float, float, float, int, int]:
+        """
+        (latitude, longitude, distance, start, end) of the window holding every row any query of the cell can return,
+        start & end in Postgres microseconds
+        """
+        latitude = (key.latitude_cell + 0.5) * self.lat_step
+        longitude = (key.longitude_cell + 0.5) * self.lon_step
+        distance = key.distance + METRES_PER_DEGREE_BOUND * math.hypot(self.lat_step / 2, self.lon_step / 2)
+        start = key.time_cell * self.time_step - key.time_window
+        end = (key.time_cell + 1) * self.time_step + key.time_window
+        return latitude, longitude, distance, start, end
+
+    ######################################################
+    #
+    # Lookup
+    #
+    ######################################################
+    def get(self, key: QueryCacheKey) -> Optional[CachedWindow]:
+        with self._lock:
+            window = self._entries.get(key)
+            if window is not None:
+                if self._is_stale(window):
+                    self._remove(key)
+                    self._statistics.invalidations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._statistics.hits += 1
+                    return window
+
+        window = self._load(key)
+        with self._lock:
+            if window is None:
+                self._statistics.misses += 1
+            else:
+                self._statistics.disk_hits += 1
+        return window
+
+    def put(self, key: QueryCacheKey, window: CachedWindow):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = window
+            self._bytes += window.nbytes
+            evicted = []
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                evicted_key, evicted_window = self._entries.popitem(last=False)
+                self._bytes -= evicted_window.nbytes
+                self._statistics.evictions += 1
+                evicted.append((evicted_key, evicted_window))
+        for evicted_key, evicted_window in evicted:
+            self._save(evicted_key, evicted_window)
+
+    def _remove(self, key: QueryCacheKey):
+        window = self._entries.pop(key)
+        self._bytes -= window.nbytes
+
+    def statistics(self) -> QueryCacheStatistics:
+        with self._lock:
+            statistics = QueryCacheStatistics(**{
+                name: getattr(self._statistics, name) for name in ["hits", "disk_hits", "misses", "evictions",
+                                                                    "invalidations"]
+            })
+            statistics.entries = len(self._entries)
+            statistics.bytes = self._bytes
+        return statistics
+
+    ######################################################
+    #
+    # Invalidation
+    #
+    ######################################################
+    def _is_stale(self, window: CachedWindow) -> bool:
+        if self.directory is None:
+            return False
+        stamps = _stamp_directory(self.directory)
+        for month in _months(window.start, window.end):
+            try:
+                if (stamps / month).stat().st_mtime >= window.created:
+                    return True
+            except FileNotFoundError:
+                pass
+        return False
+
+    def invalidate(self, start: int, end: int):
+        """
+        Drop the cached windows overlapping Postgres microseconds [start, end]
+        """
+        with self._lock:
+            for key in [key for key, window in self._entries.items() if window.start <= end and window.end >= start]:
+                self._remove(key)
+                self._statistics.invalidations += 1
+
+        if self.directory is not None:
+            for meta in (self.directory / "entries").glob("*/meta.json"):
+                try:
+                    window = json.loads(meta.read_text())
+                except (FileNotFoundError, ValueError):
+                    continue
+                if window["start"] <= end and window["end"] >= start:
+                    shutil.rmtree(meta.parent, ignore_errors=True)
+
+    ######################################################
+    #
+    # Disk tier
+    #
+    ######################################################
+    def _entry_directory(self, key: QueryCacheKey) -> Path:
+        return self.directory / "entries" / key.digest()
+
+    def _save(self, key: QueryCacheKey, window: CachedWindow):
+        if self.directory is None or window.nbytes > self.disk_max_bytes:
+            return
+        entry = self._entry_directory(key)
+        temporary = entry.with_name(f"{entry.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temporary.mkdir(parents=True, exist_ok=True)
+        for name, values in window.columns.items():
+            np.save(temporary / f"{name}.npy", np.ascontiguousarray(values))
+        (temporary / "meta.json").write_text(json.dumps({
+            "key": list(key), "start": window.start, "end": window.end, "created": window.created,
+            "columns": list(window.columns), "bytes": window.nbytes,
+        }))
+        shutil.rmtree(entry, ignore_errors=True)
+        try:
+            temporary.rename(entry)
+        except OSError:
+            # Saved concurrently by another process
+            shutil.rmtree(temporary, ignore_errors=True)
+        self._trim_disk()
+
+    def _load(self, key: QueryCacheKey) -> Optional[CachedWindow]:
+        if self.directory is None:
+            return None
+        entry = self._entry_directory(key)
+        try:
+            meta = json.loads((entry / "meta.json").read_text())
+            if meta["key"] != json.loads(json.dumps(list(key))):
+                return None
+            window = CachedWindow(
+                columns={name: np.load(entry / f"{name}.npy", mmap_mode="r") for name in meta["columns"]},
+                start=meta["start"],
+                end=meta["end"],
+                created=meta["created"],
+            )
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        if self._is_stale(window):
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+        os.utime(entry / "meta.json")
+        return window
+
+    def _trim_disk(self):
+        entries = []
+        for meta in (self.directory / "entries").glob("*/meta.json"):
+            try:
+                stat = meta.stat()
+                entries.append((stat.st_mtime, json.loads(meta.read_text())["bytes"], meta.parent))
+            except (FileNotFoundError, ValueError, KeyError):
+                continue
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+def invalidate_query_caches(first: datetime, last: datetime, directory: Optional[Union[str, Path]] = None):
+    """
+    Invalidate cached windows overlapping [first, last] in every cache of this process, and stamp the months under
+    directory for caches of other processes
+    """
+    start, end = to_postgres_microseconds(first), to_postgres_microseconds(last)
+    for cache in list(_caches):
+        cache.invalidate(start, end)
+
+    if directory is not None:
+        stamps = _stamp_directory(Path(directory))
+        stamps.mkdir(parents=True, exist_ok=True)
+        for month in _months(start, end):
+            (stamps / month).touch()
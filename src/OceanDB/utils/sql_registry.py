@@ -0,0 +1,92 @@
+"""
+Packaged SQL templates & per statement execution counters
+
+Every .sql file under OceanDB.sql is read once, on first use, and served from memory afterwards by name relative to
+the package, e.g. "queries/geographic_nearest_neighbor.sql".  The registry also counts the executions & time spent per
+statement, see SQLRegistry.timed.
+
+The per point queries run with prepare=True, so psycopg prepares them once per connection and reuses them for as long
+as the connection lives, i.e. across calls when the connection pool is enabled.  The batched queries run as COPY,
+which Postgres cannot prepare.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from importlib import resources
+from typing import Dict, Iterator, Optional
+
+
+@dataclass
+class StatementStatistics:
+    executions: int = 0
+    seconds: float = 0.
+
+
+class SQLRegistry:
+
+    def __init__(self, package: str = "OceanDB.sql"):
+        self.package = package
+        self._templates: Optional[Dict[str, str]] = None
+        self._statistics: Dict[str, StatementStatistics] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _walk(directory, prefix: str = "") -> Iterator[tuple]:
+        for entry in directory.iterdir():
+            if entry.is_dir():
+                yield from SQLRegistry._walk(entry, f"{prefix}{entry.name}/")
+            elif entry.name.endswith(".sql"):
+                yield f"{prefix}{entry.name}", entry
+
+    @property
+    def templates(self) -> Dict[str, str]:
+        if self._templates is None:
+            with self._lock:
+                if self._templates is None:
+                    self._templates = {
+                        name: entry.read_text(encoding="utf-8")
+                        for name, entry in self._walk(resources.files(self.package))
+                    }
+        return self._templates
+
+    def get(self, filename: str) -> str:
+        """
+        The SQL template filename, relative to the package
+        """
+        try:
+            return self.templates[filename]
+        except KeyError:
+            raise FileNotFoundError(f"No SQL template {filename} in {self.package}") from None
+
+    @contextmanager
+    def timed(self, filename: str, executions: int = 1):
+        """
+        Count executions of filename & add the duration of the block to its statistics
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                statistics = self._statistics.setdefault(filename, StatementStatistics())
+                statistics.executions += executions
+                statistics.seconds += seconds
+
+    def statistics(self) -> Dict[str, StatementStatistics]:
+        """
+        Copy of the statistics of every statement executed by this process
+        """
+        with self._lock:
+            return {
+                name: StatementStatistics(statistics.executions, statistics.seconds)
+                for name, statistics in self._statistics.items()
+            }
+
+    def reset_statistics(self):
+        with self._lock:
+            self._statistics.clear()
+
+
+sql_registry = SQLRegistry()
@@ -0,0 +1,173 @@
+"""
+Synthetic DUACS L3 along track files
+
+Writes NetCDF files with the variables, packing (scale factors & fill values), global attributes, directory layout and
+file name pattern of the Copernicus SEALEVEL_GLO_PHY_L3_MY_008_062 product, so the ingest can be exercised and
+benchmarked without downloading the real data.  The ground track is a simple repeat orbit, the sea level fields are
+smooth random signals.
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+import netCDF4 as nc
+import numpy as np
+
+PRODUCT = "SEALEVEL_GLO_PHY_L3_MY_008_062"
+DATASET_VERSION = "202411"
+PRODUCTION_DATE = "20240205"
+REFERENCE_DATE = datetime(1950, 1, 1)
+
+# (name, long_name, standard deviation in metres) of the int16 variables packed with scale_factor 0.001
+PACKED_VARIABLES = [
+    ("sla_unfiltered", "Sea level anomaly not-filtered not-subsampled with dac, ocean_tide and lwe correction applied", 0.15),
+    ("sla_filtered", "Sea level anomaly filtered not-subsampled with dac, ocean_tide and lwe correction applied", 0.12),
+    ("dac", "Dynamic Atmospheric Correction", 0.05),
+    ("ocean_tide", "Ocean tide model", 0.5),
+    ("internal_tide", "Internal tide correction", 0.01),
+    ("lwe", "Long wavelength error", 0.02),
+    ("mdt", "Mean dynamic topography", 0.6),
+    ("tpa_correction", "TOPEX-A instrumental drift correction derived from comparison to tide gauges", 0.005),
+]
+
+GLOBAL_ATTRIBUTES = {
+    "Conventions": "CF-1.6",
+    "Metadata_Conventions": "Unidata Dataset Discovery v1.0",
+    "cdm_data_type": "Swath",
+    "comment": "Synthetic along track data generated by OceanDB",
+    "contact": "servicedesk.cmems@mercator-ocean.eu",
+    "institution": "CLS, CNES",
+    "processing_level": "L3",
+    "product_version": "vDT2024",
+    "project": "COPERNICUS MARINE ENVIRONMENT MONITORING SERVICE (CMEMS)",
+    "source": "Synthetic",
+    "title": "DT unfiltered along-track sea level anomalies (synthetic)",
+}
+
+
+def synthetic_file_path(directory: Union[str, Path], mission: str, date: datetime) -> Path:
+    """
+    Path of a mission day in the layout downloaded by copernicusmarine:
+    <directory>/SEALEVEL_GLO_PHY_L3_MY_008_062/cmems_obs-sl_glo_phy-ssh_my_<mission>-l3-duacs_PT1S_202411/YYYY/MM/
+    dt_global_<mission>_phy_l3_1hz_YYYYMMDD_20240205.nc
+    """
+    return (
+        Path(directory)
+        / PRODUCT
+        / f"cmems_obs-sl_glo_phy-ssh_my_{mission}-l3-duacs_PT1S_{DATASET_VERSION}"
+        / f"{date.year:04d}"
+        / f"{date.month:02d}"
+        / f"dt_global_{mission}_phy_l3_1hz_{date:%Y%m%d}_{PRODUCTION_DATE}.nc"
+    )
+
+
+def synthetic_ground_track(n_points: int, date: datetime, rng: np.random.Generator, inclination: float = 66.):
+    """
+    Time (days since 1950), latitude & longitude of n_points 1 Hz measurements of a repeat orbit during one day.
+    Measurements over land & ice are edited out of real files, so a random subset of the seconds of the day is kept.
+    """
+    n_points = min(n_points, 86_400)
+    seconds = np.sort(rng.choice(86_400, size=n_points, replace=False)).astype(np.float64)
+    day = (date - REFERENCE_DATE).days
+
+    # ~14 orbits per day, the earth rotating under the orbit shifts each pass west
+    orbit_phase = 2 * np.pi * (day * 86_400 + seconds) / 6_745.72
+    latitude = inclination * np.sin(orbit_phase)
+    longitude = (np.degrees(np.arctan2(np.cos(np.radians(inclination)) * np.sin(orbit_phase), np.cos(orbit_phase)))
+                 - 360 * (day + seconds / 86_400)) % 360
+    return day + seconds / 86_400, latitude, longitude, orbit_phase
+
+
+def write_synthetic_along_track_file(
+        directory: Union[str, Path],
+        mission: str,
+        date: datetime,
+        n_points: int = 60_000,
+        seed: Optional[int] = None,
+        fill_fraction: float = 0.01,
+) -> Path:
+    """
+    Write one day of synthetic along track data for a mission, returns the file path.
+
+    n_points: number of 1 Hz measurements (at most 86400)
+    fill_fraction: share of sla_filtered values set to the fill value, like the edge of filtered passes
+    """
+    rng = np.random.default_rng(seed)
+    path = synthetic_file_path(directory, mission, date)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    time, latitude, longitude, orbit_phase = synthetic_ground_track(n_points, date, rng)
+    n_points = len(time)
+    pass_number = np.floor(orbit_phase / np.pi).astype(np.int64)
+
+    with nc.Dataset(path, "w", format="NETCDF4") as ds:
+        ds.setncatts({
+            **GLOBAL_ATTRIBUTES,
+            "platform": mission,
+            "date_created": f"{datetime(2024, 2, 5):%Y-%m-%dT%H:%M:%SZ}",
+            "time_coverage_start": f"{date:%Y-%m-%dT%H:%M:%SZ}",
+            "time_coverage_end": f"{date + timedelta(days=1):%Y-%m-%dT%H:%M:%SZ}",
+        })
+        ds.createDimension("time", n_points)
+
+        variable = ds.createVariable("time", "f8", ("time",), zlib=True)
+        variable.setncatts({
+            "long_name": "Time of measurement", "standard_name": "time", "axis": "T",
+            "units": "days since 1950-01-01 00:00:00", "calendar": "gregorian",
+        })
+        variable[:] = time
+
+        for name, values, standard_name, units in [
+            ("latitude", latitude, "latitude", "degrees_north"),
+            ("longitude", longitude, "longitude", "degrees_east"),
+        ]:
+            variable = ds.createVariable(name, "i4", ("time",), zlib=True, fill_value=np.int32(2_147_483_647))
+            variable.setncatts({
+                "long_name": name.capitalize(), "standard_name": standard_name, "units": units, "scale_factor": 1e-6,
+                "add_offset": 0.,
+            })
+            variable[:] = values
+
+        variable = ds.createVariable("cycle", "i2", ("time",), zlib=True, fill_value=np.int16(32767))
+        variable.setncatts({"long_name": "Cycle the measurement belongs to", "units": "1"})
+        variable[:] = np.full(n_points, 1 + (date - REFERENCE_DATE).days // 10 % 1000, dtype=np.int16)
+
+        variable = ds.createVariable("track", "i2", ("time",), zlib=True, fill_value=np.int16(32767))
+        variable.setncatts({"long_name": "Track in cycle the measurement belongs to", "units": "1"})
+        variable[:] = (1 + pass_number % 254).astype(np.int16)
+
+        for name, long_name, sigma in PACKED_VARIABLES:
+            # Smooth along the track with some white noise on top
+            signal = sigma * (np.sin(orbit_phase * rng.uniform(5, 50) + rng.uniform(0, 2 * np.pi))
+                              + 0.1 * rng.standard_normal(n_points))
+            packed = np.clip(np.rint(signal / 0.001), -32_000, 32_000).astype(np.int16)
+            if name == "sla_filtered" and fill_fraction > 0:
+                packed[rng.random(n_points) < fill_fraction] = 32767
+
+            variable = ds.createVariable(name, "i2", ("time",), zlib=True, fill_value=np.int16(32767))
+            variable.setncatts({"long_name": long_name, "units": "m", "scale_factor": 0.001, "add_offset": 0.})
+            variable.set_auto_maskandscale(False)
+            variable[:] = packed
+
+    return path
+
+
+def generate_synthetic_along_track_files(
+        directory: Union[str, Path],
+        missions: Iterable[str],
+        start_date: datetime,
+        end_date: datetime,
+        n_points: int = 60_000,
+        seed: int = 0,
+) -> List[Path]:
+    """
+    Write one synthetic file per mission & day from start_date through end_date (inclusive)
+    """
+    files = []
+    for mission_index, mission in enumerate(missions):
+        for day in range((end_date - start_date).days + 1):
+            date = start_date + timedelta(days=day)
+            files.append(write_synthetic_along_track_file(
+                directory, mission, date, n_points=n_points, seed=seed + 100_000 * mission_index + day
+            ))
+    return files
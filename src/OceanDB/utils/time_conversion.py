@@ -0,0 +1,89 @@
+import re
+from typing import Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+# Postgres stores timestamps as int64 microseconds since 2000-01-01 00:00:00
+POSTGRES_EPOCH = np.datetime64("2000-01-01T00:00:00", "us")
+
+MICROSECONDS_PER_UNIT = {
+    "day": 86_400_000_000,
+    "days": 86_400_000_000,
+    "hour": 3_600_000_000,
+    "hours": 3_600_000_000,
+    "minute": 60_000_000,
+    "minutes": 60_000_000,
+    "second": 1_000_000,
+    "seconds": 1_000_000,
+}
+
+# cftime calendars that match numpy's proleptic gregorian datetime64 for dates after 1582-10-15
+SUPPORTED_CALENDARS = {"standard", "gregorian", "proleptic_gregorian"}
+
+_UNITS_PATTERN = re.compile(r"^\s*(\w+)\s+since\s+(\d{4}-\d{1,2}-\d{1,2})(?:[ T](\d{1,2}:\d{1,2}(?::\d{1,2}(?:\.\d+)?)?))?\s*$")
+
+
+def parse_netcdf_time_units(units: str) -> Tuple[int, np.datetime64]:
+    """
+    Parse a CF time units string, e.g. "days since 1950-01-01 00:00:00"
+
+    Returns the number of microseconds per unit and the reference date as datetime64[us].
+    """
+    match = _UNITS_PATTERN.match(units)
+    if match is None or match.group(1).lower() not in MICROSECONDS_PER_UNIT:
+        raise ValueError(f"Unsupported time units '{units}'")
+
+    unit, date, clock = match.groups()
+    year, month, day = (int(part) for part in date.split("-"))
+    reference = np.datetime64(f"{year:04d}-{month:02d}-{day:02d}", "us")
+    if clock:
+        hours, minutes, *seconds = clock.split(":")
+        reference += np.timedelta64(int(hours) * 3_600_000_000 + int(minutes) * 60_000_000, "us")
+        if seconds:
+            reference += np.timedelta64(int(round(float(seconds[0]) * 1_000_000)), "us")
+    return MICROSECONDS_PER_UNIT[unit.lower()], reference
+
+
+def netcdf_time_to_postgres_microseconds(
+        values: npt.ArrayLike,
+        units: str = "days since 1950-01-01 00:00:00",
+        calendar: str = "standard",
+) -> npt.NDArray[np.int64]:
+    """
+    Convert CF time values (e.g. float64 "days since 1950") to int64 microseconds since 2000-01-01 in one vectorized
+    pass, rounded to the nearest microsecond.  This is the binary representation of a Postgres ``timestamp``.
+
+    The whole and fractional parts of each value are scaled separately, so the result stays exact to the microsecond
+    even though days * 8.64e10 approaches the float64 mantissa.
+    """
+    if calendar.lower() not in SUPPORTED_CALENDARS:
+        raise ValueError(f"Unsupported calendar '{calendar}', expected one of {sorted(SUPPORTED_CALENDARS)}")
+
+    microseconds_per_unit, reference = parse_netcdf_time_units(units)
+    values = np.asarray(np.ma.getdata(values), dtype=np.float64)
+
+    whole = np.floor(values)
+    fraction = values - whole
+    microseconds = whole.astype(np.int64) * microseconds_per_unit
+    microseconds += np.rint(fraction * microseconds_per_unit).astype(np.int64)
+    microseconds += (reference - POSTGRES_EPOCH).astype(np.int64)
+    return microseconds
+
+
+def postgres_microseconds_to_datetime64(microseconds: npt.ArrayLike) -> npt.NDArray[np.datetime64]:
+    """
+    Convert int64 microseconds since 2000-01-01 to datetime64[us]
+    """
+    return POSTGRES_EPOCH + np.asarray(microseconds, dtype=np.int64).astype("timedelta64[us]")
+
+
+def netcdf_time_to_datetime64(
+        values: npt.ArrayLike,
+        units: str = "days since 1950-01-01 00:00:00",
+        calendar: str = "standard",
+) -> npt.NDArray[np.datetime64]:
+    """
+    Convert CF time values (e.g. float64 "days since 1950") to datetime64[us]
+    """
+    return postgres_microseconds_to_datetime64(netcdf_time_to_postgres_microseconds(values, units, calendar))